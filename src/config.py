@@ -0,0 +1,65 @@
+"""Runtime configuration loaded from environment variables."""
+
+import os
+from functools import lru_cache
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class Settings(BaseModel):
+    """Service settings. Field names map to upper-case environment variables."""
+    secret_key: Optional[str] = Field(None, description="Key used to sign pagination cursors")
+    score_backend: Literal["memory", "sqlite", "columnar"] = Field("memory", description="Score repository implementation")
+    database_url: str = Field("sqlite:///tetris.db", description="Database location for the sqlite backend")
+    journal_dir: Optional[str] = Field(None, description="Directory for the memory backend's append log; unset keeps it volatile")
+    journal_snapshot_every: int = Field(100_000, ge=1, description="Journal records between compacted snapshots")
+    journal_fsync: bool = Field(True, description="fsync each journal group commit")
+    retention_days: int = Field(14, ge=1, description="Days of history the leaderboard keeps")
+    max_records: int = Field(100, ge=1, description="Most recent records kept regardless of age; also caps each tag/platform index")
+    retention_interval_seconds: float = Field(60.0, gt=0, description="Pause between retention sweeps")
+    retention_slice_size: int = Field(500, ge=1, description="Scores expired per step of a retention sweep")
+    idempotency_ttl_seconds: float = Field(86_400, gt=0, description="How long a submission's idempotency key is remembered")
+    idempotency_max_keys: int = Field(100_000, ge=1, description="Idempotency keys kept before the oldest are dropped")
+    rate_limit_read_tokens: int = Field(30, ge=1, description="Burst size of the per-client read bucket")
+    rate_limit_read_refill: float = Field(0.5, gt=0, description="Read tokens refilled per second")
+    rate_limit_write_tokens: int = Field(50, ge=1, description="Burst size of the per-client write bucket")
+    rate_limit_write_refill: float = Field(0.5, gt=0, description="Write tokens refilled per second")
+    rate_limit_bulk_item_cost: float = Field(1.0, ge=0, description="Write tokens charged per item of a bulk upload")
+    rate_limit_max_clients: int = Field(100_000, ge=1, description="Rate limit buckets kept before LRU eviction")
+    rate_limit_shared_dir: Optional[str] = Field(None, description="Directory for memory-mapped buckets shared by all workers")
+    enable_telemetry: bool = Field(True, description="Accept client telemetry; when false every event is sampled out")
+    telemetry_dir: str = Field("telemetry", description="Directory for rotated NDJSON telemetry files")
+    telemetry_buffer_size: int = Field(10_000, ge=1, description="Events held in the ingestion ring buffer before drops")
+    telemetry_batch_size: int = Field(500, ge=1, description="Events written to the sink per batch")
+    telemetry_flush_seconds: float = Field(5.0, gt=0, description="Longest pause between sink writes")
+    telemetry_sample_rate: float = Field(1.0, ge=0, le=1, description="Fraction of events kept while the buffer is below half full")
+    telemetry_file_max_bytes: int = Field(64 * 1024 * 1024, ge=1, description="Telemetry file size that triggers rotation")
+    telemetry_max_files: int = Field(20, ge=1, description="Rotated telemetry files kept")
+    telemetry_format: Literal["ndjson", "binary"] = Field("ndjson", description="Encoding of telemetry files")
+    telemetry_compress: bool = Field(True, description="gzip telemetry files when they are rotated")
+    telemetry_rollup_seconds: int = Field(60, ge=1, description="Width of each telemetry rollup bucket")
+    telemetry_rollup_buckets: int = Field(1440, ge=1, description="Telemetry rollup buckets kept before the oldest are discarded")
+    metrics_dir: Optional[str] = Field(None, description="Directory for per-worker memory-mapped metrics (default: tmp dir when WEB_CONCURRENCY > 1)")
+    metrics_refresh_seconds: float = Field(10.0, gt=0, description="Pause between gauge refreshes written for other workers")
+    profile_sample_rate: float = Field(0.0, ge=0, le=1, description="Fraction of requests run under the sampling profiler; 0 disables sampling")
+    profile_interval_ms: float = Field(5.0, gt=0, description="Milliseconds between stack samples of a profiled request")
+    profile_max_stacks: int = Field(10_000, ge=1, description="Distinct collapsed stacks kept before new ones are grouped together")
+    admin_token: Optional[str] = Field(None, description="Token for /admin endpoints and the X-Profile header; unset disables them")
+    web_concurrency: int = Field(1, ge=1, description="Number of server worker processes on this host")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from the process environment, ignoring unset variables."""
+        values = {
+            name: os.environ[name.upper()]
+            for name in cls.model_fields
+            if name.upper() in os.environ
+        }
+        return cls.model_validate(values)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings instance."""
+    return Settings.from_env()
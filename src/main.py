@@ -3,17 +3,70 @@
 FastAPI service that stores short-lived Tetris high scores.
 """
 
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from .config import Settings
+from .metrics import registry as metrics_registry
+from .metrics.instruments import RATE_LIMIT_BUCKETS, RETENTION_RECLAIMED, SCORES_STORED, observe_telemetry
+from .profiling import ProfilingMiddleware
+from .routers import admin, scores, telemetry
+from .services.retention import RetentionScheduler
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_directory(settings: Settings) -> Optional[str]:
+    """Where workers share metrics: ``METRICS_DIR``, or a tmp dir when several workers run."""
+    if settings.metrics_dir:
+        return settings.metrics_dir
+    if settings.web_concurrency > 1:
+        return os.path.join(tempfile.gettempdir(), "tetris-metrics")
+    return None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run the retention scheduler and telemetry pipeline for the lifetime of the application."""
+    settings = scores.settings
+    scheduler = RetentionScheduler(
+        scores.score_service,
+        scores.retention_policy,
+        interval_seconds=settings.retention_interval_seconds,
+        slice_size=settings.retention_slice_size,
+    )
+    app.state.retention = scheduler
+    app.state.telemetry = telemetry.pipeline
+    directory = metrics_directory(settings)
+    if directory:
+        metrics_registry.attach(directory)
+    scheduler.start()
+    telemetry.pipeline.start()
+    metrics_registry.start(settings.metrics_refresh_seconds)
+    try:
+        yield
+    finally:
+        await metrics_registry.stop()
+        await scheduler.stop()
+        await telemetry.pipeline.stop()
+        metrics_registry.detach()
+        admin.profiler.stop()
 
-from .routers import scores
 
 app = FastAPI(
     title="Tetris Web Highscore API",
     version="0.3.0",
     description="Offline-first leaderboard service for the Tetris Web project. "
                 "Clients queue submissions locally and resync when connectivity returns. "
-                "Rate limiting and validation protect shared resources."
+                "Rate limiting and validation protect shared resources.",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -25,7 +78,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Only installed when configured, so requests skip it entirely otherwise.
+if admin.settings.profile_sample_rate > 0 or admin.settings.admin_token:
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=admin.profiler,
+        sample_rate=admin.settings.profile_sample_rate,
+        token=admin.settings.admin_token,
+    )
+
 app.include_router(scores.router, prefix="/scores", tags=["Scores"])
+app.include_router(telemetry.router, prefix="/telemetry", tags=["Telemetry"])
+app.include_router(admin.router, prefix="/admin", tags=["Operations"])
+
+
+async def collect_gauges() -> None:
+    """Copy the live state of the service objects into the metrics registry."""
+    SCORES_STORED.labels().set(await scores.score_service.get_score_count())
+    for name, limiter in scores.rate_limiters.items():
+        RATE_LIMIT_BUCKETS.labels(name).set(len(limiter))
+    observe_telemetry(telemetry.pipeline)
+    retention = getattr(app.state, "retention", None)
+    if retention is not None:
+        RETENTION_RECLAIMED.labels().set(retention.reclaimed_total)
+
+
+metrics_registry.add_collector(collect_gauges)
 
 
 @app.get("/healthz")
@@ -33,6 +111,13 @@ async def health_check() -> dict[str, str]:
     """Health check endpoint."""
     return {"status": "healthy", "service": "tetris-highscore-api", "version": "0.3.0"}
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus metrics for every worker on this host."""
+    await metrics_registry.refresh()
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,15 @@
+"""Prometheus-style service metrics."""
+
+from .instruments import registry
+from .registry import Counter, Gauge, Histogram, MetricFamily, MetricsRegistry
+from .routing import TimedRoute
+
+__all__ = [
+    "MetricsRegistry",
+    "MetricFamily",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "TimedRoute",
+    "registry",
+]
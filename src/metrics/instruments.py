@@ -0,0 +1,65 @@
+"""The service's own metrics, defined once so every worker lays out the same slots."""
+
+from ..telemetry.pipeline import TelemetryPipeline
+from .registry import MetricsRegistry
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "tetris_http_request_duration_seconds",
+    "Time spent handling API requests, including validation and serialization.",
+    ("handler", "method"),
+)
+REPOSITORY_OPERATION_SECONDS = registry.histogram(
+    "tetris_repository_operation_duration_seconds",
+    "Time spent in score repository operations.",
+    ("operation",),
+)
+RATE_LIMIT_DECISIONS = registry.counter(
+    "tetris_rate_limit_decisions_total",
+    "Rate limit checks by bucket and outcome.",
+    ("bucket", "decision"),
+)
+RATE_LIMIT_BUCKETS = registry.gauge(
+    "tetris_rate_limit_buckets",
+    "Client buckets currently tracked by each rate limiter.",
+    ("bucket",),
+)
+SCORES_STORED = registry.gauge(
+    "tetris_scores_stored",
+    "Scores held by the score repository.",
+)
+TELEMETRY_BUFFER_DEPTH = registry.gauge(
+    "tetris_telemetry_buffer_depth",
+    "Telemetry events waiting in the ingestion buffer.",
+)
+TELEMETRY_EVENTS = registry.counter(
+    "tetris_telemetry_events_total",
+    "Telemetry events by outcome: accepted, sampled_out, dropped (buffer full), written or failed (sink error).",
+    ("outcome",),
+)
+RETENTION_RECLAIMED = registry.counter(
+    "tetris_retention_reclaimed_scores_total",
+    "Scores removed by the background retention sweep.",
+)
+
+# Repository operations timed by ScoreService.
+REPOSITORY_OPERATIONS = (
+    "get_scores",
+    "get_window_scores",
+    "get_filtered_scores",
+    "get_rank",
+    "create_scores",
+    "expire_scores",
+)
+for operation in REPOSITORY_OPERATIONS:
+    REPOSITORY_OPERATION_SECONDS.labels(operation)
+
+_TELEMETRY_OUTCOMES = ("accepted", "sampled_out", "dropped", "written", "failed")
+
+
+def observe_telemetry(pipeline: TelemetryPipeline) -> None:
+    """Copy a pipeline's buffer depth and outcome totals into the registry."""
+    TELEMETRY_BUFFER_DEPTH.labels().set(len(pipeline.buffer))
+    for outcome in _TELEMETRY_OUTCOMES:
+        TELEMETRY_EVENTS.labels(outcome).set(getattr(pipeline, outcome))
@@ -0,0 +1,415 @@
+"""Preallocated metrics with Prometheus text exposition.
+
+Every metric child owns a fixed range of float64 slots in one flat array,
+allocated when the child is created (at import time for the service's own
+metrics), so recording a value is an index update with no allocation.
+
+With several workers each process attaches its array to a memory-mapped
+file ``tetris-metrics-<pid>.bin`` in a shared directory. Each file has a
+single writer, so no locking is needed; a scrape served by any worker
+reads every live worker's file, sums counters and histograms and reports
+gauges per ``pid``. All workers run the same code, so slot layouts match.
+
+When a worker exits (or is found dead) its counter and histogram slots
+are added to ``tetris-metrics-archive.bin`` before its file is removed, so
+summed totals never go backwards across worker restarts; its gauges are
+dropped with it.
+"""
+
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, Generic, Literal, Optional, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+MetricKind = Literal["counter", "gauge", "histogram"]
+Collector = Callable[[], Union[None, Awaitable[None]]]
+
+_MAGIC = b"TSMT0001"
+_HEADER = struct.Struct("<8sII")  # magic, capacity (slots), pid
+_HEADER_SIZE = 64
+_FILE_PREFIX = "tetris-metrics-"
+_ARCHIVE_NAME = f"{_FILE_PREFIX}archive.bin"
+_ARCHIVE_LOCK_NAME = f"{_FILE_PREFIX}archive.lock"
+
+ChildT = TypeVar("ChildT", "Counter", "Gauge", "Histogram")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if value.is_integer() else repr(value)
+
+
+def _read_slots(path: str, size: int) -> Optional[tuple[int, Sequence[float]]]:
+    """``(pid, first size slots)`` of a metrics file, or None if it is missing or malformed."""
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < _HEADER_SIZE:
+        return None
+    magic, capacity, pid = _HEADER.unpack_from(data)
+    if magic != _MAGIC or len(data) < _HEADER_SIZE + capacity * 8:
+        return None
+    values = array("d")
+    values.frombytes(data[_HEADER_SIZE:_HEADER_SIZE + min(capacity, size) * 8])
+    # A worker still starting up may not have allocated every slot.
+    values.extend([0.0] * (size - len(values)))
+    return pid, values
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """Owns the slot array and the metric families laid out in it."""
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self.capacity = capacity
+        self.size = 0
+        self.values = memoryview(bytearray(capacity * 8)).cast("d")
+        self.directory: Optional[str] = None
+        self.families: list[MetricFamily[Any]] = []
+        self._collectors: list[Collector] = []
+        self._map: Optional[mmap.mmap] = None
+        self._path: Optional[str] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def _allocate(self, count: int) -> int:
+        start = self.size
+        if start + count > self.capacity:
+            raise RuntimeError(f"Metrics registry is full ({self.capacity} slots)")
+        self.size += count
+        return start
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> "MetricFamily[Counter]":
+        """Define a counter family."""
+        return MetricFamily(self, name, documentation, "counter", tuple(labelnames), lambda: Counter(self))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> "MetricFamily[Gauge]":
+        """Define a gauge family."""
+        return MetricFamily(self, name, documentation, "gauge", tuple(labelnames), lambda: Gauge(self))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> "MetricFamily[Histogram]":
+        """Define a histogram family with the given upper bounds (+Inf is implied)."""
+        bounds = tuple(sorted(buckets))
+        return MetricFamily(self, name, documentation, "histogram", tuple(labelnames), lambda: Histogram(self, bounds), bounds)
+
+    def attach(self, directory: str) -> None:
+        """Move this process's slots into a memory-mapped file shared with the other workers."""
+        if self._map is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        pid = os.getpid()
+        path = os.path.join(directory, f"{_FILE_PREFIX}{pid}.bin")
+        size = _HEADER_SIZE + self.capacity * 8
+        with open(path, "wb") as fh:
+            fh.write(_HEADER.pack(_MAGIC, self.capacity, pid).ljust(_HEADER_SIZE, b"\0"))
+            fh.write(self.values.tobytes())
+        fd = os.open(path, os.O_RDWR)
+        try:
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.values = memoryview(self._map)[_HEADER_SIZE:].cast("d")
+        self.directory = directory
+        self._path = path
+
+    def detach(self) -> None:
+        """Archive this worker's totals, remove its file and copy the slots back into process memory.
+
+        Counter and histogram slots restart from zero: their values now live
+        in the archive, which a later ``attach`` would otherwise count twice.
+        """
+        if self._map is None:
+            return
+        values = memoryview(bytearray(self.values.tobytes())).cast("d")
+        if self._path is not None:
+            with self._archive_lock():
+                self._archive(values)
+                try:
+                    os.remove(self._path)
+                except FileNotFoundError:
+                    pass
+        for start, width in self._cumulative_ranges():
+            values[start:start + width] = memoryview(bytearray(width * 8)).cast("d")
+        self.values.release()
+        self.values = values
+        self._map.close()
+        self._map = None
+        self._path = None
+        self.directory = None
+
+    def _cumulative_ranges(self) -> Iterator[tuple[int, int]]:
+        """``(first slot, width)`` of every counter and histogram child."""
+        for family in self.families:
+            if family.kind != "gauge":
+                for child in family._children.values():
+                    yield child.index, child.width
+
+    @contextmanager
+    def _archive_lock(self) -> Iterator[None]:
+        assert self.directory is not None
+        fd = os.open(os.path.join(self.directory, _ARCHIVE_LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _archived(self) -> Sequence[float]:
+        """Summed counter and histogram slots of every exited worker."""
+        assert self.directory is not None
+        slots = _read_slots(os.path.join(self.directory, _ARCHIVE_NAME), self.size)
+        return slots[1] if slots is not None else array("d", bytes(self.size * 8))
+
+    def _archive(self, values: Sequence[float]) -> None:
+        """Add the counter and histogram slots of ``values`` to the archive. Hold the archive lock."""
+        assert self.directory is not None
+        totals = array("d", self._archived())
+        for start, width in self._cumulative_ranges():
+            for index in range(start, start + width):
+                totals[index] += values[index]
+        path = os.path.join(self.directory, _ARCHIVE_NAME)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(_HEADER.pack(_MAGIC, self.size, 0).ljust(_HEADER_SIZE, b"\0"))
+            fh.write(totals.tobytes())
+        os.replace(tmp_path, path)
+
+    def _retire(self, path: str) -> None:
+        """Archive and remove the file of a worker that exited without detaching."""
+        with self._archive_lock():
+            # Another worker may have retired it while we waited for the lock.
+            slots = _read_slots(path, self.size)
+            if slots is None:
+                return
+            self._archive(slots[1])
+            os.remove(path)
+
+    def add_collector(self, collector: Collector) -> None:
+        """Register a callback (sync or async) that updates gauges before they are read."""
+        self._collectors.append(collector)
+
+    async def refresh(self) -> None:
+        """Run every collector; a failing collector is logged and skipped."""
+        for collector in self._collectors:
+            try:
+                result = collector()
+                if result is not None:
+                    await result
+            except Exception:
+                logger.exception("Metrics collector failed")
+
+    async def run(self, interval_seconds: float) -> None:
+        """Refresh gauges forever so other workers can read them from the shared file."""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval_seconds)
+
+    def start(self, interval_seconds: float) -> None:
+        """Start refreshing gauges in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(interval_seconds), name="metrics-refresh")
+
+    async def stop(self) -> None:
+        """Cancel the background refresh task."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _snapshots(self) -> list[tuple[int, Sequence[float]]]:
+        """``(pid, values)`` for this process, plus every other live worker when attached."""
+        own_pid = os.getpid()
+        snapshots: list[tuple[int, Sequence[float]]] = [(own_pid, self.values)]
+        if self.directory is None:
+            return snapshots
+        for entry in os.scandir(self.directory):
+            name = entry.name
+            if not (name.startswith(_FILE_PREFIX) and name.endswith(".bin")) or name == _ARCHIVE_NAME:
+                continue
+            slots = _read_slots(entry.path, self.size)
+            if slots is None or slots[0] == own_pid:
+                continue
+            if not _pid_alive(slots[0]):
+                # A worker that exited without detaching: keep its totals, drop its gauges.
+                self._retire(entry.path)
+                continue
+            snapshots.append(slots)
+        return snapshots
+
+    def render(self) -> str:
+        """Render every family in the Prometheus text exposition format (0.0.4)."""
+        snapshots = self._snapshots()
+        per_process = len(snapshots) > 1 or self.directory is not None
+        if self.directory is not None:
+            # Read after retiring dead workers, so their totals are counted exactly once.
+            snapshots.append((0, self._archived()))
+        lines: list[str] = []
+        for family in self.families:
+            family.render(lines, snapshots, per_process)
+        return "\n".join(lines) + "\n"
+
+
+class MetricFamily(Generic[ChildT]):
+    """A named metric and its labelled children, all of type ``ChildT``."""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        name: str,
+        documentation: str,
+        kind: MetricKind,
+        labelnames: tuple[str, ...],
+        factory: Callable[[], ChildT],
+        buckets: tuple[float, ...] = ()
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._factory: Callable[[], ChildT] = factory
+        self._children: dict[tuple[str, ...], ChildT] = {}
+        registry.families.append(self)
+
+    def labels(self, *values: str) -> ChildT:
+        """Return the child for ``values``, allocating its slots on first use.
+
+        Resolve children once (at import or route setup) and keep them; the
+        lookup itself is not meant for the hot path.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._factory()
+        return child
+
+    def _label_text(self, values: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self, lines: list[str], snapshots: list[tuple[int, Sequence[float]]], per_process: bool) -> None:
+        """Append this family's samples; ``snapshots`` entries with pid 0 only add to totals."""
+        lines.append(f"# HELP {self.name} {_escape(self.documentation)}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in self._children.items():
+            if self.kind == "gauge":
+                for pid, slots in snapshots:
+                    if not pid:
+                        # The archive of exited workers holds no gauges.
+                        continue
+                    label = self._label_text(values, f'pid="{pid}"' if per_process else "")
+                    lines.append(f"{self.name}{label} {_format_value(slots[child.index])}")
+                continue
+            totals = [sum(slots[index] for _, slots in snapshots) for index in range(child.index, child.index + child.width)]
+            if self.kind == "counter":
+                lines.append(f"{self.name}{self._label_text(values)} {_format_value(totals[0])}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), totals):
+                cumulative += count
+                label = self._label_text(values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{label} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(totals[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {_format_value(cumulative)}")
+
+
+class Counter:
+    """Monotonic total in one slot."""
+
+    __slots__ = ("registry", "index", "width")
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.width = 1
+        self.index = registry._allocate(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.registry.values[self.index] += amount
+
+    def set(self, total: float) -> None:
+        """Mirror a total that is maintained elsewhere and only ever grows."""
+        self.registry.values[self.index] = total
+
+    @property
+    def value(self) -> float:
+        return self.registry.values[self.index]
+
+
+class Gauge:
+    """Current value in one slot; reported per worker."""
+
+    __slots__ = ("registry", "index", "width")
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.width = 1
+        self.index = registry._allocate(1)
+
+    def set(self, value: float) -> None:
+        self.registry.values[self.index] = value
+
+    @property
+    def value(self) -> float:
+        return self.registry.values[self.index]
+
+
+class Histogram:
+    """Per-bucket counts (not cumulative) followed by the sum, in ``len(buckets) + 2`` slots."""
+
+    __slots__ = ("registry", "index", "width", "_bounds")
+
+    def __init__(self, registry: MetricsRegistry, bounds: tuple[float, ...]) -> None:
+        self.registry = registry
+        self._bounds = bounds
+        self.width = len(bounds) + 2
+        self.index = registry._allocate(self.width)
+
+    def observe(self, value: float) -> None:
+        values = self.registry.values
+        values[self.index + bisect_left(self._bounds, value)] += 1
+        values[self.index + self.width - 1] += value
+
+    @property
+    def count(self) -> float:
+        values = self.registry.values
+        return sum(values[self.index:self.index + self.width - 1])
+
@@ -1,9 +1,12 @@
 """Data models for Tetris scores."""
 
+import math
 from datetime import datetime
-from typing import Optional, Union
+from typing import Annotated, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field
+
+from .telemetry.events import EventType
 
 
 class ClientInfo(BaseModel):
@@ -26,6 +29,7 @@ class ScoreInput(BaseModel):
     seed: Optional[str] = Field(None, description="Optional seed used by the client")
     tags: Optional[list[str]] = Field(default_factory=list, min_length=0, max_length=5, description="Optional metadata labels")
     client: Optional[ClientInfo] = None
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=128, description="Client-chosen key that makes retries of this submission safe", alias="idempotencyKey")
 
     class Config:
         extra = "forbid"
@@ -99,6 +103,98 @@ class ScoreBatchResult(BaseModel):
         extra = "forbid"
 
 
+class ScoreRank(BaseModel):
+    """Leaderboard placement of a stored score or a points value."""
+    score_id: Optional[str] = Field(None, description="Stored score that was ranked; null for a points lookup", alias="scoreId")
+    points: int = Field(..., ge=0, description="Points that were ranked")
+    rank: Optional[int] = Field(..., ge=1, description="1-based leaderboard position; null for suspect scores withheld from ranking")
+    total: int = Field(..., ge=0, description="Number of ranked scores, including this one")
+    top_percent: Optional[float] = Field(..., description="Rank as a percentage of total (top N%)", alias="topPercent")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+def _finite_or_none(value: float) -> Optional[float]:
+    """JSON cannot carry infinities or NaN, so numbers that overflow (like ``1e400``) become null."""
+    return value if math.isfinite(value) else None
+
+
+# Events are stored with signed 64-bit nanosecond timestamps (year 2262).
+MAX_TELEMETRY_TIMESTAMP_MS = (2**63 - 1) // 1_000_000
+
+TelemetryValue = Union[bool, int, Annotated[float, AfterValidator(_finite_or_none)], Annotated[str, Field(max_length=512)], None]
+
+
+class TelemetryEventInput(BaseModel):
+    """One analytics event tracked by the client."""
+    event: EventType = Field(..., description="Event type")
+    properties: dict[str, TelemetryValue] = Field(default_factory=dict, max_length=32, description="Flat event properties")
+    timestamp: int = Field(
+        ...,
+        ge=0,
+        le=MAX_TELEMETRY_TIMESTAMP_MS,
+        description="Client time of the event in Unix epoch milliseconds"
+    )
+    session_id: Optional[str] = Field(None, max_length=64, description="Client session that produced the event", alias="sessionId")
+
+    class Config:
+        allow_population_by_field_name = True
+        extra = "forbid"
+
+
+class TelemetryBatchInput(BaseModel):
+    """Batch of analytics events flushed by the client."""
+    events: list[TelemetryEventInput] = Field(..., min_length=1, max_length=200, description="Events in the order they were tracked")
+
+    class Config:
+        extra = "forbid"
+
+
+class TelemetryBatchResult(BaseModel):
+    """How many events of a batch were buffered, sampled out or dropped."""
+    accepted: int = Field(..., ge=0, description="Events buffered for the telemetry sink")
+    sampled_out: int = Field(..., ge=0, description="Events discarded by sampling", alias="sampledOut")
+    dropped: int = Field(..., ge=0, description="Events discarded because the ingestion buffer was full")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class HistogramSummary(BaseModel):
+    """Summary of a histogram; percentiles are approximate (within about 6%)."""
+    count: int = Field(..., ge=0, description="Number of recorded values")
+    sum: float = Field(..., description="Sum of recorded values")
+    min: float = Field(..., description="Smallest recorded value")
+    max: float = Field(..., description="Largest recorded value")
+    mean: float = Field(..., description="Mean of recorded values")
+    p50: float = Field(..., description="Median")
+    p90: float = Field(..., description="90th percentile")
+    p99: float = Field(..., description="99th percentile")
+
+
+class TelemetryRollup(BaseModel):
+    """Aggregated telemetry for one time bucket, or for a whole queried range."""
+    start: datetime = Field(..., description="Start of the bucket (inclusive)")
+    end: datetime = Field(..., description="End of the bucket (exclusive)")
+    counts: dict[str, int] = Field(..., description="Events received per event type; types without events are omitted")
+    histograms: dict[str, HistogramSummary] = Field(..., description="Numeric event properties keyed by <event>.<property>")
+    lag_ms: HistogramSummary = Field(..., description="Delay between the client event time and its receipt, in milliseconds", alias="lagMs")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class TelemetryRollupWindow(BaseModel):
+    """Telemetry rollups over a time range."""
+    bucket_seconds: int = Field(..., ge=1, description="Width of each bucket in seconds", alias="bucketSeconds")
+    buckets: list[TelemetryRollup] = Field(..., description="Non-empty buckets in the range, oldest first")
+    total: Optional[TelemetryRollup] = Field(None, description="All buckets in the range merged; null when the range is empty")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
 class ValidationError(BaseModel):
     """Validation error details."""
     loc: list[Union[str, int]] = Field(..., description="Path to the field that caused the error")
@@ -0,0 +1,170 @@
+"""Opt-in sampling profiler for API requests.
+
+``ProfilingMiddleware`` marks a fraction of requests (or those carrying a
+valid ``X-Profile`` header) as profiled. While at least one profiled
+request is in flight, a background thread samples the stack of the event
+loop thread every ``interval`` seconds and counts each distinct stack in
+collapsed form (``outer;inner;leaf``), which flame graph tools such as
+``flamegraph.pl`` and speedscope read directly.
+
+All requests share the event loop thread, so a sample shows whatever the
+loop was running at that instant, which may be another request's work or
+the idle selector; with sampled requests spread over normal traffic this
+is how time inside the process is actually spent.
+
+The middleware is only installed when ``PROFILE_SAMPLE_RATE`` > 0 or an
+``ADMIN_TOKEN`` is configured, so a disabled profiler costs nothing.
+"""
+
+import os
+import random
+import secrets
+import sys
+import threading
+from collections.abc import Callable
+from types import CodeType, FrameType
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+TRUNCATED_STACK = "[other stacks]"
+
+
+class SamplingProfiler:
+    """Aggregate collapsed stacks of threads running profiled requests.
+
+    At most ``max_stacks`` distinct stacks are kept; later new stacks are
+    counted under ``TRUNCATED_STACK``. Stacks deeper than ``max_depth``
+    frames keep their innermost frames.
+    """
+
+    def __init__(self, interval: float = 0.005, max_stacks: int = 10_000, max_depth: int = 128) -> None:
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: dict[str, int] = {}
+        self._labels: dict[CodeType, str] = {}
+        # Thread id -> number of profiled requests running on it.
+        self._targets: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        # Set to stop the current sampler thread; each thread gets its own.
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, thread_id: int) -> None:
+        """Start sampling ``thread_id`` on behalf of one request."""
+        with self._lock:
+            self._targets[thread_id] = self._targets.get(thread_id, 0) + 1
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop,), name="request-profiler", daemon=True
+                )
+                self._thread.start()
+            self._wake.set()
+
+    def end(self, thread_id: int) -> None:
+        """Stop sampling ``thread_id`` for one request."""
+        with self._lock:
+            remaining = self._targets.get(thread_id, 0) - 1
+            if remaining > 0:
+                self._targets[thread_id] = remaining
+            else:
+                self._targets.pop(thread_id, None)
+                if not self._targets:
+                    self._wake.clear()
+
+    def stop(self) -> None:
+        """Stop the sampler thread; a later ``begin`` restarts it."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+
+    def _run(self, stop: threading.Event) -> None:
+        while True:
+            # Idle until a profiled request starts.
+            self._wake.wait()
+            if stop.wait(self.interval):
+                return
+            with self._lock:
+                targets = list(self._targets)
+            frames = sys._current_frames()
+            stacks = [self._collapse(frames[thread_id]) for thread_id in targets if thread_id in frames]
+            with self._lock:
+                for stack in stacks:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] = self._stacks.get(stack, 0) + 1
+                    else:
+                        self._stacks[TRUNCATED_STACK] = self._stacks.get(TRUNCATED_STACK, 0) + 1
+                self.samples += len(stacks)
+
+    def _collapse(self, frame: Optional[FrameType]) -> str:
+        labels = self._labels
+        names: list[str] = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            names.append(label)
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def collapsed(self, reset: bool = False) -> str:
+        """Stacks as ``frame;frame;frame count`` lines, most sampled first."""
+        with self._lock:
+            stacks = self._stacks
+            if reset:
+                self._stacks = {}
+                self.samples = 0
+            else:
+                stacks = dict(stacks)
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+
+class ProfilingMiddleware:
+    """Profile a random ``sample_rate`` fraction of HTTP requests.
+
+    A request whose ``X-Profile`` header equals ``token`` is always
+    profiled, so an operator can capture a specific slow call.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profiler: SamplingProfiler,
+        sample_rate: float = 0.0,
+        token: Optional[str] = None,
+        rng: Callable[[], float] = random.random
+    ) -> None:
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.token = token.encode() if token else None
+        self._rng = rng
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if self.sample_rate > 0 and self._rng() < self.sample_rate:
+            return True
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    return secrets.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        thread_id = threading.get_ident()
+        self.profiler.begin(thread_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end(thread_id)
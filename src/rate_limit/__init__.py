@@ -1,5 +1,40 @@
 """Rate limiting utilities."""
 
-from .token_bucket import RateLimiter, TokenBucket
+import os
+import tempfile
 
-__all__ = ["RateLimiter", "TokenBucket"]
+from ..config import Settings
+from .costs import EndpointCost, default_endpoint_costs
+from .token_bucket import RateLimitDecision, RateLimiter, TokenBucket
+
+
+def create_rate_limiter(
+    settings: Settings,
+    max_tokens: int = 30,
+    refill_rate: float = 0.5,
+    name: str = "default",
+) -> RateLimiter:
+    """Build the limiter for this process.
+
+    With several workers (``WEB_CONCURRENCY`` > 1) or an explicit
+    ``RATE_LIMIT_SHARED_DIR``, buckets live in a memory-mapped file named
+    after ``name`` and shared by every worker on the host; otherwise the
+    in-process limiter is used.
+    """
+    if settings.web_concurrency > 1 or settings.rate_limit_shared_dir:
+        from .shared import SharedRateLimiter
+
+        directory = settings.rate_limit_shared_dir or tempfile.gettempdir()
+        path = os.path.join(directory, f"tetris-rate-limit-{name}.bin")
+        return SharedRateLimiter(path, max_tokens, refill_rate, max_buckets=settings.rate_limit_max_clients)
+    return RateLimiter(max_tokens, refill_rate, max_buckets=settings.rate_limit_max_clients)
+
+
+__all__ = [
+    "EndpointCost",
+    "RateLimitDecision",
+    "RateLimiter",
+    "TokenBucket",
+    "create_rate_limiter",
+    "default_endpoint_costs",
+]
@@ -0,0 +1,35 @@
+"""Per-endpoint rate limit cost model."""
+
+from typing import Literal, NamedTuple
+
+BucketName = Literal["read", "write"]
+
+
+class EndpointCost(NamedTuple):
+    """Tokens an endpoint charges, and the bucket they are taken from."""
+    bucket: BucketName
+    base: float = 1.0
+    per_item: float = 0.0
+
+    def for_items(self, items: int = 0) -> float:
+        """Tokens charged for a request carrying ``items`` records."""
+        return self.base + self.per_item * items
+
+
+def default_endpoint_costs(bulk_item_cost: float = 1.0) -> dict[str, EndpointCost]:
+    """Cost model for the API routers, keyed by endpoint function name.
+
+    Reads and writes draw from separate buckets so leaderboard polling can
+    never starve submissions. Bulk uploads pay per item, which removes the
+    amplification of squeezing many scores into one request.
+    """
+    return {
+        "list_scores": EndpointCost("read"),
+        "get_score_rank": EndpointCost("read"),
+        "get_telemetry_rollups": EndpointCost("read"),
+        "submit_score": EndpointCost("write"),
+        "submit_telemetry": EndpointCost("write"),
+        "submit_scores_bulk": EndpointCost("write", base=0.0, per_item=bulk_item_cost),
+        # The opening charge admits the stream; its lines are paced per stored chunk.
+        "submit_scores_stream": EndpointCost("write", base=1.0, per_item=bulk_item_cost),
+    }
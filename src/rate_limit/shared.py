@@ -0,0 +1,183 @@
+"""Token buckets shared by every worker process on a host.
+
+Bucket state lives in a memory-mapped file so all uvicorn workers enforce a
+single budget per client without a network service. The file is a fixed
+table of 24-byte slots ``(fingerprint, tokens, last_refill)`` split into
+stripes; each update takes an ``fcntl`` byte-range lock on its stripe only,
+so workers contend only when they touch clients hashing to the same stripe.
+
+Times come from ``time.monotonic``, which is system-wide on Linux, so all
+processes on the host share one clock.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+from .token_bucket import RateLimitDecision, RateLimiter
+
+_MAGIC = b"TSRL0001"
+_HEADER = struct.Struct("<8sIIdd")  # magic, slots, stripes, max_tokens, refill_rate
+_HEADER_SIZE = 64
+_SLOT = struct.Struct("<Qdd")  # fingerprint (0 = empty), tokens, last refill
+# Slots examined per lookup before falling back to evicting the stalest one.
+_PROBE = 8
+
+
+def _fingerprint(client_id: str) -> int:
+    """Stable 64-bit client hash (``hash()`` is salted per process)."""
+    digest = hashlib.blake2b(client_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _write_empty_table(path: str, header: bytes, size: int) -> None:
+    """Replace ``path`` with a new zeroed table of ``size`` bytes.
+
+    The old file is never truncated: workers still mapping it (during a
+    rolling restart, say) would fault on the missing pages. They keep
+    using the orphaned table until they restart.
+    """
+    temp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(temp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.ftruncate(fd, size)
+        os.pwrite(fd, header, 0)
+    finally:
+        os.close(fd)
+    os.replace(temp, path)
+
+
+class SharedRateLimiter(RateLimiter):
+    """``RateLimiter`` whose buckets live in a file shared between processes.
+
+    The table holds ``max_buckets`` slots. When the probe window for a new
+    client is full, a fully refilled bucket is reused first, otherwise the
+    stalest one is evicted, mirroring the in-process limiter's policy.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_tokens: int = 30,
+        refill_rate: float = 0.5,
+        max_buckets: int = 100_000,
+        stripes: int = 64,
+    ):
+        super().__init__(max_tokens, refill_rate, max_buckets)
+        self.path = path
+        self.stripes = stripes
+        self._slots_per_stripe = max(_PROBE, -(-max_buckets // stripes))
+        self._slot_count = self._slots_per_stripe * stripes
+        size = _HEADER_SIZE + self._slot_count * _SLOT.size
+
+        expected = _HEADER.pack(_MAGIC, self._slot_count, stripes, float(max_tokens), float(refill_rate))
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                stat = os.fstat(fd)
+                # Another worker may have swapped in a new table while we waited.
+                current = stat.st_ino == os.stat(path).st_ino
+                if current and stat.st_size == size and os.pread(fd, _HEADER.size, 0) == expected:
+                    break
+                if current:
+                    # First worker (or changed settings): swap in an empty table.
+                    _write_empty_table(path, expected, size)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._fd = fd
+        self._map = mmap.mmap(self._fd, size)
+
+    def close(self) -> None:
+        """Unmap the table and close the file."""
+        self._map.close()
+        os.close(self._fd)
+
+    def _stripe_bounds(self, stripe: int) -> tuple[int, int]:
+        start = _HEADER_SIZE + stripe * self._slots_per_stripe * _SLOT.size
+        return start, self._slots_per_stripe * _SLOT.size
+
+    def _find_slot(self, fingerprint: int, now: float) -> tuple[int, bool]:
+        """Locate the slot for ``fingerprint`` within its (locked) stripe.
+
+        Returns:
+            (byte offset, whether the slot already belonged to this client)
+        """
+        stripe_start, _ = self._stripe_bounds(fingerprint % self.stripes)
+        first = (fingerprint // self.stripes) % self._slots_per_stripe
+        reusable = stalest = -1
+        stalest_time = float("inf")
+        for probe in range(_PROBE):
+            offset = stripe_start + ((first + probe) % self._slots_per_stripe) * _SLOT.size
+            owner, tokens, last_refill = _SLOT.unpack_from(self._map, offset)
+            if owner == fingerprint:
+                return offset, True
+            if owner == 0:
+                return offset, False
+            if reusable < 0 and (last_refill > now or tokens + (now - last_refill) * self.refill_rate >= self.max_tokens):
+                reusable = offset
+            if last_refill < stalest_time:
+                stalest, stalest_time = offset, last_refill
+        if reusable >= 0:
+            self.idle_evictions += 1
+            return reusable, False
+        self.capacity_evictions += 1
+        return stalest, False
+
+    def acquire(self, client_id: str, tokens: float = 1) -> RateLimitDecision:
+        """Refill the client's shared bucket once and try to take ``tokens`` from it."""
+        fingerprint = _fingerprint(client_id)
+        start, length = self._stripe_bounds(fingerprint % self.stripes)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+        try:
+            now = time.monotonic()
+            offset, existing = self._find_slot(fingerprint, now)
+            available = float(self.max_tokens)
+            if existing:
+                _, stored, last_refill = _SLOT.unpack_from(self._map, offset)
+                # A refill time ahead of the clock means the table predates a reboot.
+                if last_refill <= now:
+                    available = min(available, stored + (now - last_refill) * self.refill_rate)
+
+            if available >= tokens:
+                available -= tokens
+                decision = RateLimitDecision(True, int(available), 0.0)
+            else:
+                decision = RateLimitDecision(False, int(available), (tokens - available) / self.refill_rate)
+            _SLOT.pack_into(self._map, offset, fingerprint, available, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+        return decision
+
+    def get_remaining_tokens(self, client_id: str) -> int:
+        """Get remaining tokens for a client without consuming any."""
+        fingerprint = _fingerprint(client_id)
+        now = time.monotonic()
+        stripe_start, _ = self._stripe_bounds(fingerprint % self.stripes)
+        first = (fingerprint // self.stripes) % self._slots_per_stripe
+        for probe in range(_PROBE):
+            offset = stripe_start + ((first + probe) % self._slots_per_stripe) * _SLOT.size
+            owner, stored, last_refill = _SLOT.unpack_from(self._map, offset)
+            if owner == fingerprint and last_refill <= now:
+                return int(min(self.max_tokens, stored + (now - last_refill) * self.refill_rate))
+        return self.max_tokens
+
+    def clear(self) -> None:
+        """Forget every client in every process sharing the table."""
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            self._map[_HEADER_SIZE:] = bytes(len(self._map) - _HEADER_SIZE)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        """Number of occupied slots (a full scan; meant for metrics, not hot paths)."""
+        return sum(
+            1
+            for (owner, _, _) in _SLOT.iter_unpack(self._map[_HEADER_SIZE:])
+            if owner
+        )
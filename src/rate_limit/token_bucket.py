@@ -1,11 +1,24 @@
 """Simple token bucket rate limiter implementation."""
 
+import sys
 import time
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class RateLimitDecision(NamedTuple):
+    """Outcome of a single refill-and-consume step."""
+    allowed: bool
+    remaining: int
+    retry_after: float
 
 
 class TokenBucket:
     """Token bucket rate limiter for API endpoints."""
 
+    __slots__ = ("max_tokens", "refill_rate", "tokens", "last_refill")
+
     def __init__(self, max_tokens: int = 30, refill_rate: float = 0.5):
         """Initialize token bucket.
 
@@ -16,11 +29,11 @@ class TokenBucket:
         self.max_tokens = max_tokens
         self.refill_rate = refill_rate
         self.tokens = float(max_tokens)
-        self.last_refill = time.time()
+        self.last_refill = time.monotonic()
 
     def _refill(self) -> None:
         """Refill tokens based on time elapsed."""
-        now = time.time()
+        now = time.monotonic()
         elapsed = now - self.last_refill
         self.tokens = min(self.max_tokens, self.tokens + elapsed * self.refill_rate)
         self.last_refill = now
@@ -48,35 +61,112 @@ class TokenBucket:
 
 
 class RateLimiter:
-    """Rate limiter using token buckets per client identifier."""
+    """Rate limiter using token buckets per client identifier.
 
-    def __init__(self, max_tokens: int = 30, refill_rate: float = 0.5):
+    Bucket state lives in two parallel ``array('d')`` columns (tokens and
+    last refill time on the monotonic clock) indexed by a slot number, so a
+    client costs one dict entry plus 16 bytes instead of a bucket object.
+    Freed slots are reused.
+
+    Slots are kept in least-recently-used order and bounded by
+    ``max_buckets``. Buckets that have fully refilled are dropped as they
+    reach the LRU end, since they are indistinguishable from a fresh bucket;
+    if the cap is still exceeded the least recently used bucket is evicted.
+    """
+
+    # Idle buckets examined per call, keeping eviction work O(1) per request.
+    IDLE_SWEEP = 2
+
+    def __init__(self, max_tokens: int = 30, refill_rate: float = 0.5, max_buckets: int = 100_000):
         self.max_tokens = max_tokens
         self.refill_rate = refill_rate
-        self._buckets: dict[str, TokenBucket] = {}
+        self.max_buckets = max_buckets
+        self.idle_evictions = 0
+        self.capacity_evictions = 0
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._tokens = array("d")
+        self._last_refill = array("d")
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def clear(self) -> None:
+        """Forget every client."""
+        self._slots.clear()
+        self._tokens = array("d")
+        self._last_refill = array("d")
+        self._free.clear()
+
+    def _allocate(self, client_id: str, now: float) -> int:
+        """Create a full bucket for a new client and return its slot."""
+        if self._free:
+            slot = self._free.pop()
+            self._tokens[slot] = float(self.max_tokens)
+            self._last_refill[slot] = now
+        else:
+            slot = len(self._tokens)
+            self._tokens.append(float(self.max_tokens))
+            self._last_refill.append(now)
+        self._slots[sys.intern(client_id)] = slot
+        return slot
+
+    def _evict(self, now: float, keep: int) -> None:
+        """Drop refilled buckets at the LRU end, then enforce the bucket cap."""
+        slots = self._slots
+        tokens = self._tokens
+        last_refill = self._last_refill
+        for _ in range(self.IDLE_SWEEP):
+            oldest_id, oldest = next(iter(slots.items()))
+            if oldest == keep or tokens[oldest] + (now - last_refill[oldest]) * self.refill_rate < self.max_tokens:
+                break
+            del slots[oldest_id]
+            self._free.append(oldest)
+            self.idle_evictions += 1
+
+        while len(slots) > self.max_buckets:
+            _, oldest = slots.popitem(last=False)
+            self._free.append(oldest)
+            self.capacity_evictions += 1
+
+    def acquire(self, client_id: str, tokens: float = 1) -> RateLimitDecision:
+        """Refill the client's bucket once and try to take ``tokens`` from it."""
+        now = time.monotonic()
+        slot = self._slots.get(client_id)
+        if slot is None:
+            slot = self._allocate(client_id, now)
+        else:
+            self._slots.move_to_end(client_id)
+
+        available = self._tokens[slot] + (now - self._last_refill[slot]) * self.refill_rate
+        if available > self.max_tokens:
+            available = float(self.max_tokens)
+        self._last_refill[slot] = now
+
+        if available >= tokens:
+            available -= tokens
+            decision = RateLimitDecision(True, int(available), 0.0)
+        else:
+            decision = RateLimitDecision(False, int(available), (tokens - available) / self.refill_rate)
+        self._tokens[slot] = available
 
-    def check_rate_limit(self, client_id: str, tokens: int = 1) -> tuple[bool, float]:
+        self._evict(now, slot)
+        return decision
+
+    def check_rate_limit(self, client_id: str, tokens: float = 1) -> tuple[bool, float]:
         """Check if client can proceed or should be rate limited.
 
         Returns:
             (allowed, retry_after_seconds)
         """
-        if client_id not in self._buckets:
-            self._buckets[client_id] = TokenBucket(self.max_tokens, self.refill_rate)
-
-        bucket = self._buckets[client_id]
-
-        if bucket.consume(tokens):
-            return True, 0.0
-        else:
-            retry_after = bucket.get_wait_time(tokens)
-            return False, retry_after
+        decision = self.acquire(client_id, tokens)
+        return decision.allowed, decision.retry_after
 
     def get_remaining_tokens(self, client_id: str) -> int:
-        """Get remaining tokens for a client."""
-        if client_id not in self._buckets:
+        """Get remaining tokens for a client without consuming any."""
+        slot = self._slots.get(client_id)
+        if slot is None:
             return self.max_tokens
 
-        bucket = self._buckets[client_id]
-        bucket._refill()
-        return int(bucket.tokens)
+        elapsed = time.monotonic() - self._last_refill[slot]
+        return int(min(self.max_tokens, self._tokens[slot] + elapsed * self.refill_rate))
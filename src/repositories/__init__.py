@@ -1,6 +1,37 @@
 """Repository layer for data persistence abstractions."""
 
+from ..config import Settings
 from .base import ScoreRepository
+from .columnar import ColumnarScoreRepository
+from .cursor import InvalidCursorError
+from .dedup import DedupIndex, IdempotencyConflictError, idempotency_key
+from .journal import ScoreJournal
 from .memory import MemoryScoreRepository
+from .sqlite import SqliteScoreRepository, database_path_from_url
 
-__all__ = ["ScoreRepository", "MemoryScoreRepository"]
+
+def create_repository(settings: Settings) -> ScoreRepository:
+    """Build the score repository selected by ``SCORE_BACKEND``."""
+    if settings.score_backend == "sqlite":
+        return SqliteScoreRepository(database_path_from_url(settings.database_url))
+    journal = None
+    if settings.journal_dir:
+        journal = ScoreJournal(settings.journal_dir, settings.journal_snapshot_every, settings.journal_fsync)
+    if settings.score_backend == "columnar":
+        return ColumnarScoreRepository(journal)
+    # One row past the retained records lets the service detect a further page.
+    return MemoryScoreRepository(journal, index_capacity=settings.max_records + 1)
+
+
+__all__ = [
+    "ScoreRepository",
+    "MemoryScoreRepository",
+    "SqliteScoreRepository",
+    "ColumnarScoreRepository",
+    "ScoreJournal",
+    "DedupIndex",
+    "idempotency_key",
+    "IdempotencyConflictError",
+    "InvalidCursorError",
+    "create_repository",
+]
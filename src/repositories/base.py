@@ -1,28 +1,130 @@
 """Base repository interface for score storage."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from datetime import datetime
 from typing import Optional
+from uuid import uuid4
 
-from ..models import Score, ScoreInput
+from ..models import ScoreInput
+from .cursor import RankKey, encode_cursor
+from .record import ScoreRecord
+from .windows import Window, window_start
+
+
+def new_record(score_input: ScoreInput, created_us: int) -> ScoreRecord:
+    """Build the record to store for an already validated input."""
+    return ScoreRecord.from_input(str(uuid4()), score_input, created_us)
 
 
 class ScoreRepository(ABC):
-    """Abstract base class for score storage repositories."""
+    """Abstract base class for score storage repositories.
+
+    Repositories deal in compact ``ScoreRecord`` objects; conversion to the
+    ``Score`` API model happens in the service layer.
+    """
+
+    def close(self) -> None:
+        """Release files, connections and threads held by the repository."""
 
     @abstractmethod
-    async def create_score(self, score_input: ScoreInput) -> Score:
+    async def create_score(self, score_input: ScoreInput) -> ScoreRecord:
         """Create and store a new score entry."""
         pass
 
+    async def create_scores(self, score_inputs: Sequence[ScoreInput]) -> list[ScoreRecord]:
+        """Create and store a batch of scores, returned in input order.
+
+        Implementations should store the whole batch in one write (one
+        transaction, one journal append, one index update). This fallback
+        inserts one score at a time.
+        """
+        return [await self.create_score(score_input) for score_input in score_inputs]
+
     @abstractmethod
     async def get_scores(
         self,
         limit: int = 10,
         cursor: Optional[str] = None,
         since: Optional[datetime] = None
-    ) -> list[Score]:
-        """Retrieve scores with optional filtering and pagination."""
+    ) -> list[ScoreRecord]:
+        """Retrieve scores with optional filtering and pagination.
+
+        Scores are ordered by points desc, created_at desc, then id. ``cursor``
+        is an opaque token from ``cursor.encode_cursor``; implementations must
+        seek to the first score ranked strictly after the key it encodes and
+        raise ``InvalidCursorError`` when it cannot be decoded.
+        """
+        pass
+
+    async def get_filtered_scores(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        tag: Optional[str] = None,
+        platform: Optional[str] = None
+    ) -> list[ScoreRecord]:
+        """Retrieve scores carrying ``tag`` and/or submitted from ``platform``.
+
+        Ordering and cursors are those of ``get_scores``. Implementations
+        may keep secondary indexes; this fallback walks the leaderboard in
+        batches and filters each one.
+        """
+        if tag is None and platform is None:
+            return await self.get_scores(limit=limit, cursor=cursor, since=since)
+        page: list[ScoreRecord] = []
+        batch_size = max(limit * 4, 100)
+        while True:
+            batch = await self.get_scores(limit=batch_size, cursor=cursor, since=since)
+            for record in batch:
+                if record.matches(tag, platform):
+                    page.append(record)
+                    if len(page) == limit:
+                        return page
+            if len(batch) < batch_size:
+                return page
+            cursor = encode_cursor(batch[-1])
+
+    async def get_window_scores(
+        self,
+        window: Window,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> list[ScoreRecord]:
+        """Retrieve one page of a time-windowed leaderboard (see ``windows.window_start``).
+
+        Implementations may keep per-window structures so these reads do not
+        depend on the size of the history. This fallback filters by the
+        window start through ``get_scores``.
+        """
+        return await self.get_scores(limit=limit, cursor=cursor, since=window_start(window))
+
+    @abstractmethod
+    async def get_score(self, score_id: str) -> Optional[ScoreRecord]:
+        """Look up one stored score by id."""
+        pass
+
+    @abstractmethod
+    async def get_rank(self, key: RankKey) -> tuple[int, int]:
+        """Count the ranked scores placed before ``key``.
+
+        ``key`` is a rank key as built by ``cursor.rank_key``; a score equal
+        to it is not counted. Suspect scores are withheld from ranking and
+        excluded from both counts.
+
+        Returns:
+            (ranked scores placed before ``key``, ranked scores in total)
+        """
+        pass
+
+    @abstractmethod
+    async def get_version(self) -> int:
+        """Get the leaderboard version.
+
+        The version increases whenever scores are added or removed, so an
+        unchanged version guarantees an unchanged leaderboard.
+        """
         pass
 
     @abstractmethod
@@ -31,6 +133,21 @@ class ScoreRepository(ABC):
         pass
 
     @abstractmethod
-    async def cleanup_old_scores(self, retention_days: int = 14, max_records: int = 100) -> int:
-        """Remove old scores based on retention policy. Returns number of removed scores."""
+    async def expire_scores(
+        self,
+        retention_days: int = 14,
+        max_records: int = 100,
+        limit: Optional[int] = None
+    ) -> int:
+        """Remove up to ``limit`` scores that fall outside the retention policy.
+
+        A score expires once it is older than ``retention_days``, except that
+        the ``max_records`` most recent scores are always kept. The oldest
+        scores go first, so a bounded ``limit`` lets callers reclaim a large
+        backlog in small slices. Returns the number of removed scores.
+        """
         pass
+
+    async def cleanup_old_scores(self, retention_days: int = 14, max_records: int = 100) -> int:
+        """Remove every score outside the retention policy. Returns number of removed scores."""
+        return await self.expire_scores(retention_days, max_records)
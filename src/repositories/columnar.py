@@ -0,0 +1,290 @@
+"""Columnar score repository backed by NumPy arrays.
+
+Numeric fields live in growable NumPy columns indexed by row number, next
+to a list of ``ScoreRecord`` objects for the string fields, so full scans
+(``since`` filters, top-N selection, statistics) run as vectorized array
+operations instead of Python loops. NumPy is an optional dependency
+(``pip install tetris-web[columnar]``); this module imports without it and
+the repository raises ``RuntimeError`` when constructed.
+"""
+
+import time
+from bisect import bisect_left, insort
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from itertools import compress
+from typing import Any, Optional
+
+try:
+    import numpy as np
+    _HAVE_NUMPY = True
+except ImportError:  # pragma: no cover - exercised only without numpy
+    _HAVE_NUMPY = False
+
+from ..models import ScoreInput
+from .base import ScoreRepository, new_record
+from .cursor import RankKey, cursor_rank_key, decode_cursor, rank_key, to_epoch_us
+from .journal import ScoreJournal, gc_paused
+from .memory import _delete_positions
+from .record import ScoreRecord, now_us
+
+_DAY_US = 86_400_000_000
+_INITIAL_CAPACITY = 1024
+# Numeric columns and the record attribute each one mirrors.
+_COLUMNS = {
+    "points": "points",
+    "lines": "lines",
+    "level_reached": "level_reached",
+    "duration_seconds": "duration_seconds",
+    "created_us": "created_us",
+    "suspect": "suspect",
+}
+
+
+class ColumnarScoreRepository(ScoreRepository):
+    """Score storage with NumPy columns for analytics and bulk range queries.
+
+    Rows are kept in insertion order; leaderboard reads select the top rows
+    with a partial sort (``np.partition``) of the matching rows and only
+    fully order the selected page. Rank lookups bisect a sorted list of the
+    rank keys of non-suspect scores, as in ``MemoryScoreRepository``. Like
+    it, the repository can be backed by a ``ScoreJournal`` for durability.
+    """
+
+    def __init__(self, journal: Optional[ScoreJournal] = None) -> None:
+        if not _HAVE_NUMPY:
+            raise RuntimeError("The columnar score backend requires numpy (pip install 'tetris-web[columnar]')")
+        self._journal = journal
+        self._size = 0
+        self._columns: dict[str, Any] = {
+            name: np.zeros(_INITIAL_CAPACITY, dtype=np.bool_ if name == "suspect" else np.int64)
+            for name in _COLUMNS
+        }
+        self._records: list[ScoreRecord] = []
+        self._by_id: dict[str, ScoreRecord] = {}
+        self._ranked_keys: list[RankKey] = []
+        # Seeded from the clock so versions keep increasing across restarts.
+        self._version = time.time_ns() // 1000
+        if journal is not None:
+            with gc_paused():
+                self._append(journal.load())
+
+    def close(self) -> None:
+        """Close the journal, if any."""
+        if self._journal is not None:
+            self._journal.close()
+
+    def _append(self, records: Sequence[ScoreRecord]) -> None:
+        """Add rows for ``records``, growing the columns geometrically."""
+        count = len(records)
+        if not count:
+            return
+        start = self._size
+        end = start + count
+        capacity = len(self._columns["points"])
+        if end > capacity:
+            while capacity < end:
+                capacity *= 2
+            for name, column in self._columns.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:start] = column[:start]
+                self._columns[name] = grown
+        for name, attribute in _COLUMNS.items():
+            self._columns[name][start:end] = [getattr(record, attribute) for record in records]
+        self._records.extend(records)
+        self._by_id.update((record.id, record) for record in records)
+        self._size = end
+        keys = [rank_key(record) for record in records if not record.suspect]
+        if len(keys) == 1:
+            insort(self._ranked_keys, keys[0])
+        elif keys:
+            # Sorting merges the new run into the already sorted keys.
+            self._ranked_keys.extend(keys)
+            self._ranked_keys.sort()
+
+    def column(self, name: str) -> Any:
+        """Return a read-only view of one column over the stored rows.
+
+        Valid names are ``points``, ``lines``, ``level_reached``,
+        ``duration_seconds``, ``created_us`` and ``suspect``.
+        """
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def _since_mask(self, since: Optional[datetime]) -> Any:
+        if since is None:
+            return np.ones(self._size, dtype=np.bool_)
+        return self.column("created_us") >= to_epoch_us(since)
+
+    async def create_score(self, score_input: ScoreInput) -> ScoreRecord:
+        """Create a new score record."""
+        return (await self.create_scores([score_input]))[0]
+
+    async def create_scores(self, score_inputs: Sequence[ScoreInput]) -> list[ScoreRecord]:
+        """Create a batch of score records with one journal append and one column write."""
+        created_us = now_us()
+        records = [new_record(score_input, created_us) for score_input in score_inputs]
+        if not records:
+            return records
+        if self._journal is not None:
+            await self._journal.append(records)
+        self._append(records)
+        if self._journal is not None:
+            self._journal.applied(records)
+        self._version += len(records)
+        await self._maybe_snapshot()
+        return records
+
+    async def _maybe_snapshot(self, force: bool = False) -> None:
+        """Compact the journal once enough records were appended since the last snapshot."""
+        journal = self._journal
+        if journal is None:
+            return
+        if force or journal.records_since_snapshot >= journal.snapshot_every:
+            await journal.write_snapshot(self._records)
+
+    async def get_scores(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> list[ScoreRecord]:
+        """List scores with optional filtering and pagination."""
+        if limit <= 0 or not self._size:
+            return []
+        mask = self._since_mask(since)
+        if cursor:
+            mask &= self._after_mask(cursor)
+        rows = np.flatnonzero(mask)
+        return self._top(rows, limit)
+
+    def _after_mask(self, cursor: str) -> Any:
+        """Rows ranked strictly after the cursor key."""
+        after = cursor_rank_key(decode_cursor(cursor))
+        points = self.column("points")
+        created = self.column("created_us")
+        key_points, key_created = -after[0], -after[1]
+        mask = (points < key_points) | ((points == key_points) & (created < key_created))
+        # Rows sharing points and timestamp with the key are ordered by id.
+        for row in np.flatnonzero((points == key_points) & (created == key_created)).tolist():
+            mask[row] = rank_key(self._records[row]) > after
+        return mask
+
+    def _top(self, rows: Any, limit: int) -> list[ScoreRecord]:
+        """Return the ``limit`` best-ranked of ``rows`` in leaderboard order."""
+        if len(rows) > limit:
+            rows = self._select(rows, "points", limit)
+            if len(rows) > limit:
+                # The page boundary falls inside a run of equal points.
+                points = self._columns["points"][rows]
+                boundary = points.min()
+                above = rows[points > boundary]
+                tied = self._select(rows[points == boundary], "created_us", limit - len(above))
+                rows = np.concatenate((above, tied))
+        records = self._records
+        page = sorted((records[row] for row in rows.tolist()), key=rank_key)
+        return page[:limit]
+
+    def _select(self, rows: Any, name: str, count: int) -> Any:
+        """Rows holding the ``count`` largest values of a column, plus any ties with the smallest of them."""
+        values = self._columns[name][rows]
+        kth = len(values) - count
+        threshold = np.partition(values, kth)[kth]
+        return rows[values >= threshold]
+
+    async def get_score(self, score_id: str) -> Optional[ScoreRecord]:
+        """Look up one stored score by id."""
+        return self._by_id.get(score_id)
+
+    async def get_rank(self, key: RankKey) -> tuple[int, int]:
+        """Count ranked scores before ``key`` with one bisection."""
+        return bisect_left(self._ranked_keys, key), len(self._ranked_keys)
+
+    async def get_version(self) -> int:
+        """Get the leaderboard version."""
+        return self._version
+
+    async def get_score_count(self) -> int:
+        """Get total number of scores."""
+        return self._size
+
+    async def expire_scores(
+        self,
+        retention_days: int = 14,
+        max_records: int = 100,
+        limit: Optional[int] = None
+    ) -> int:
+        """Select the oldest expired rows with one vectorized pass and compact the columns."""
+        removable = self._size - max_records
+        if limit is not None:
+            removable = min(removable, limit)
+        if removable <= 0:
+            return 0
+        created = self.column("created_us")
+        cutoff_us = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=retention_days))
+        expired = np.flatnonzero(created < cutoff_us)
+        if len(expired) > removable:
+            expired = expired[np.argpartition(created[expired], removable - 1)[:removable]]
+        if not len(expired):
+            return 0
+
+        size = self._size
+        keep = np.ones(size, dtype=np.bool_)
+        keep[expired] = False
+        kept = size - len(expired)
+        # Compact each column in place; the masked copy runs in C.
+        for column in self._columns.values():
+            column[:kept] = column[:size][keep]
+        records = self._records
+        expired_keys = []
+        for row in expired.tolist():
+            record = records[row]
+            del self._by_id[record.id]
+            if not record.suspect:
+                expired_keys.append(rank_key(record))
+        ranked = self._ranked_keys
+        self._ranked_keys = _delete_positions(ranked, sorted(bisect_left(ranked, key) for key in expired_keys))
+        self._records = list(compress(records, keep.tolist()))
+        self._size = kept
+        self._version += len(expired)
+        await self._maybe_snapshot()
+        return len(expired)
+
+    async def cleanup_old_scores(self, retention_days: int = 14, max_records: int = 100) -> int:
+        """Remove every score outside the retention policy. Returns number of removed scores."""
+        removed = await self.expire_scores(retention_days, max_records)
+        if removed:
+            # Rewrite the snapshot so removed scores are not replayed on restart.
+            await self._maybe_snapshot(force=True)
+        return removed
+
+    def points_histogram(self, bins: int = 20, since: Optional[datetime] = None) -> tuple[list[int], list[float]]:
+        """Distribution of points as ``(counts, bin_edges)`` with ``bins`` equal-width bins."""
+        counts, edges = np.histogram(self.column("points")[self._since_mask(since)], bins=bins)
+        return counts.tolist(), edges.tolist()
+
+    def daily_counts(self, since: Optional[datetime] = None) -> dict[str, int]:
+        """Number of scores accepted per UTC day, keyed by ISO date."""
+        days, counts = np.unique(self.column("created_us")[self._since_mask(since)] // _DAY_US, return_counts=True)
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        return {
+            (epoch + timedelta(days=day)).date().isoformat(): count
+            for day, count in zip(days.tolist(), counts.tolist())
+        }
+
+    def points_by_duration(
+        self,
+        bucket_seconds: int = 60,
+        since: Optional[datetime] = None
+    ) -> list[tuple[int, int, float]]:
+        """Group scores by run duration as ``(bucket_start_seconds, count, mean_points)`` rows."""
+        mask = self._since_mask(since)
+        buckets = self.column("duration_seconds")[mask] // bucket_seconds
+        points = self.column("points")[mask]
+        starts, inverse, counts = np.unique(buckets, return_inverse=True, return_counts=True)
+        sums = np.bincount(inverse, weights=points, minlength=len(starts))
+        return [
+            (start * bucket_seconds, count, total / count)
+            for start, count, total in zip(starts.tolist(), counts.tolist(), sums.tolist())
+        ]
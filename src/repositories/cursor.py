@@ -0,0 +1,116 @@
+"""Opaque keyset cursors for leaderboard pagination.
+
+A cursor records the rank key of the last score on a page, i.e. its
+``(points, created_at, id)``. Repositories seek to the first entry that
+ranks strictly after that key, so pages stay stable when new scores are
+inserted above the cursor and no offset ever has to be skipped.
+
+Tokens are ``<payload>.<signature>`` in URL-safe base64, where the
+signature is a truncated HMAC-SHA256 over the payload.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import NamedTuple
+
+from ..config import get_settings
+from .record import ScoreRecord
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_SIGNATURE_BYTES = 12
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or was not issued by this server."""
+
+
+class CursorKey(NamedTuple):
+    """Rank key of the last score on the previous page."""
+    points: int
+    created_us: int
+    id: str
+
+
+# Ascending sort key that yields leaderboard order: points desc, created_at desc, id asc.
+RankKey = tuple[int, int, str]
+
+
+def to_epoch_us(value: datetime) -> int:
+    """Convert a datetime into integer epoch microseconds (naive values are UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def rank_key(record: ScoreRecord) -> RankKey:
+    """Build the ascending sort key that places ``record`` in leaderboard order."""
+    return (-record.points, -record.created_us, record.id)
+
+
+def cursor_rank_key(cursor: CursorKey) -> RankKey:
+    """Rank key of the score a cursor points at."""
+    return (-cursor.points, -cursor.created_us, cursor.id)
+
+
+@lru_cache(maxsize=1)
+def _signing_key() -> bytes:
+    secret = get_settings().secret_key
+    if secret:
+        return secret.encode("utf-8")
+    logger.warning("SECRET_KEY is not set; pagination cursors are only valid for this process")
+    return secrets.token_bytes(32)
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(_signing_key(), payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+
+def encode_cursor(record: ScoreRecord) -> str:
+    """Build the cursor that resumes the leaderboard right after ``record``."""
+    payload = json.dumps(
+        [record.points, record.created_us, record.id],
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload))}"
+
+
+def decode_cursor(token: str) -> CursorKey:
+    """Verify and decode a cursor token.
+
+    Raises:
+        InvalidCursorError: if the token is malformed or its signature does not match
+    """
+    try:
+        encoded_payload, encoded_signature = token.split(".", 1)
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except ValueError as exc:
+        raise InvalidCursorError("Malformed pagination cursor") from exc
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidCursorError("Invalid pagination cursor")
+
+    try:
+        points, created_us, score_id = json.loads(payload)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursorError("Malformed pagination cursor") from exc
+    if not (isinstance(points, int) and isinstance(created_us, int) and isinstance(score_id, str)):
+        raise InvalidCursorError("Malformed pagination cursor")
+    return CursorKey(points, created_us, score_id)
@@ -0,0 +1,191 @@
+"""Idempotency keys and the bounded index that recognises repeated submissions."""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Optional
+
+from ..models import ScoreInput
+from .record import ScoreRecord
+
+
+class IdempotencyConflictError(ValueError):
+    """Raised when an explicit idempotency key is reused for a different payload.
+
+    ``indices`` are the positions, within the submitted batch, of the inputs
+    whose key is already bound to another payload. Nothing is stored when
+    this is raised.
+    """
+
+    def __init__(self, indices: Sequence[int]) -> None:
+        super().__init__("Idempotency key was already used for a different payload")
+        self.indices = list(indices)
+
+
+def payload_digest(score_input: ScoreInput) -> str:
+    """Return a digest of every field of ``score_input`` except its idempotency key."""
+    client = score_input.client
+    parts = (
+        score_input.nickname,
+        str(score_input.points),
+        str(score_input.lines or 0),
+        str(score_input.level_reached or 0),
+        str(score_input.duration_seconds or 0),
+        score_input.seed or "",
+        "\x1e".join(score_input.tags or ()),
+        client.version or "" if client else "",
+        client.platform or "" if client else "",
+        client.ua or "" if client else "",
+    )
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def idempotency_key(score_input: ScoreInput) -> str:
+    """Return the key identifying ``score_input`` across retries.
+
+    A client-supplied ``idempotencyKey`` wins. Otherwise the key is derived
+    from every field of the payload, so a resent payload maps to the same
+    key even from clients that do not send one.
+    """
+    if score_input.idempotency_key:
+        return "k:" + score_input.idempotency_key
+    return "d:" + payload_digest(score_input)
+
+
+class DedupIndex:
+    """Time-windowed map from idempotency key to the score it created.
+
+    Keys expire ``ttl_seconds`` after the score was stored and the index
+    never holds more than ``max_entries`` keys (oldest dropped first), so
+    memory stays bounded during reconnect storms. Submissions still in
+    flight are tracked too, so concurrent retries of one payload wait for
+    the first write instead of racing it. Each key also remembers a digest
+    of its payload, so an explicit key reused for another payload is
+    refused instead of resolving to the wrong score.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl_seconds: float = 86_400.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self._entries: OrderedDict[str, tuple[float, str, ScoreRecord]] = OrderedDict()
+        self._in_flight: dict[str, tuple[str, asyncio.Future[ScoreRecord]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Forget every key."""
+        self._entries.clear()
+
+    def get(self, key: str) -> Optional[ScoreRecord]:
+        """Return the score stored under ``key`` if it is still inside the window."""
+        entry = self._entry(key)
+        return entry[2] if entry is not None else None
+
+    def _entry(self, key: str) -> Optional[tuple[float, str, ScoreRecord]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def put(self, key: str, score: ScoreRecord, digest: str = "") -> None:
+        """Remember that ``key`` created ``score`` from the payload with ``digest``."""
+        now = time.monotonic()
+        entries = self._entries
+        entries[key] = (now + self.ttl_seconds, digest, score)
+        entries.move_to_end(key)
+        # Entries are in insertion order and share one TTL, so expired keys sit at the front.
+        while entries and (len(entries) > self.max_entries or next(iter(entries.values()))[0] <= now):
+            entries.popitem(last=False)
+
+    async def create_once(
+        self,
+        score_inputs: Sequence[ScoreInput],
+        store: Callable[[list[ScoreInput]], Awaitable[list[ScoreRecord]]],
+    ) -> tuple[list[ScoreRecord], list[ScoreRecord]]:
+        """Store the inputs not seen before through ``store``.
+
+        Repeats within the batch, within the window, or still in flight
+        resolve to the original score.
+
+        Returns:
+            (a score for every input in order, the scores newly stored)
+
+        Raises:
+            IdempotencyConflictError: an explicit key is already bound to a
+                different payload; nothing is stored.
+        """
+        results: list[Optional[ScoreRecord]] = [None] * len(score_inputs)
+        waiting: list[tuple[int, asyncio.Future[ScoreRecord]]] = []
+        fresh_inputs: list[ScoreInput] = []
+        fresh_keys: list[str] = []
+        fresh_digests: list[str] = []
+        positions: dict[str, tuple[str, list[int]]] = {}
+        conflicts: list[int] = []
+        hits = 0
+
+        for index, score_input in enumerate(score_inputs):
+            key = idempotency_key(score_input)
+            # A derived key already covers the whole payload.
+            digest = payload_digest(score_input) if score_input.idempotency_key else ""
+            existing = self._entry(key)
+            if existing is not None:
+                if existing[1] != digest:
+                    conflicts.append(index)
+                hits += 1
+                results[index] = existing[2]
+            elif key in positions:
+                if positions[key][0] != digest:
+                    conflicts.append(index)
+                hits += 1
+                positions[key][1].append(index)
+            elif key in self._in_flight:
+                if self._in_flight[key][0] != digest:
+                    conflicts.append(index)
+                hits += 1
+                waiting.append((index, self._in_flight[key][1]))
+            else:
+                positions[key] = (digest, [index])
+                fresh_inputs.append(score_input)
+                fresh_keys.append(key)
+                fresh_digests.append(digest)
+        if conflicts:
+            raise IdempotencyConflictError(conflicts)
+        self.hits += hits
+
+        stored: list[ScoreRecord] = []
+        if fresh_inputs:
+            loop = asyncio.get_running_loop()
+            futures = [loop.create_future() for _ in fresh_keys]
+            self._in_flight.update(zip(fresh_keys, zip(fresh_digests, futures)))
+            try:
+                stored = await store(fresh_inputs)
+            except BaseException as exc:
+                for future in futures:
+                    if isinstance(exc, Exception):
+                        future.set_exception(exc)
+                        # Mark retrieved so a failure nobody waited on is not logged.
+                        future.exception()
+                    else:
+                        future.cancel()
+                raise
+            finally:
+                for key in fresh_keys:
+                    self._in_flight.pop(key, None)
+            for key, digest, future, score in zip(fresh_keys, fresh_digests, futures, stored):
+                self.put(key, score, digest)
+                future.set_result(score)
+                for index in positions[key][1]:
+                    results[index] = score
+
+        for index, future in waiting:
+            results[index] = await asyncio.shield(future)
+        scores = [score for score in results if score is not None]
+        assert len(scores) == len(results), "every input resolves to a stored or repeated score"
+        return scores, stored
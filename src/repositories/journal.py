@@ -0,0 +1,446 @@
+"""Append-only journal and snapshots that make the in-memory repository durable.
+
+Every accepted score is appended to ``scores.log`` as a length-prefixed,
+CRC-checked binary record. Appends issued while a write is in flight are
+coalesced into the next write, so concurrent requests share one fsync
+(group commit). Periodically the full resident set is written to
+``scores.snap`` and the log is truncated; startup replays the snapshot and
+then the log tail.
+
+Snapshots store each field as one column and encode the columns with
+``marshal``, so loading them is a single C-level decode plus one
+``ScoreRecord`` construction per score instead of a Python parse loop per
+record. The snapshot is framed and CRC-checked like log records; the
+older per-record snapshot layout is still read.
+"""
+
+import asyncio
+import gc
+import logging
+import marshal
+import os
+import struct
+import sys
+import zlib
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import BinaryIO, Optional
+
+from ..models import ClientInfo
+from .record import ScoreRecord, shared_client
+
+logger = logging.getLogger(__name__)
+
+LOG_NAME = "scores.log"
+SNAPSHOT_NAME = "scores.snap"
+_LOG_MAGIC = b"TSLOG001"
+_SNAPSHOT_MAGIC = b"TSSNP001"
+_COLUMNAR_SNAPSHOT_MAGIC = b"TSSNP002"
+
+_FRAME = struct.Struct("<II")  # payload length, crc32
+_FIXED = struct.Struct("<qIIIq?B")  # points, lines, level, duration, created_us, suspect, tag count
+_STR_LEN = struct.Struct("<H")
+_NONE = 0xFFFF
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Suspend the cyclic garbage collector while a replay builds millions of records.
+
+    Records hold no reference cycles, but every allocation counts towards
+    the collector's thresholds, and the full collections they trigger scan
+    the whole growing heap: left on, collection dominates replay time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _fsync_directory(directory: str) -> None:
+    """Make a rename or file creation inside ``directory`` durable."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _pack_str(out: bytearray, value: Optional[str]) -> None:
+    if value is None:
+        out += _STR_LEN.pack(_NONE)
+        return
+    raw = value.encode("utf-8")
+    out += _STR_LEN.pack(len(raw))
+    out += raw
+
+
+def encode_record(record: ScoreRecord) -> bytes:
+    """Encode one score as a framed journal record."""
+    tags = record.tags
+    client = record.client
+    payload = bytearray(_FIXED.pack(
+        record.points,
+        record.lines,
+        record.level_reached,
+        record.duration_seconds,
+        record.created_us,
+        record.suspect,
+        len(tags),
+    ))
+    _pack_str(payload, record.id)
+    _pack_str(payload, record.nickname)
+    _pack_str(payload, record.seed)
+    if client is None:
+        payload += _STR_LEN.pack(_NONE)
+    else:
+        payload += _STR_LEN.pack(0)
+        _pack_str(payload, client.version)
+        _pack_str(payload, client.platform)
+        _pack_str(payload, client.ua)
+    for tag in tags:
+        _pack_str(payload, tag)
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _unpack_str(buf: bytes, offset: int) -> tuple[Optional[str], int]:
+    (length,) = _STR_LEN.unpack_from(buf, offset)
+    offset += _STR_LEN.size
+    if length == _NONE:
+        return None, offset
+    return buf[offset:offset + length].decode("utf-8"), offset + length
+
+
+def _decode_payload(buf: bytes, offset: int) -> ScoreRecord:
+    points, lines, level, duration, created_us, suspect, tag_count = _FIXED.unpack_from(buf, offset)
+    offset += _FIXED.size
+    score_id, offset = _unpack_str(buf, offset)
+    nickname, offset = _unpack_str(buf, offset)
+    seed, offset = _unpack_str(buf, offset)
+
+    client = None
+    (client_marker,) = _STR_LEN.unpack_from(buf, offset)
+    offset += _STR_LEN.size
+    if client_marker != _NONE:
+        version, offset = _unpack_str(buf, offset)
+        platform, offset = _unpack_str(buf, offset)
+        ua, offset = _unpack_str(buf, offset)
+        client = shared_client(version, platform, ua)
+
+    tags = []
+    for _ in range(tag_count):
+        tag, offset = _unpack_str(buf, offset)
+        assert tag is not None
+        tags.append(sys.intern(tag))
+
+    assert score_id is not None and nickname is not None
+    return ScoreRecord(
+        score_id,
+        sys.intern(nickname),
+        points,
+        lines,
+        level,
+        duration,
+        seed,
+        created_us,
+        suspect,
+        client,
+        tuple(tags),
+    )
+
+
+def _read_records(path: str, magic: bytes) -> tuple[list[ScoreRecord], int]:
+    """Decode every intact record in ``path``.
+
+    Returns the decoded scores and the offset just past the last intact
+    record, so a torn tail left by a crash can be truncated away.
+    """
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if len(data) < len(magic) and magic.startswith(data):
+        # A crash right after the file was created, before its magic was durable.
+        return [], 0
+    if not data.startswith(magic):
+        raise ValueError(f"{path} is not a score journal file")
+
+    records: list[ScoreRecord] = []
+    offset = len(magic)
+    end = len(data)
+    frame_size = _FRAME.size
+    while offset + frame_size <= end:
+        length, crc = _FRAME.unpack_from(data, offset)
+        start = offset + frame_size
+        stop = start + length
+        if stop > end or zlib.crc32(data[start:stop]) != crc:
+            break
+        records.append(_decode_payload(data, start))
+        offset = stop
+    return records, offset
+
+
+def encode_snapshot(records: Sequence[ScoreRecord]) -> bytes:
+    """Encode ``records`` as one framed block of marshalled columns.
+
+    Clients and tag sets are stored once each, with a per-record index.
+    """
+    # Clients are shared instances (see ``shared_client``), so identity finds repeats.
+    client_positions: dict[int, int] = {}
+    clients: list[Optional[ClientInfo]] = []
+    tag_sets: dict[tuple[str, ...], int] = {}
+    client_index = []
+    tag_index = []
+    for record in records:
+        client = record.client
+        position = client_positions.get(id(client))
+        if position is None:
+            position = client_positions[id(client)] = len(clients)
+            clients.append(client)
+        client_index.append(position)
+        tag_index.append(tag_sets.setdefault(record.tags, len(tag_sets)))
+    columns = (
+        [record.id for record in records],
+        [record.nickname for record in records],
+        [record.points for record in records],
+        [record.lines for record in records],
+        [record.level_reached for record in records],
+        [record.duration_seconds for record in records],
+        [record.seed for record in records],
+        [record.created_us for record in records],
+        [record.suspect for record in records],
+        [None if client is None else (client.version, client.platform, client.ua) for client in clients],
+        client_index,
+        list(tag_sets),
+        tag_index,
+    )
+    payload = marshal.dumps(columns)
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_snapshot(data: bytes) -> list[ScoreRecord]:
+    """Decode a block written by ``encode_snapshot`` (without the file magic)."""
+    length, crc = _FRAME.unpack_from(data)
+    payload = data[_FRAME.size:_FRAME.size + length]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise ValueError("Score snapshot is truncated or corrupt")
+    (ids, nicknames, points, lines, levels, durations, seeds, created, suspects,
+     client_keys, client_index, tag_sets, tag_index) = marshal.loads(payload)
+
+    intern = sys.intern
+    clients = [None if key is None else shared_client(*key) for key in client_keys]
+    tags = [tuple(intern(tag) for tag in tag_set) for tag_set in tag_sets]
+    return list(map(
+        ScoreRecord,
+        ids,
+        list(map(intern, nicknames)),
+        points,
+        lines,
+        levels,
+        durations,
+        seeds,
+        created,
+        suspects,
+        list(map(clients.__getitem__, client_index)),
+        list(map(tags.__getitem__, tag_index)),
+    ))
+
+
+def _read_snapshot(path: str) -> list[ScoreRecord]:
+    """Load a snapshot in either the columnar or the per-record layout."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as fh:
+        magic = fh.read(len(_COLUMNAR_SNAPSHOT_MAGIC))
+        if magic == _COLUMNAR_SNAPSHOT_MAGIC:
+            return decode_snapshot(fh.read())
+    records, _ = _read_records(path, _SNAPSHOT_MAGIC)
+    return records
+
+
+class ScoreJournal:
+    """Durable append log plus periodic snapshots for ``MemoryScoreRepository``."""
+
+    def __init__(self, directory: str, snapshot_every: int = 100_000, fsync: bool = True) -> None:
+        """Initialize the journal.
+
+        Args:
+            directory: Folder holding the log and snapshot files
+            snapshot_every: Appended records after which a compacted snapshot is written
+            fsync: Whether each group commit is fsynced to stable storage
+        """
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.records_since_snapshot = 0
+        self._log_path = os.path.join(directory, LOG_NAME)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self._log: Optional[BinaryIO] = None
+        # Size of the log up to its last complete group commit.
+        self._log_size = 0
+        # Set when a failed write could not be rolled back; appends are refused after it.
+        self._failure: Optional[OSError] = None
+        # One thread performs all file I/O, so writes, snapshots and
+        # truncation happen in the order they were scheduled.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="score-journal")
+        self._pending = bytearray()
+        self._waiters: list[asyncio.Future[None]] = []
+        # Held so the running flush cannot be garbage-collected mid-flight.
+        self._flush_task: Optional[asyncio.Task[None]] = None
+        # Records handed to ``append`` that the repository has not applied
+        # yet. Their group commit may land before a snapshot truncates the
+        # log, so every snapshot includes them.
+        self._unapplied: dict[str, ScoreRecord] = {}
+
+    def load(self) -> list[ScoreRecord]:
+        """Replay the snapshot and log tail. Call once before appending."""
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = _read_snapshot(self._snapshot_path)
+        tail, good_offset = _read_records(self._log_path, _LOG_MAGIC)
+
+        # Records flushed while a snapshot was being taken can appear in both files.
+        records = snapshot
+        if tail:
+            tail_ids = {record.id for record in tail}
+            records = [record for record in snapshot if record.id not in tail_ids]
+            records.extend({record.id: record for record in tail}.values())
+
+        if good_offset:
+            with open(self._log_path, "r+b") as fh:
+                fh.truncate(good_offset)
+        else:
+            # No log yet, or one torn before its magic was written.
+            with open(self._log_path, "wb") as fh:
+                fh.write(_LOG_MAGIC)
+                fh.flush()
+                os.fsync(fh.fileno())
+            _fsync_directory(self.directory)
+            good_offset = len(_LOG_MAGIC)
+        self._log = open(self._log_path, "ab")
+        self._log_size = good_offset
+        self.records_since_snapshot = len(tail)
+        logger.info("Replayed %d snapshot and %d log records from %s", len(snapshot), len(tail), self.directory)
+        return records
+
+    async def append(self, records: Sequence[ScoreRecord]) -> None:
+        """Append records and wait until the group commit containing them is durable.
+
+        Call ``applied`` once the records are resident in the repository.
+        """
+        for record in records:
+            self._pending += encode_record(record)
+            self._unapplied[record.id] = record
+        self.records_since_snapshot += len(records)
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_pending())
+        try:
+            await waiter
+        except BaseException:
+            self.applied(records)
+            raise
+
+    def applied(self, records: Iterable[ScoreRecord]) -> None:
+        """Mark appended records as resident, so later snapshots take them from the repository."""
+        for record in records:
+            self._unapplied.pop(record.id, None)
+
+    async def _flush_pending(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending:
+                data, waiters = bytes(self._pending), self._waiters
+                self._pending, self._waiters = bytearray(), []
+                try:
+                    await loop.run_in_executor(self._executor, self._write, data)
+                except Exception as exc:
+                    for waiter in waiters:
+                        waiter.set_exception(exc)
+                else:
+                    for waiter in waiters:
+                        waiter.set_result(None)
+        finally:
+            self._flush_task = None
+
+    def _open_log(self) -> BinaryIO:
+        if self._failure is not None:
+            raise OSError("Score journal is unavailable after a failed write") from self._failure
+        assert self._log is not None, "ScoreJournal.load() must be called before appending"
+        return self._log
+
+    def _write(self, data: bytes) -> None:
+        log = self._open_log()
+        try:
+            log.write(data)
+            log.flush()
+            if self.fsync:
+                os.fsync(log.fileno())
+        except OSError:
+            self._roll_back()
+            raise
+        self._log_size += len(data)
+
+    def _roll_back(self) -> None:
+        """Cut a partly written group commit off the log.
+
+        Left in place, the torn frame would end replay early and discard
+        every later acknowledged record.
+        """
+        log, self._log = self._log, None
+        assert log is not None
+        try:
+            # Closing drops whatever the failed write left buffered.
+            log.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self._log_path, self._log_size)
+            self._log = open(self._log_path, "ab")
+            os.fsync(self._log.fileno())
+        except OSError as exc:
+            logger.exception("Could not roll the score journal back to %d bytes", self._log_size)
+            self._failure = exc
+
+    async def write_snapshot(self, scores: Iterable[ScoreRecord]) -> None:
+        """Persist ``scores`` as the new snapshot and truncate the log.
+
+        The caller must pass every resident score. Records appended but not
+        yet applied are added, since their group commit may already be in
+        the log being truncated; appends made after this call go to the
+        fresh log, so no acknowledged record is lost.
+        """
+        resident = list(scores)
+        resident.extend(self._unapplied.values())
+        self.records_since_snapshot = 0
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._write_snapshot, resident)
+
+    def _write_snapshot(self, scores: list[ScoreRecord]) -> None:
+        log = self._open_log()
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(_COLUMNAR_SNAPSHOT_MAGIC)
+            fh.write(encode_snapshot(scores))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        _fsync_directory(self.directory)
+
+        log.truncate(len(_LOG_MAGIC))
+        log.flush()
+        os.fsync(log.fileno())
+        self._log_size = len(_LOG_MAGIC)
+        logger.info("Wrote score snapshot with %d records", len(scores))
+
+    def close(self) -> None:
+        """Flush outstanding I/O and close the log file."""
+        self._executor.shutdown(wait=True)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
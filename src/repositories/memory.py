@@ -1,80 +1,349 @@
 """In-memory score repository implementation."""
 
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from collections.abc import Sequence
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from uuid import uuid4
+from itertools import islice
+from operator import attrgetter, le
+from typing import Optional, TypeVar
 
-from ..models import Score, ScoreInput
-from .base import ScoreRepository
+from ..models import ScoreInput
+from .base import ScoreRepository, new_record
+from .cursor import RankKey, cursor_rank_key, decode_cursor, rank_key, to_epoch_us
+from .journal import ScoreJournal, gc_paused
+from .record import ScoreRecord, now_us
+from .windows import TopK, Window, build_top_k, window_start
+
+T = TypeVar("T")
+
+# Deleting a run in place moves the index tail (~0.2 ms at 1M entries);
+# past this many runs one compacting copy (~50 ms at 1M) is cheaper.
+_MAX_DELETE_RUNS = 200
 
 
 class MemoryScoreRepository(ScoreRepository):
-    """Simple in-memory storage for scores."""
+    """Simple in-memory storage for scores.
+
+    Scores are kept as compact ``ScoreRecord`` objects in a list ordered by
+    leaderboard rank, with a parallel list of rank keys for binary search.
+    Inserts never re-sort and a top-N read is a slice. A queue in creation
+    order lets retention expire the oldest scores without a full scan. The rank keys double
+    as an order-statistic index: a score's rank is a bisection, corrected
+    by a second sorted list holding the keys of suspect scores.
+
+    Daily and weekly leaderboards are served from a ``TopK`` per window,
+    updated on insert and rebuilt when the window rolls over, so their
+    reads cost O(limit) however long the history is. Tag and platform
+    leaderboards work the same way: each value gets a ``TopK`` index when
+    first queried, capped at ``index_capacity`` entries, and at most
+    ``max_indexes`` values per kind are indexed.
+
+    When a ``ScoreJournal`` is supplied, the resident set is rebuilt from it
+    on construction and every new score is durably appended before it
+    becomes visible to readers.
+    """
+
+    def __init__(
+        self,
+        journal: Optional[ScoreJournal] = None,
+        window_capacity: int = 128,
+        index_capacity: int = 101,
+        max_indexes: int = 1000
+    ) -> None:
+        self._journal = journal
+        # Enough for the largest page (100) plus the service's look-ahead row.
+        self._window_capacity = window_capacity
+        self._windows: dict[Window, TopK] = {}
+        # Defaults to the retention policy's 100 records plus the look-ahead row.
+        self._index_capacity = index_capacity
+        self._max_indexes = max_indexes
+        self._tag_indexes: dict[str, TopK] = {}
+        self._platform_indexes: dict[str, TopK] = {}
+        self._keys: list[RankKey] = []
+        self._records: list[ScoreRecord] = []
+        self._suspect_keys: list[RankKey] = []
+        self._by_id: dict[str, ScoreRecord] = {}
+        # Creation order, oldest first; clock steps only ever delay expiry.
+        self._by_time: deque[ScoreRecord] = deque()
+        # Seeded from the clock so versions keep increasing across restarts.
+        self._version = time.time_ns() // 1000
+        if journal is not None:
+            with gc_paused():
+                self._replace(journal.load())
+
+    def close(self) -> None:
+        """Close the journal, if any."""
+        if self._journal is not None:
+            self._journal.close()
 
-    def __init__(self) -> None:
-        self._scores: list[Score] = []
+    def _replace(self, records: list[ScoreRecord]) -> None:
+        """Rebuild the index from an unordered set of records."""
+        keys = list(map(rank_key, records))
+        # Snapshots are written in rank order, so replay usually skips the sort.
+        if not all(map(le, keys, islice(keys, 1, None))):
+            # Keys are unique (they end with the id), so records are never compared.
+            ranked = sorted(zip(keys, records))
+            keys = [key for key, _ in ranked]
+            records = [record for _, record in ranked]
+        self._records = records
+        self._keys = keys
+        self._suspect_keys = [rank_key(record) for record in records if record.suspect]
+        self._by_id = {record.id: record for record in records}
+        self._by_time = deque(sorted(records, key=attrgetter("created_us")))
+        self._windows.clear()
+        self._tag_indexes.clear()
+        self._platform_indexes.clear()
 
-    async def create_score(self, score_input: ScoreInput) -> Score:
+    def _insert(self, record: ScoreRecord) -> None:
+        key = rank_key(record)
+        index = bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._records.insert(index, record)
+        self._by_id[record.id] = record
+        self._by_time.append(record)
+        if record.suspect:
+            insort(self._suspect_keys, key)
+        for window_top in self._windows.values():
+            window_top.offer(record)
+        if self._tag_indexes:
+            for tag in record.tags:
+                tag_top = self._tag_indexes.get(tag)
+                if tag_top is not None:
+                    tag_top.offer(record)
+        if self._platform_indexes and record.client is not None and record.client.platform is not None:
+            platform_top = self._platform_indexes.get(record.client.platform)
+            if platform_top is not None:
+                platform_top.offer(record)
+
+    async def create_score(self, score_input: ScoreInput) -> ScoreRecord:
         """Create a new score record."""
-        score = Score.model_construct(
-            id=str(uuid4()),
-            nickname=score_input.nickname,
-            points=score_input.points,
-            lines=score_input.lines or 0,
-            level_reached=score_input.level_reached or 0,
-            duration_seconds=score_input.duration_seconds or 0,
-            seed=score_input.seed,
-            created_at=datetime.now(timezone.utc),
-            suspect=False,
-            client=score_input.client,
-            tags=score_input.tags or []
-        )
-        self._scores.append(score)
-        return score
+        record = new_record(score_input, now_us())
+        if self._journal is not None:
+            await self._journal.append([record])
+        self._insert(record)
+        if self._journal is not None:
+            self._journal.applied([record])
+        self._version += 1
+        await self._maybe_snapshot()
+        return record
+
+    async def create_scores(self, score_inputs: Sequence[ScoreInput]) -> list[ScoreRecord]:
+        """Create a batch of score records with one journal append and one index update."""
+        created_us = now_us()
+        records = [new_record(score_input, created_us) for score_input in score_inputs]
+        if not records:
+            return records
+        if self._journal is not None:
+            await self._journal.append(records)
+        # Binary inserts keep this O(k log n) comparisons; re-sorting the
+        # index would compare every resident entry on each batch.
+        for record in records:
+            self._insert(record)
+        if self._journal is not None:
+            self._journal.applied(records)
+        # One version step per score, matching what the leaderboard cache expects.
+        self._version += len(records)
+        await self._maybe_snapshot()
+        return records
+
+    async def _maybe_snapshot(self, force: bool = False) -> None:
+        """Compact the journal once enough records were appended since the last snapshot."""
+        journal = self._journal
+        if journal is None:
+            return
+        if force or journal.records_since_snapshot >= journal.snapshot_every:
+            await journal.write_snapshot(self._records)
 
     async def get_scores(
         self,
         limit: int = 10,
         cursor: Optional[str] = None,
         since: Optional[datetime] = None
-    ) -> list[Score]:
+    ) -> list[ScoreRecord]:
         """List scores with optional filtering and pagination."""
-        # Filter by since timestamp if provided
-        filtered_scores = self._scores
-        if since:
-            # Ensure timezone-aware comparison
-            if since.tzinfo is None:
-                since = since.replace(tzinfo=timezone.utc)
-            filtered_scores = [s for s in filtered_scores if s.created_at >= since]
-
-        # Sort by points descending, then by creation time descending
-        filtered_scores.sort(key=lambda s: (s.points, s.created_at), reverse=True)
-
-        # Simple cursor-based pagination (using index for simplicity)
-        start_idx = 0
-        if cursor:
-            try:
-                start_idx = int(cursor)
-            except ValueError:
-                start_idx = 0
-
-        return filtered_scores[start_idx:start_idx + limit]
+        start_idx = self._seek(cursor) if cursor else 0
+
+        if since is None:
+            return self._records[start_idx:start_idx + limit]
+
+        # Walk the index in rank order and stop as soon as the page is full
+        since_us = to_epoch_us(since)
+        page: list[ScoreRecord] = []
+        records = self._records
+        for index in range(start_idx, len(records)):
+            record = records[index]
+            if record.created_us >= since_us:
+                page.append(record)
+                if len(page) == limit:
+                    break
+        return page
+
+    async def get_filtered_scores(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        tag: Optional[str] = None,
+        platform: Optional[str] = None
+    ) -> list[ScoreRecord]:
+        """List a tag or platform leaderboard page, from its index when possible."""
+        if tag is None and platform is None:
+            return await self.get_scores(limit=limit, cursor=cursor, since=since)
+        if since is None and (tag is None or platform is None):
+            top = self._index_for(tag, platform)
+            if top is not None:
+                indexed = top.page(limit, cursor_rank_key(decode_cursor(cursor)) if cursor else None)
+                if indexed is not None:
+                    return indexed
+
+        # Combined filters, since bounds and pages past the index walk the ranked list.
+        since_us = to_epoch_us(since) if since is not None else 0
+        page: list[ScoreRecord] = []
+        records = self._records
+        for index in range(self._seek(cursor) if cursor else 0, len(records)):
+            record = records[index]
+            if record.created_us >= since_us and record.matches(tag, platform):
+                page.append(record)
+                if len(page) == limit:
+                    break
+        return page
+
+    def _index_for(self, tag: Optional[str], platform: Optional[str]) -> Optional[TopK]:
+        """Return the index for a single tag or platform, building it on first use."""
+        indexes: dict[str, TopK]
+        if tag is not None:
+            indexes, value = self._tag_indexes, tag
+        elif platform is not None:
+            indexes, value = self._platform_indexes, platform
+        else:
+            return None
+        top = indexes.get(value)
+        if top is None:
+            if len(indexes) >= self._max_indexes:
+                return None
+            top = indexes[value] = build_top_k(
+                self._records, None, self._index_capacity, lambda record: record.matches(tag, platform)
+            )
+        return top
+
+    async def get_window_scores(
+        self,
+        window: Window,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> list[ScoreRecord]:
+        """List a time-windowed leaderboard page from the window's top K."""
+        start = window_start(window)
+        if start is None:
+            return await self.get_scores(limit=limit, cursor=cursor)
+        top = self._windows.get(window)
+        if top is None or top.start_us != to_epoch_us(start):
+            # First read, or the window rolled over and every entry expired.
+            top = self._windows[window] = build_top_k(self._records, start, self._window_capacity)
+        page = top.page(limit, cursor_rank_key(decode_cursor(cursor)) if cursor else None)
+        if page is None:
+            # The page reaches past the top K; fall back to a filtered walk.
+            return await self.get_scores(limit=limit, cursor=cursor, since=start)
+        return page
+
+    def _seek(self, cursor: str) -> int:
+        """Return the index of the first entry ranked after the cursor key."""
+        key = cursor_rank_key(decode_cursor(cursor))
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            index += 1
+        return index
+
+    async def get_score(self, score_id: str) -> Optional[ScoreRecord]:
+        """Look up one stored score by id."""
+        return self._by_id.get(score_id)
+
+    async def get_rank(self, key: RankKey) -> tuple[int, int]:
+        """Count ranked scores before ``key`` with two bisections."""
+        before = bisect_left(self._keys, key) - bisect_left(self._suspect_keys, key)
+        return before, len(self._keys) - len(self._suspect_keys)
+
+    async def get_version(self) -> int:
+        """Get the leaderboard version."""
+        return self._version
 
     async def get_score_count(self) -> int:
         """Get total number of scores."""
-        return len(self._scores)
+        return len(self._records)
+
+    async def expire_scores(
+        self,
+        retention_days: int = 14,
+        max_records: int = 100,
+        limit: Optional[int] = None
+    ) -> int:
+        """Expire the oldest scores from the head of the time-ordered queue."""
+        cutoff_us = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=retention_days))
+        queue = self._by_time
+        removable = len(self._records) - max_records
+        if limit is not None:
+            removable = min(removable, limit)
+        expired: list[ScoreRecord] = []
+        while len(expired) < removable and queue and queue[0].created_us < cutoff_us:
+            expired.append(queue.popleft())
+        if expired:
+            self._remove(expired)
+            self._version += len(expired)
+            # Expired scores replayed from the log before the next snapshot are expired again.
+            await self._maybe_snapshot()
+        return len(expired)
+
+    def _remove(self, records: list[ScoreRecord]) -> None:
+        """Drop ``records`` from the rank index and every structure that references them."""
+        positions = sorted(bisect_left(self._keys, rank_key(record)) for record in records)
+        self._keys = _delete_positions(self._keys, positions)
+        self._records = _delete_positions(self._records, positions)
+        for record in records:
+            del self._by_id[record.id]
+            if record.suspect:
+                key = rank_key(record)
+                del self._suspect_keys[bisect_left(self._suspect_keys, key)]
+            for window_top in self._windows.values():
+                window_top.discard(record)
+            for tag in record.tags:
+                tag_top = self._tag_indexes.get(tag)
+                if tag_top is not None:
+                    tag_top.discard(record)
+            if record.client is not None and record.client.platform in self._platform_indexes:
+                self._platform_indexes[record.client.platform].discard(record)
 
     async def cleanup_old_scores(self, retention_days: int = 14, max_records: int = 100) -> int:
-        """Remove old scores based on retention policy. Returns number of removed scores."""
-        original_count = len(self._scores)
-        sorted_scores = sorted(self._scores, key=lambda s: s.created_at, reverse=True)
+        """Remove every score outside the retention policy. Returns number of removed scores."""
+        removed = await self.expire_scores(retention_days, max_records)
+        if removed:
+            # Rewrite the snapshot so removed scores are not replayed on restart.
+            await self._maybe_snapshot(force=True)
+        return removed
 
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=retention_days)
 
-        kept_scores: list[Score] = []
-        for index, score in enumerate(sorted_scores):
-            if index < max_records or score.created_at >= cutoff_date:
-                kept_scores.append(score)
+def _delete_positions(items: list[T], positions: list[int]) -> list[T]:
+    """Remove the ascending ``positions`` from ``items``; returns the resulting list.
 
-        self._scores = kept_scores
-        return original_count - len(self._scores)
+    Each run of adjacent positions is deleted in place with one ``del`` (a
+    memmove of the tail, no reference counting). Past ``_MAX_DELETE_RUNS``
+    runs one compacting copy is cheaper, so a new list is returned.
+    """
+    runs: list[list[int]] = []
+    for position in positions:
+        if runs and runs[-1][1] == position:
+            runs[-1][1] = position + 1
+        else:
+            runs.append([position, position + 1])
+    if len(runs) <= _MAX_DELETE_RUNS:
+        for start, stop in reversed(runs):
+            del items[start:stop]
+        return items
+    kept: list[T] = []
+    start = 0
+    for run_start, run_stop in runs:
+        kept.extend(items[start:run_start])
+        start = run_stop
+    kept.extend(items[start:])
+    return kept
@@ -0,0 +1,152 @@
+"""Compact resident form of a stored score.
+
+Repositories keep ``ScoreRecord`` objects instead of Pydantic ``Score``
+models: a slotted object with an integer epoch-microsecond timestamp,
+interned nickname and tag strings, tags as a tuple, and one shared
+``ClientInfo`` per distinct client build. A record costs a few hundred
+bytes instead of well over a kilobyte, so millions of scores can stay
+resident per worker. ``to_score`` converts a record to the API model at the
+service boundary; response bodies are encoded straight from records by
+``serialization``.
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from ..models import ClientInfo, Score, ScoreInput
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NO_TAGS: tuple[str, ...] = ()
+# Distinct client builds kept for sharing; beyond this, clients are stored unshared.
+_MAX_SHARED_CLIENTS = 10_000
+_clients: dict[tuple[Optional[str], Optional[str], Optional[str]], ClientInfo] = {}
+
+
+def now_us() -> int:
+    """Current time in integer epoch microseconds."""
+    return time.time_ns() // 1000
+
+
+def shared_client(version: Optional[str], platform: Optional[str], ua: Optional[str]) -> ClientInfo:
+    """Return the process-wide ``ClientInfo`` instance for this client build."""
+    key = (version, platform, ua)
+    client = _clients.get(key)
+    if client is None:
+        client = ClientInfo.model_construct(
+            version=sys.intern(version) if version is not None else None,
+            platform=sys.intern(platform) if platform is not None else None,
+            ua=ua,
+        )
+        if len(_clients) < _MAX_SHARED_CLIENTS:
+            _clients[key] = client
+    return client
+
+
+def intern_tags(tags: Optional[list[str]]) -> tuple[str, ...]:
+    """Store tags as a tuple of interned strings (the empty tuple is shared)."""
+    if not tags:
+        return _NO_TAGS
+    return tuple(sys.intern(tag) for tag in tags)
+
+
+class ScoreRecord:
+    """A stored score. Records are never mutated once stored."""
+
+    __slots__ = (
+        "id",
+        "nickname",
+        "points",
+        "lines",
+        "level_reached",
+        "duration_seconds",
+        "seed",
+        "created_us",
+        "suspect",
+        "client",
+        "tags",
+        "json",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        nickname: str,
+        points: int,
+        lines: int,
+        level_reached: int,
+        duration_seconds: int,
+        seed: Optional[str],
+        created_us: int,
+        suspect: bool = False,
+        client: Optional[ClientInfo] = None,
+        tags: tuple[str, ...] = _NO_TAGS,
+    ) -> None:
+        self.id = id
+        self.nickname = nickname
+        self.points = points
+        self.lines = lines
+        self.level_reached = level_reached
+        self.duration_seconds = duration_seconds
+        self.seed = seed
+        self.created_us = created_us
+        self.suspect = suspect
+        self.client = client
+        self.tags = tags
+        # Encoded JSON object, filled in by ``serialization.score_json``.
+        self.json: Optional[str] = None
+
+    @classmethod
+    def from_input(cls, score_id: str, score_input: ScoreInput, created_us: int) -> "ScoreRecord":
+        """Build the record for an already validated submission."""
+        client = score_input.client
+        return cls(
+            score_id,
+            sys.intern(score_input.nickname),
+            score_input.points,
+            score_input.lines or 0,
+            score_input.level_reached or 0,
+            score_input.duration_seconds or 0,
+            score_input.seed,
+            created_us,
+            False,
+            shared_client(client.version, client.platform, client.ua) if client is not None else None,
+            intern_tags(score_input.tags),
+        )
+
+    @property
+    def created_at(self) -> datetime:
+        """Acceptance time as an aware UTC datetime."""
+        return _EPOCH + timedelta(microseconds=self.created_us)
+
+    @created_at.setter
+    def created_at(self, value: datetime) -> None:
+        self.created_us = (value - _EPOCH) // timedelta(microseconds=1)
+
+    def matches(self, tag: Optional[str] = None, platform: Optional[str] = None) -> bool:
+        """Whether the record carries ``tag`` and comes from ``platform`` (None matches anything)."""
+        if tag is not None and tag not in self.tags:
+            return False
+        if platform is not None and (self.client is None or self.client.platform != platform):
+            return False
+        return True
+
+    def to_score(self) -> Score:
+        """Convert to the API model."""
+        return Score.model_construct(
+            id=self.id,
+            nickname=self.nickname,
+            points=self.points,
+            lines=self.lines,
+            level_reached=self.level_reached,
+            duration_seconds=self.duration_seconds,
+            seed=self.seed,
+            created_at=self.created_at,
+            suspect=self.suspect,
+            client=self.client,
+            tags=list(self.tags),
+        )
+
+    def __repr__(self) -> str:
+        return f"ScoreRecord(id={self.id!r}, nickname={self.nickname!r}, points={self.points})"
@@ -0,0 +1,361 @@
+"""SQLite score repository implementation."""
+
+import asyncio
+import json
+import sqlite3
+import sys
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from ..models import ScoreInput
+from .base import ScoreRepository, new_record
+from .cursor import RankKey, decode_cursor, to_epoch_us
+from .record import ScoreRecord, intern_tags, now_us, shared_client
+
+T = TypeVar("T")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS scores (
+        id TEXT PRIMARY KEY,
+        nickname TEXT NOT NULL,
+        points INTEGER NOT NULL,
+        lines INTEGER NOT NULL,
+        level_reached INTEGER NOT NULL,
+        duration_seconds INTEGER NOT NULL,
+        seed TEXT,
+        created_at INTEGER NOT NULL,
+        suspect INTEGER NOT NULL DEFAULT 0,
+        client TEXT,
+        tags TEXT NOT NULL DEFAULT '[]'
+    )
+    """,
+    # Serves leaderboard ordering and keyset seeks straight from the index.
+    "CREATE INDEX IF NOT EXISTS ix_scores_rank ON scores (points DESC, created_at DESC, id)",
+    # Serves `since` filters and retention cleanup.
+    "CREATE INDEX IF NOT EXISTS ix_scores_created_at ON scores (created_at)",
+    # Leaderboard version shared by every process using the database.
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)",
+    """
+    CREATE TRIGGER IF NOT EXISTS scores_version_insert AFTER INSERT ON scores
+    BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scores_version_delete AFTER DELETE ON scores
+    BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END
+    """,
+    # Fenwick tree of ranked (non-suspect) scores per points value, kept in
+    # step by every write transaction; see _tree_updates and _tree_prefix.
+    "CREATE TABLE IF NOT EXISTS rank_tree (node INTEGER PRIMARY KEY, ranked INTEGER NOT NULL)",
+)
+
+_COLUMNS = "id, nickname, points, lines, level_reached, duration_seconds, seed, created_at, suspect, client, tags"
+
+_INSERT = f"INSERT INTO scores ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+# Keyset predicate for (points DESC, created_at DESC, id ASC). The leading
+# `points <= ?` term keeps the planner on a range scan of ix_scores_rank.
+_AFTER_CURSOR = "points <= :points AND (points < :points OR created_at < :created_at OR (created_at = :created_at AND id > :id))"
+_ORDER = "ORDER BY points DESC, created_at DESC, id LIMIT :limit"
+
+# Statement texts are fixed so sqlite3's per-connection statement cache
+# reuses the prepared statements across calls.
+_SELECT_TOP = f"SELECT {_COLUMNS} FROM scores {_ORDER}"
+_SELECT_TOP_SINCE = f"SELECT {_COLUMNS} FROM scores WHERE created_at >= :since {_ORDER}"
+_SELECT_AFTER = f"SELECT {_COLUMNS} FROM scores WHERE {_AFTER_CURSOR} {_ORDER}"
+_SELECT_AFTER_SINCE = f"SELECT {_COLUMNS} FROM scores WHERE {_AFTER_CURSOR} AND created_at >= :since {_ORDER}"
+_COUNT = "SELECT COUNT(*) FROM scores"
+_SELECT_BY_ID = f"SELECT {_COLUMNS} FROM scores WHERE id = :id"
+# Ranked scores placed before a rank key: the mirror image of _AFTER_CURSOR.
+_COUNT_TIED_BEFORE = (
+    "SELECT COUNT(*) FROM scores WHERE suspect = 0 AND points = :points "
+    "AND (created_at > :created_at OR (created_at = :created_at AND id < :id))"
+)
+# Only used for points beyond the rank tree's range.
+_COUNT_ABOVE = "SELECT COUNT(*) FROM scores WHERE suspect = 0 AND points > :points"
+_VERSION = "SELECT value FROM meta WHERE key = 'version'"
+_RANKED = "SELECT value FROM meta WHERE key = 'ranked'"
+_ADJUST_RANKED = "UPDATE meta SET value = value + ? WHERE key = 'ranked'"
+_ADJUST_TREE = (
+    "INSERT INTO rank_tree (node, ranked) VALUES (?, ?) "
+    "ON CONFLICT (node) DO UPDATE SET ranked = ranked + excluded.ranked"
+)
+# Oldest expired rows first, never leaving fewer than :max_records rows;
+# ix_scores_created_at serves both the filter and the order.
+_SELECT_EXPIRED = (
+    "SELECT id, points, suspect FROM scores WHERE created_at < :cutoff ORDER BY created_at "
+    "LIMIT max(0, min(:limit, (SELECT COUNT(*) FROM scores) - :max_records))"
+)
+_DELETE_BY_ID = "DELETE FROM scores WHERE id = ?"
+
+# The rank tree tells apart points below _MAX_TREE_POINTS; higher points
+# share its last slot, and scores above them are counted with _COUNT_ABOVE.
+_RANK_TREE_SIZE = 1 << 40
+_MAX_TREE_POINTS = _RANK_TREE_SIZE - 2
+_TREE_DEPTH = _RANK_TREE_SIZE.bit_length()
+# A fixed-width node list keeps the statement text, and its cached plan, stable.
+_SUM_TREE = f"SELECT COALESCE(SUM(ranked), 0) FROM rank_tree WHERE node IN ({', '.join('?' * _TREE_DEPTH)})"
+
+
+def _tree_index(points: int) -> int:
+    return min(points, _MAX_TREE_POINTS) + 1
+
+
+def _tree_updates(points: int) -> Iterator[int]:
+    """Rank tree nodes whose counts include a score with ``points``."""
+    node = _tree_index(points)
+    while node <= _RANK_TREE_SIZE:
+        yield node
+        node += node & -node
+
+
+def _tree_prefix(points: int) -> list[int]:
+    """Rank tree nodes whose counts add up to the ranked scores with at most ``points``.
+
+    Padded with the unused node 0 to ``_TREE_DEPTH`` entries.
+    """
+    nodes = [0] * _TREE_DEPTH
+    node = _tree_index(points)
+    for position in range(_TREE_DEPTH):
+        if not node:
+            break
+        nodes[position] = node
+        node -= node & -node
+    return nodes
+
+
+def _adjust_rank_tree(conn: sqlite3.Connection, points: Iterable[int], delta: int) -> None:
+    """Add ``delta`` per score in ``points`` to the rank tree. Run inside the write transaction."""
+    changes: dict[int, int] = {}
+    count = 0
+    for value in points:
+        count += 1
+        for node in _tree_updates(value):
+            changes[node] = changes.get(node, 0) + delta
+    if count:
+        conn.executemany(_ADJUST_TREE, changes.items())
+        conn.execute(_ADJUST_RANKED, (count * delta,))
+
+
+def _row_to_record(row: tuple[Any, ...]) -> ScoreRecord:
+    score_id, nickname, points, lines, level_reached, duration_seconds, seed, created_at, suspect, client, tags = row
+    if client:
+        fields = json.loads(client)
+        client = shared_client(fields.get("version"), fields.get("platform"), fields.get("ua"))
+    return ScoreRecord(
+        score_id,
+        sys.intern(nickname),
+        points,
+        lines,
+        level_reached,
+        duration_seconds,
+        seed,
+        created_at,
+        bool(suspect),
+        client or None,
+        intern_tags(json.loads(tags)),
+    )
+
+
+def _record_to_row(record: ScoreRecord) -> tuple[Any, ...]:
+    client = record.client
+    return (
+        record.id,
+        record.nickname,
+        record.points,
+        record.lines,
+        record.level_reached,
+        record.duration_seconds,
+        record.seed,
+        record.created_us,
+        int(record.suspect),
+        json.dumps({"version": client.version, "platform": client.platform, "ua": client.ua}) if client else None,
+        json.dumps(list(record.tags)),
+    )
+
+
+def database_path_from_url(url: str) -> str:
+    """Extract the file path from a ``sqlite:///path`` URL."""
+    prefix = "sqlite:///"
+    if not url.startswith(prefix):
+        raise ValueError(f"Unsupported database URL: {url}")
+    return url[len(prefix):]
+
+
+def _build_rank_tree(conn: sqlite3.Connection) -> None:
+    """Fill the rank tree from the stored scores of a database created without one."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have built it while we waited for the lock.
+        if conn.execute(_RANKED).fetchone() is None:
+            conn.execute("DELETE FROM rank_tree")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('ranked', 0)")
+            for points, count in conn.execute("SELECT points, COUNT(*) FROM scores WHERE suspect = 0 GROUP BY points").fetchall():
+                _adjust_rank_tree(conn, [points], count)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class SqliteScoreRepository(ScoreRepository):
+    """Durable score storage in a SQLite database.
+
+    All database work runs on a single dedicated worker thread that owns the
+    connection, so async handlers never block on disk I/O and the connection
+    is never shared between threads.
+    """
+
+    def __init__(self, path: str = "tetris.db") -> None:
+        self._path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-scores")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the connection on first use. Must run on the worker thread."""
+        if self._conn is None:
+            conn = sqlite3.connect(self._path, timeout=5.0, cached_statements=64, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            if conn.execute(_RANKED).fetchone() is None:
+                _build_rank_tree(conn)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def close(self) -> None:
+        """Close the connection and stop the worker thread."""
+        def _close() -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self._executor.submit(_close).result()
+        self._executor.shutdown()
+
+    async def create_score(self, score_input: ScoreInput) -> ScoreRecord:
+        """Create a new score record."""
+        record = new_record(score_input, now_us())
+        await self._run(self._insert_many, [_record_to_row(record)])
+        return record
+
+    async def create_scores(self, score_inputs: Sequence[ScoreInput]) -> list[ScoreRecord]:
+        """Create a batch of score records in a single transaction."""
+        created_us = now_us()
+        records = [new_record(score_input, created_us) for score_input in score_inputs]
+        if records:
+            await self._run(self._insert_many, [_record_to_row(record) for record in records])
+        return records
+
+    def _insert_many(self, rows: list[tuple[Any, ...]]) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(_INSERT, rows)
+            _adjust_rank_tree(conn, [row[2] for row in rows if not row[8]], 1)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    async def get_scores(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> list[ScoreRecord]:
+        """List scores with optional filtering and pagination."""
+        params: dict[str, Any] = {"limit": limit}
+        if cursor:
+            key = decode_cursor(cursor)
+            params.update(points=key.points, created_at=key.created_us, id=key.id)
+        if since is not None:
+            params["since"] = to_epoch_us(since)
+
+        if cursor and since is not None:
+            query = _SELECT_AFTER_SINCE
+        elif cursor:
+            query = _SELECT_AFTER
+        elif since is not None:
+            query = _SELECT_TOP_SINCE
+        else:
+            query = _SELECT_TOP
+
+        rows = await self._run(self._fetch_all, query, params)
+        return [_row_to_record(row) for row in rows]
+
+    def _fetch_all(self, query: str, params: dict[str, Any]) -> list[tuple[Any, ...]]:
+        return self._connection().execute(query, params).fetchall()
+
+    async def get_score(self, score_id: str) -> Optional[ScoreRecord]:
+        """Look up one stored score by id."""
+        rows = await self._run(self._fetch_all, _SELECT_BY_ID, {"id": score_id})
+        return _row_to_record(rows[0]) if rows else None
+
+    async def get_rank(self, key: RankKey) -> tuple[int, int]:
+        """Count ranked scores before ``key``.
+
+        Scores with more points are counted from the rank tree with one
+        lookup per tree level. Scores tied on points are counted from
+        ``ix_scores_rank``, which is linear in the ties placed before ``key``.
+        """
+        params = {"points": -key[0], "created_at": -key[1], "id": key[2]}
+        return await self._run(self._count_rank, params)
+
+    def _count_rank(self, params: dict[str, Any]) -> tuple[int, int]:
+        conn = self._connection()
+        points = params["points"]
+        # One read transaction, so the tree, the total and the ties agree.
+        conn.execute("BEGIN")
+        try:
+            total = int(conn.execute(_RANKED).fetchone()[0])
+            if points < _MAX_TREE_POINTS:
+                above = total - int(conn.execute(_SUM_TREE, _tree_prefix(points)).fetchone()[0])
+            else:
+                above = int(conn.execute(_COUNT_ABOVE, params).fetchone()[0])
+            tied = int(conn.execute(_COUNT_TIED_BEFORE, params).fetchone()[0])
+        finally:
+            conn.execute("COMMIT")
+        return above + tied, total
+
+    async def get_version(self) -> int:
+        """Get the leaderboard version."""
+        rows = await self._run(self._fetch_all, _VERSION, {})
+        return int(rows[0][0])
+
+    async def get_score_count(self) -> int:
+        """Get total number of scores."""
+        rows = await self._run(self._fetch_all, _COUNT, {})
+        return int(rows[0][0])
+
+    async def expire_scores(
+        self,
+        retention_days: int = 14,
+        max_records: int = 100,
+        limit: Optional[int] = None
+    ) -> int:
+        """Delete the oldest expired rows in one statement."""
+        cutoff = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=retention_days))
+        params = {"cutoff": cutoff, "max_records": max_records, "limit": sys.maxsize if limit is None else limit}
+        return await self._run(self._expire, params)
+
+    def _expire(self, params: dict[str, Any]) -> int:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(_SELECT_EXPIRED, params).fetchall()
+            conn.executemany(_DELETE_BY_ID, [(score_id,) for score_id, _, _ in expired])
+            _adjust_rank_tree(conn, [points for _, points, suspect in expired if not suspect], -1)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return len(expired)
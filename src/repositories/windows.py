@@ -0,0 +1,103 @@
+"""Leaderboard time windows and the bounded top-K lists that serve windows and indexes."""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from .cursor import RankKey, rank_key, to_epoch_us
+from .record import ScoreRecord
+
+Window = Literal["daily", "weekly", "all"]
+WINDOWS: tuple[Window, ...] = ("daily", "weekly", "all")
+
+
+def window_start(window: Window, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Start of the current window: UTC midnight, Monday 00:00 UTC, or None for all-time."""
+    if window == "all":
+        return None
+    now = now or datetime.now(timezone.utc)
+    start = now.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "weekly":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+class TopK:
+    """The ``capacity`` best-ranked scores created since ``start_us``, in rank order.
+
+    Entries that fall off the end are gone, so once that has happened the
+    structure can only answer reads that stay within it; ``page`` returns
+    None otherwise.
+    """
+
+    __slots__ = ("start_us", "capacity", "truncated", "_keys", "_records")
+
+    def __init__(self, start_us: int, capacity: int) -> None:
+        self.start_us = start_us
+        self.capacity = capacity
+        # Whether matching scores exist beyond the kept entries.
+        self.truncated = False
+        self._keys: list[RankKey] = []
+        self._records: list[ScoreRecord] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def offer(self, record: ScoreRecord) -> None:
+        """Insert ``record`` if it belongs to the window and ranks inside the top K."""
+        if record.created_us < self.start_us:
+            return
+        key = rank_key(record)
+        keys = self._keys
+        if len(keys) >= self.capacity and key >= keys[-1]:
+            self.truncated = True
+            return
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        self._records.insert(index, record)
+        if len(keys) > self.capacity:
+            keys.pop()
+            self._records.pop()
+            self.truncated = True
+
+    def discard(self, record: ScoreRecord) -> None:
+        """Remove ``record`` if it is kept here."""
+        key = rank_key(record)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._records[index] is record:
+            del self._keys[index]
+            del self._records[index]
+
+    def page(self, limit: int, after: Optional[RankKey] = None) -> Optional[list[ScoreRecord]]:
+        """Return up to ``limit`` scores ranked after ``after``, or None if entries past the top K are needed."""
+        start = 0
+        if after is not None:
+            start = bisect_left(self._keys, after)
+            if start < len(self._keys) and self._keys[start] == after:
+                start += 1
+        end = start + limit
+        if end > len(self._records) and self.truncated:
+            return None
+        return self._records[start:end]
+
+
+def build_top_k(
+    ranked: Iterable[ScoreRecord],
+    start: Optional[datetime],
+    capacity: int,
+    match: Optional[Callable[[ScoreRecord], bool]] = None,
+) -> TopK:
+    """Build a top K from records already in rank order, stopping once it is full.
+
+    Only records created at or after ``start`` (if given) and accepted by
+    ``match`` (if given) are kept.
+    """
+    top = TopK(to_epoch_us(start) if start is not None else 0, capacity)
+    for record in ranked:
+        if match is None or match(record):
+            if len(top) >= capacity and record.created_us >= top.start_us:
+                top.truncated = True
+                break
+            top.offer(record)
+    return top
@@ -0,0 +1,42 @@
+"""Operator endpoints, available only when ``ADMIN_TOKEN`` is set."""
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from ..config import get_settings
+from ..profiling import SamplingProfiler
+
+router = APIRouter()
+settings = get_settings()
+# Fed by ProfilingMiddleware, which main.py installs when profiling is configured.
+profiler = SamplingProfiler(
+    interval=settings.profile_interval_ms / 1000,
+    max_stacks=settings.profile_max_stacks,
+)
+
+
+def require_admin(token: Optional[str]) -> None:
+    """Reject the request unless ``token`` matches ``ADMIN_TOKEN``."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if token is None or not secrets.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    x_admin_token: Optional[str] = Header(None),
+    reset: bool = Query(False, description="Clear the collected stacks after reading them")
+) -> PlainTextResponse:
+    """Get the sampled request profile.
+
+    Return one ``frame;frame;frame count`` line per distinct stack seen
+    while profiled requests ran, most sampled first. The text is the
+    collapsed format read by ``flamegraph.pl`` and speedscope.
+    """
+    require_admin(x_admin_token)
+    samples = profiler.samples
+    return PlainTextResponse(profiler.collapsed(reset=reset), headers={"X-Profile-Samples": str(samples)})
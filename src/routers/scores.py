@@ -1,35 +1,96 @@
 """Scores API endpoints."""
 
+import asyncio
+import math
+import time
 from datetime import datetime
 from typing import Optional
 
+import anyio
 from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive
 
+from ..config import get_settings
+from ..metrics import TimedRoute
+from ..metrics.instruments import RATE_LIMIT_DECISIONS
 from ..models import (
     RetentionPolicy,
     Score,
     ScoreBatchInput,
     ScoreBatchResult,
     ScoreInput,
+    ScoreRank,
     ScoreWindow,
 )
-from ..rate_limit import RateLimiter
+from ..rate_limit import create_rate_limiter, default_endpoint_costs
+from ..repositories import DedupIndex, IdempotencyConflictError, InvalidCursorError, create_repository
+from ..repositories.windows import Window
+from ..serialization import encode_score
+from ..services.ndjson_ingest import ingest_ndjson
 from ..services.score_service import ScoreService
 
-router = APIRouter()
-score_service = ScoreService()
-rate_limiter = RateLimiter(max_tokens=30, refill_rate=0.5)  # 30 requests per minute
+router = APIRouter(route_class=TimedRoute)
+settings = get_settings()
+score_service = ScoreService(
+    create_repository(settings),
+    dedup=DedupIndex(settings.idempotency_max_keys, settings.idempotency_ttl_seconds),
+)
+# Reported in every ScoreWindow and enforced by the retention scheduler.
+retention_policy = RetentionPolicy.model_construct(days=settings.retention_days, max_records=settings.max_records)
+endpoint_costs = default_endpoint_costs(settings.rate_limit_bulk_item_cost)
+rate_limiters = {
+    "read": create_rate_limiter(settings, settings.rate_limit_read_tokens, settings.rate_limit_read_refill, name="read"),
+    "write": create_rate_limiter(settings, settings.rate_limit_write_tokens, settings.rate_limit_write_refill, name="write"),
+}
+# (denied, allowed) counters per bucket, indexed by the decision.
+rate_limit_decisions = {
+    bucket: (RATE_LIMIT_DECISIONS.labels(bucket, "denied"), RATE_LIMIT_DECISIONS.labels(bucket, "allowed"))
+    for bucket in rate_limiters
+}
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """Streaming response whose body is produced while the request body is still being read.
+
+    ``StreamingResponse`` normally drains ``receive`` to watch for a
+    disconnect, which would swallow the upload; here the request stream
+    itself reports the disconnect.
+    """
 
+    async def listen_for_disconnect(self, receive: Receive) -> None:
+        await anyio.sleep_forever()
 
-def check_rate_limit(request: Request, response: Response) -> None:
-    """Check rate limit and set headers. Raises HTTPException if rate limited."""
-    client_id = request.client.host if request.client else "unknown"
-    allowed, retry_after = rate_limiter.check_rate_limit(client_id)
 
-    # Set rate limit headers
-    response.headers["X-RateLimit-Limit"] = "30"
-    response.headers["X-RateLimit-Remaining"] = str(rate_limiter.get_remaining_tokens(client_id))
-    response.headers["X-RateLimit-Reset"] = str(int(retry_after) + 60)
+def client_id_for(request: Request) -> str:
+    """Identifier used to key rate limit buckets."""
+    return request.client.host if request.client else "unknown"
+
+
+def check_rate_limit(request: Request, response: Response, endpoint: str, items: int = 0) -> None:
+    """Charge the endpoint's cost and set headers. Raises HTTPException if rate limited."""
+    client_id = client_id_for(request)
+    cost = endpoint_costs[endpoint]
+    limiter = rate_limiters[cost.bucket]
+    # A charge larger than the whole bucket could never succeed; cap it at a full bucket.
+    tokens = min(cost.for_items(items), limiter.max_tokens)
+    allowed, remaining, retry_after = limiter.acquire(client_id, tokens)
+    rate_limit_decisions[cost.bucket][allowed].inc()
+
+    # Set rate limit headers for the bucket that was charged
+    seconds_until_full = (limiter.max_tokens - remaining) / limiter.refill_rate
+    response.headers["X-RateLimit-Limit"] = str(limiter.max_tokens)
+    response.headers["X-RateLimit-Remaining"] = str(remaining)
+    response.headers["X-RateLimit-Reset"] = str(math.ceil(time.time() + seconds_until_full))
+    response.headers["X-RateLimit-Cost"] = f"{tokens:g}"
 
     if not allowed:
         response.headers["Retry-After"] = str(int(retry_after))
@@ -46,29 +107,42 @@ async def list_scores(
     response: Response,
     limit: int = Query(default=10, ge=1, le=100, description="Maximum number of records to return"),
     cursor: Optional[str] = Query(None, description="Pagination cursor from a previous response"),
-    since: Optional[datetime] = Query(None, description="Return scores created at or after this timestamp")
-) -> ScoreWindow:
+    since: Optional[datetime] = Query(None, description="Return scores created at or after this timestamp"),
+    window: Optional[Window] = Query(None, description="Leaderboard window: daily (since UTC midnight), weekly (since Monday UTC) or all"),
+    tag: Optional[str] = Query(None, min_length=1, max_length=24, description="Only scores carrying this tag"),
+    platform: Optional[str] = Query(None, min_length=1, max_length=64, description="Only scores submitted from this client platform")
+) -> Response:
     """List leaderboard scores.
 
     Return the most recent high score entries ordered by points descending
-    then creation time descending. Supports cursor-based pagination and
-    optional freshness filters.
+    then creation time descending. Supports cursor-based pagination,
+    optional freshness filters, daily/weekly windows and tag or platform
+    leaderboards. Responses carry a
+    strong ETag derived from the leaderboard version and the window start;
+    a matching If-None-Match yields 304.
     """
     # Apply rate limiting
-    check_rate_limit(request, response)
+    check_rate_limit(request, response, "list_scores")
 
     try:
-        scores = await score_service.get_top_scores(limit=limit, cursor=cursor, since=since)
+        version = await score_service.get_leaderboard_version()
+        etag = score_service.leaderboard_etag(version, since=since, window=window)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        # Headers set on the injected response (rate limits, ETag) must be carried over
+        if etag_matches(etag, request.headers.get("if-none-match")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
 
-        # Default retention policy
-        retention = RetentionPolicy.model_construct(days=14, max_records=100)
-
-        return ScoreWindow.model_construct(
-            generated_at=datetime.utcnow(),
-            retention=retention,
-            next_cursor=None,  # Simplified - would implement proper cursor logic
-            items=scores
+        body = await score_service.get_leaderboard_json(
+            retention_policy, limit=limit, cursor=cursor, since=since, version=version, window=window,
+            tag=tag, platform=platform
         )
+        return Response(content=body, media_type="application/json", headers=dict(response.headers))
+    except InvalidCursorError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        ) from exc
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -76,20 +150,76 @@ async def list_scores(
         ) from exc
 
 
+@router.get("/rank", response_model=ScoreRank)
+async def get_score_rank(
+    request: Request,
+    response: Response,
+    points: Optional[int] = Query(None, ge=0, description="Points value to place on the leaderboard"),
+    score_id: Optional[str] = Query(None, alias="id", description="Id of a stored score to place on the leaderboard")
+) -> ScoreRank:
+    """Get the rank and percentile of a points value or a stored score.
+
+    Exactly one of ``points`` and ``id`` must be given. Suspect scores are
+    excluded from ranking; ties follow the leaderboard order.
+    """
+    # Apply rate limiting
+    check_rate_limit(request, response, "get_score_rank")
+
+    if (points is None) == (score_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of points or id"
+        )
+
+    try:
+        return await score_service.get_rank(points=points, score_id=score_id)
+    except LookupError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(exc)
+        ) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to rank score"
+        ) from exc
+
+
 @router.post("", response_model=Score, status_code=status.HTTP_201_CREATED)
-async def submit_score(score_input: ScoreInput, request: Request, response: Response) -> Score:
+async def submit_score(score_input: ScoreInput, request: Request, response: Response) -> Response:
     """Submit a single score.
 
-    Store a new score for a nickname. Clients should deduplicate submissions
-    locally. The server may flag suspicious records and omit them from
-    ranking.
+    Store a new score for a nickname. Retries carrying the same
+    ``Idempotency-Key`` (or, without one, an identical payload) within the
+    dedup window return the originally stored score; reusing a key for a
+    different payload is refused with 409. The server may flag suspicious
+    records and omit them from ranking.
     """
     # Apply rate limiting
-    check_rate_limit(request, response)
+    check_rate_limit(request, response, "submit_score")
+
+    idempotency_key = request.headers.get("idempotency-key")
+    if idempotency_key and not score_input.idempotency_key:
+        if len(idempotency_key) > 128:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Idempotency-Key must be at most 128 characters"
+            )
+        score_input.idempotency_key = idempotency_key
 
     try:
         score = await score_service.create_score(score_input)
-        return score
+        return Response(
+            content=encode_score(score),
+            status_code=status.HTTP_201_CREATED,
+            media_type="application/json",
+            headers=dict(response.headers),
+        )
+    except IdempotencyConflictError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc)
+        ) from exc
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -109,9 +239,6 @@ async def submit_scores_bulk(batch_input: ScoreBatchInput, request: Request, res
     Upload up to 50 queued scores in one request. Each item is validated
     independently; the response details successes and failures.
     """
-    # Apply rate limiting
-    check_rate_limit(request, response)
-
     # Check for payload size limit before processing (per OpenAPI contract)
     if len(batch_input.items) > 50:
         raise HTTPException(
@@ -119,6 +246,9 @@ async def submit_scores_bulk(batch_input: ScoreBatchInput, request: Request, res
             detail="Batch size exceeds maximum limit of 50 items"
         )
 
+    # Apply rate limiting, charged per item in the batch
+    check_rate_limit(request, response, "submit_scores_bulk", items=len(batch_input.items))
+
     try:
         result = await score_service.create_scores_bulk(batch_input)
         return result
@@ -129,3 +259,36 @@ async def submit_scores_bulk(batch_input: ScoreBatchInput, request: Request, res
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process bulk submission"
         ) from exc
+
+
+@router.post("/stream", status_code=status.HTTP_200_OK, response_class=UploadStreamingResponse)
+async def submit_scores_stream(request: Request, response: Response) -> UploadStreamingResponse:
+    """Submit scores as newline-delimited JSON.
+
+    Each line is one ``ScoreInput``. Lines are validated and stored in
+    chunks while the upload is still arriving, and one NDJSON result per
+    line is streamed back, so memory use does not grow with upload size.
+    Stored chunks are charged against the write bucket; when it runs dry
+    the stream waits for tokens instead of failing.
+    """
+    check_rate_limit(request, response, "submit_scores_stream")
+
+    client_id = client_id_for(request)
+    cost = endpoint_costs["submit_scores_stream"]
+    limiter = rate_limiters[cost.bucket]
+    decisions = rate_limit_decisions[cost.bucket]
+
+    async def pace(items: int) -> None:
+        tokens = min(cost.per_item * items, limiter.max_tokens)
+        while True:
+            decision = limiter.acquire(client_id, tokens)
+            decisions[decision.allowed].inc()
+            if decision.allowed:
+                return
+            await asyncio.sleep(decision.retry_after)
+
+    return UploadStreamingResponse(
+        ingest_ndjson(score_service, request.stream(), before_store=pace),
+        media_type="application/x-ndjson",
+        headers=dict(response.headers),
+    )
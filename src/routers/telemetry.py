@@ -0,0 +1,69 @@
+"""Telemetry ingestion endpoint."""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+
+from ..config import get_settings
+from ..metrics import TimedRoute
+from ..models import TelemetryBatchInput, TelemetryBatchResult, TelemetryRollup, TelemetryRollupWindow
+from ..repositories.cursor import to_epoch_us
+from ..telemetry import EVENT_CODES, TelemetryEvent, create_pipeline
+from .scores import check_rate_limit
+
+router = APIRouter(route_class=TimedRoute)
+settings = get_settings()
+# Started and stopped by the application lifespan in main.py.
+pipeline = create_pipeline(settings)
+
+
+@router.post("", response_model=TelemetryBatchResult, status_code=status.HTTP_202_ACCEPTED)
+async def submit_telemetry(request: Request, response: Response, batch_input: TelemetryBatchInput) -> TelemetryBatchResult:
+    """Submit a batch of client analytics events.
+
+    Events are buffered and written to the telemetry sink in the
+    background, so the response never waits on storage. Under load events
+    are sampled out or dropped rather than slowing the request; the
+    response reports how many of each.
+    """
+    check_rate_limit(request, response, "submit_telemetry")
+    accepted, sampled_out, dropped = pipeline.submit([
+        TelemetryEvent(EVENT_CODES[item.event], item.timestamp * 1_000_000, item.properties, item.session_id)
+        for item in batch_input.events
+    ])
+    return TelemetryBatchResult.model_construct(accepted=accepted, sampled_out=sampled_out, dropped=dropped)
+
+
+@router.get("/rollups", response_model=TelemetryRollupWindow)
+async def get_telemetry_rollups(
+    request: Request,
+    response: Response,
+    since: Optional[datetime] = Query(None, description="Only buckets ending after this timestamp"),
+    until: Optional[datetime] = Query(None, description="Only buckets starting before this timestamp")
+) -> TelemetryRollupWindow:
+    """Get aggregated telemetry.
+
+    Return per-bucket event counts, property histograms and delivery lag
+    for the retained buckets overlapping the range, plus their total.
+    Aggregates cover every submitted event, including those later sampled
+    out or dropped.
+    """
+    check_rate_limit(request, response, "get_telemetry_rollups")
+
+    rollups = pipeline.rollups
+    if rollups is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Telemetry rollups are disabled"
+        )
+    # Naive timestamps are UTC, as for the scores endpoints.
+    buckets = rollups.query(
+        to_epoch_us(since) / 1_000_000 if since is not None else None,
+        to_epoch_us(until) / 1_000_000 if until is not None else None,
+    )
+    return TelemetryRollupWindow.model_construct(
+        bucket_seconds=rollups.bucket_seconds,
+        buckets=[TelemetryRollup.model_validate(bucket.to_dict()) for bucket in buckets],
+        total=TelemetryRollup.model_validate(rollups.total(buckets).to_dict()) if buckets else None,
+    )
@@ -0,0 +1,93 @@
+"""Direct JSON encoding of scores for hot response paths.
+
+``model_dump_json`` walks the Pydantic core schema for every score on every
+request. The encoders here write the same JSON (camelCase aliases, field
+order, RFC 3339 timestamps, ``null`` for missing optionals) straight from
+the attributes, using the C string escaper from the standard library.
+``tests/api/test_serialization.py`` keeps them byte-for-byte identical to
+Pydantic's output and checks them against ``docs/openapi.yaml``.
+"""
+
+from collections.abc import Sequence
+from datetime import datetime
+from json.encoder import encode_basestring
+from typing import Optional, Union
+
+from .models import ClientInfo, RetentionPolicy, Score
+from .repositories.record import ScoreRecord
+
+AnyScore = Union[Score, ScoreRecord]
+
+
+def _str(value: Optional[str]) -> str:
+    return "null" if value is None else encode_basestring(value)
+
+
+def format_datetime(value: datetime) -> str:
+    """Format a timestamp the way Pydantic does (``Z`` for UTC, microseconds only when set)."""
+    text = value.isoformat()
+    if text.endswith("+00:00"):
+        return text[:-6] + "Z"
+    return text
+
+
+def _client_json(client: Optional[ClientInfo]) -> str:
+    if client is None:
+        return "null"
+    return f'{{"version":{_str(client.version)},"platform":{_str(client.platform)},"ua":{_str(client.ua)}}}'
+
+
+def score_json(score: AnyScore) -> str:
+    """Encode one score as a JSON object.
+
+    Stored records are immutable, so a ``ScoreRecord`` is encoded once and
+    later pages only join its cached fragment.
+    """
+    if isinstance(score, ScoreRecord):
+        cached = score.json
+        if cached is None:
+            cached = score.json = _encode_score(score)
+        return cached
+    return _encode_score(score)
+
+
+def _encode_score(score: AnyScore) -> str:
+    tags = score.tags
+    if tags is None:
+        tags_json = "null"
+    else:
+        tags_json = "[" + ",".join([encode_basestring(tag) for tag in tags]) + "]"
+    return (
+        f'{{"id":{encode_basestring(score.id)},'
+        f'"nickname":{encode_basestring(score.nickname)},'
+        f'"points":{score.points:d},'
+        f'"lines":{score.lines:d},'
+        f'"levelReached":{score.level_reached:d},'
+        f'"durationSeconds":{score.duration_seconds:d},'
+        f'"seed":{_str(score.seed)},'
+        f'"createdAt":"{format_datetime(score.created_at)}",'
+        f'"suspect":{"true" if score.suspect else "false"},'
+        f'"client":{_client_json(score.client)},'
+        f'"tags":{tags_json}}}'
+    )
+
+
+def encode_score(score: AnyScore) -> bytes:
+    """Encode one score as a UTF-8 JSON document."""
+    return score_json(score).encode()
+
+
+def encode_score_window(
+    generated_at: datetime,
+    retention: RetentionPolicy,
+    next_cursor: Optional[str],
+    scores: Sequence[AnyScore],
+) -> bytes:
+    """Encode a ``ScoreWindow`` page as UTF-8 JSON."""
+    items = ",".join([score_json(score) for score in scores])
+    return (
+        f'{{"generatedAt":"{format_datetime(generated_at)}",'
+        f'"retention":{{"days":{retention.days:d},"maxRecords":{retention.max_records:d}}},'
+        f'"nextCursor":{_str(next_cursor)},'
+        f'"items":[{items}]}}'
+    ).encode()
@@ -0,0 +1,141 @@
+"""Pre-serialized leaderboard responses with write-driven invalidation."""
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import NamedTuple, Optional
+
+from ..repositories.cursor import RankKey, cursor_rank_key, decode_cursor, rank_key
+from ..repositories.record import ScoreRecord
+
+
+class CacheKey(NamedTuple):
+    """Identity of a cached leaderboard page."""
+    limit: int
+    cursor: Optional[str]
+    since_us: Optional[int]
+    tag: Optional[str] = None
+    platform: Optional[str] = None
+
+
+class ReadStamp(NamedTuple):
+    """State of the cache when a page read started; see ``LeaderboardCache.put``."""
+    version: int
+    writes: int
+
+
+class _Entry:
+    """Cached body plus the rank range it covers and the version it was read at."""
+    __slots__ = ("body", "version", "after", "last", "has_more", "since_us", "tag", "platform")
+
+    def __init__(
+        self,
+        body: bytes,
+        version: int,
+        after: Optional[RankKey],
+        last: Optional[RankKey],
+        has_more: bool,
+        since_us: Optional[int],
+        tag: Optional[str] = None,
+        platform: Optional[str] = None,
+    ) -> None:
+        self.body = body
+        self.version = version
+        self.after = after
+        self.last = last
+        self.has_more = has_more
+        self.since_us = since_us
+        self.tag = tag
+        self.platform = platform
+
+    def is_affected_by(self, key: RankKey, record: ScoreRecord) -> bool:
+        """Whether inserting ``record``, whose rank key is ``key``, changes the cached page."""
+        if self.since_us is not None and record.created_us < self.since_us:
+            return False
+        if (self.tag is not None or self.platform is not None) and not record.matches(self.tag, self.platform):
+            return False
+        if self.after is not None and key <= self.after:
+            return False
+        # A page with more rows behind it only changes if the new score
+        # lands before its last row; otherwise it only shifts later pages.
+        return not self.has_more or self.last is None or key < self.last
+
+
+class LeaderboardCache:
+    """LRU cache of serialized ``GET /scores`` bodies keyed by ``(limit, cursor, since, tag, platform)``.
+
+    Entries remember the rank range they cover, so a new score only evicts
+    the pages it would actually appear on (or whose ``nextCursor`` it would
+    change). Changes this process did not see (deletions, or writes from
+    another worker sharing the database) are detected through the
+    repository version and invalidate everything.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._version: Optional[int] = None
+        # Scores passed to ``invalidate_for`` so far, and the count when the version was last observed.
+        self._writes = 0
+        self._writes_at_version = 0
+
+    def observe_version(self, version: int) -> ReadStamp:
+        """Reconcile with the repository version before serving from the cache.
+
+        Each score passed to ``invalidate_for`` accounts for one version step;
+        any further advance means the leaderboard changed behind our back.
+        Returns the stamp to hand to ``put`` if the page is read afresh.
+        """
+        if self._version is not None and version - self._version > self._writes - self._writes_at_version:
+            self._entries.clear()
+        self._version = version
+        self._writes_at_version = self._writes
+        return ReadStamp(version, self._writes)
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        """Return the cached body for ``key``, if any."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.body
+
+    def put(self, key: CacheKey, body: bytes, scores: list[ScoreRecord], has_more: bool, stamp: ReadStamp) -> None:
+        """Store a page rendered from a read that started at ``stamp``, with the rank range it covers.
+
+        The page is dropped if a write was invalidated or another version
+        was observed since: the write may have landed after the read, and
+        its invalidation cannot have evicted a page stored only now.
+        """
+        if stamp.version != self._version or stamp.writes != self._writes:
+            return
+        after = cursor_rank_key(decode_cursor(key.cursor)) if key.cursor else None
+        last = rank_key(scores[-1]) if scores else None
+        self._entries[key] = _Entry(body, stamp.version, after, last, has_more, key.since_us, key.tag, key.platform)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_for(self, scores: Iterable[ScoreRecord]) -> None:
+        """Drop every cached page that the newly stored ``scores`` would change."""
+        keyed = [(rank_key(score), score) for score in scores]
+        self._writes += len(keyed)
+        if not self._entries:
+            return
+        stale = [
+            cache_key
+            for cache_key, entry in self._entries.items()
+            if any(entry.is_affected_by(key, score) for key, score in keyed)
+        ]
+        for cache_key in stale:
+            del self._entries[cache_key]
+
+    def clear(self) -> None:
+        """Drop all cached pages."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
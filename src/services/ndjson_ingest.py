@@ -0,0 +1,169 @@
+"""Streaming ingestion of newline-delimited JSON score uploads."""
+
+import json
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterator
+from typing import Optional, Union
+
+from pydantic import ValidationError
+
+from ..models import ScoreInput, ScoreRejection
+from ..repositories.record import ScoreRecord
+from ..serialization import encode_score
+from .score_service import ScoreService
+
+# Items stored per repository call.
+CHUNK_SIZE = 50
+# Longer lines are rejected without being buffered.
+MAX_LINE_BYTES = 8192
+
+# Field-level validation failures mapped onto the bulk endpoint's reason codes.
+_FIELD_REASONS = {
+    "points": "INVALID_POINTS",
+    "lines": "INVALID_LINES",
+    "levelReached": "INVALID_LEVEL",
+    "durationSeconds": "INVALID_DURATION",
+}
+
+
+def rejection_reason_for(exc: ValidationError) -> str:
+    """Translate the first validation error of a line into a reason code."""
+    error = exc.errors()[0]
+    loc = error.get("loc", ())
+    field = loc[0] if loc else None
+    if field == "nickname":
+        return "NICKNAME_TOO_LONG" if error["type"] == "string_too_long" else "EMPTY_NICKNAME"
+    if field == "tags":
+        return "TOO_MANY_TAGS" if len(loc) == 1 and error["type"] == "too_long" else "VALIDATION_ERROR"
+    if isinstance(field, str):
+        return _FIELD_REASONS.get(field, "VALIDATION_ERROR")
+    return "VALIDATION_ERROR"
+
+
+class LineSplitter:
+    """Incrementally split received bytes into numbered lines.
+
+    Blank lines are skipped but still counted. A line longer than
+    ``max_line_bytes`` is reported as ``None`` and discarded as it arrives,
+    so buffering never exceeds one maximum-length line.
+    """
+
+    def __init__(self, max_line_bytes: int = MAX_LINE_BYTES) -> None:
+        self.max_line_bytes = max_line_bytes
+        self._buffer = bytearray()
+        self._line_number = 0
+        self._overlong = False
+
+    def feed(self, chunk: bytes) -> list[tuple[int, Optional[bytes]]]:
+        """Consume ``chunk`` and return the lines it completed."""
+        lines: list[tuple[int, Optional[bytes]]] = []
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                self._append(chunk[start:])
+                return lines
+            self._append(chunk[start:end])
+            self._complete_line(lines)
+            start = end + 1
+
+    def close(self) -> list[tuple[int, Optional[bytes]]]:
+        """Return the final line if the upload did not end with a newline."""
+        lines: list[tuple[int, Optional[bytes]]] = []
+        if self._overlong or self._buffer.strip():
+            self._complete_line(lines)
+        return lines
+
+    def _append(self, data: bytes) -> None:
+        if self._overlong:
+            return
+        self._buffer += data
+        if len(self._buffer) > self.max_line_bytes:
+            self._overlong = True
+            self._buffer.clear()
+
+    def _complete_line(self, lines: list[tuple[int, Optional[bytes]]]) -> None:
+        self._line_number += 1
+        if self._overlong:
+            lines.append((self._line_number, None))
+        elif self._buffer.strip():
+            lines.append((self._line_number, bytes(self._buffer)))
+        self._overlong = False
+        self._buffer.clear()
+
+
+def _rejected(line_number: int, reason: str) -> bytes:
+    return json.dumps({"line": line_number, "status": "rejected", "reason": reason}).encode("utf-8") + b"\n"
+
+
+async def ingest_ndjson(
+    service: ScoreService,
+    chunks: AsyncIterable[bytes],
+    before_store: Optional[Callable[[int], Awaitable[None]]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_line_bytes: int = MAX_LINE_BYTES,
+) -> AsyncIterator[bytes]:
+    """Validate and store an NDJSON upload, yielding NDJSON results as it goes.
+
+    Each non-blank line yields ``{"line", "status": "accepted", "score"}``
+    or ``{"line", "status": "rejected", "reason"}`` in line order, with the
+    reason codes of ``POST /scores/bulk``. Parsed lines are stored through
+    ``ScoreService.ingest_scores`` in groups of up to ``chunk_size``; a
+    partial group is flushed whenever the received bytes run out, so
+    results follow the upload closely. ``before_store`` is awaited with the
+    group size before each store, which lets the caller pace the upload.
+    """
+    splitter = LineSplitter(max_line_bytes)
+    # Lines awaiting a result, in order: a parsed input or a reason code.
+    pending: list[tuple[int, Union[ScoreInput, str]]] = []
+    parsed = 0
+    out = bytearray()
+
+    async def store_pending() -> None:
+        nonlocal parsed
+        inputs = [item for _, item in pending if isinstance(item, ScoreInput)]
+        outcomes: Iterator[Union[ScoreRecord, ScoreRejection]] = iter(())
+        if inputs:
+            if before_store is not None:
+                await before_store(len(inputs))
+            outcomes = iter(await service.ingest_scores(inputs))
+        for line_number, item in pending:
+            outcome = next(outcomes) if isinstance(item, ScoreInput) else item
+            if isinstance(outcome, str):
+                out.extend(_rejected(line_number, outcome))
+            elif isinstance(outcome, ScoreRejection):
+                out.extend(_rejected(line_number, outcome.reason))
+            else:
+                out.extend(b'{"line":%d,"status":"accepted","score":' % line_number)
+                out.extend(encode_score(outcome))
+                out.extend(b"}\n")
+        pending.clear()
+        parsed = 0
+
+    async def consume(lines: list[tuple[int, Optional[bytes]]]) -> None:
+        nonlocal parsed
+        for line_number, line in lines:
+            if line is None:
+                pending.append((line_number, "VALIDATION_ERROR"))
+                continue
+            try:
+                pending.append((line_number, ScoreInput.model_validate_json(line)))
+            except ValidationError as exc:
+                pending.append((line_number, rejection_reason_for(exc)))
+                continue
+            parsed += 1
+            if parsed >= chunk_size:
+                await store_pending()
+
+    async for chunk in chunks:
+        await consume(splitter.feed(chunk))
+        if pending:
+            await store_pending()
+        if out:
+            yield bytes(out)
+            out.clear()
+
+    await consume(splitter.close())
+    if pending:
+        await store_pending()
+    if out:
+        yield bytes(out)
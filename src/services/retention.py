@@ -0,0 +1,77 @@
+"""Background enforcement of the score retention policy."""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from ..models import RetentionPolicy
+from .score_service import ScoreService
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionScheduler:
+    """Periodically expire scores that fall outside ``policy``.
+
+    Each sweep removes expired scores in slices of ``slice_size``, oldest
+    first, yielding to the event loop between slices so a large backlog
+    never stalls request handling. Sweeps run every ``interval_seconds``.
+    The policy is the same object reported in ``ScoreWindow.retention``.
+    """
+
+    def __init__(
+        self,
+        service: ScoreService,
+        policy: RetentionPolicy,
+        interval_seconds: float = 60.0,
+        slice_size: int = 500
+    ) -> None:
+        self.service = service
+        self.policy = policy
+        self.interval_seconds = interval_seconds
+        self.slice_size = slice_size
+        self.reclaimed_total = 0
+        self.last_reclaimed = 0
+        self.last_sweep_at: Optional[float] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def sweep(self) -> int:
+        """Expire everything currently outside the policy. Returns the number of removed scores."""
+        reclaimed = 0
+        while True:
+            removed = await self.service.expire_scores(self.policy, limit=self.slice_size)
+            reclaimed += removed
+            if removed < self.slice_size:
+                break
+            await asyncio.sleep(0)
+        self.reclaimed_total += reclaimed
+        self.last_reclaimed = reclaimed
+        self.last_sweep_at = time.time()
+        if reclaimed:
+            logger.info("Retention sweep reclaimed %d scores", reclaimed)
+        return reclaimed
+
+    async def run(self) -> None:
+        """Sweep forever; errors are logged and the next sweep retries."""
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Retention sweep failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        """Start sweeping in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="retention-scheduler")
+
+    async def stop(self) -> None:
+        """Cancel the background task and wait for it to finish."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
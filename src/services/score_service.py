@@ -1,18 +1,46 @@
 """Score business logic service."""
 
-from datetime import datetime
-from typing import Optional
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Optional, Union
 
-from ..models import Score, ScoreBatchInput, ScoreBatchResult, ScoreInput, ScoreRejection
+from ..metrics.instruments import REPOSITORY_OPERATION_SECONDS
+from ..models import RetentionPolicy, Score, ScoreBatchInput, ScoreBatchResult, ScoreInput, ScoreRank, ScoreRejection
 from ..repositories.base import ScoreRepository
+from ..repositories.cursor import RankKey, encode_cursor, rank_key, to_epoch_us
+from ..repositories.dedup import DedupIndex, IdempotencyConflictError
 from ..repositories.memory import MemoryScoreRepository
+from ..repositories.record import ScoreRecord, now_us
+from ..repositories.windows import Window, window_start
+from ..serialization import encode_score_window
+from .leaderboard_cache import CacheKey, LeaderboardCache
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Placed ahead of every storable score, so ranking it costs no counting.
+_LEADING_KEY: RankKey = (-(2**63 - 1), -(2**63 - 1), "")
+
+# Repository timings, resolved once so recording allocates nothing.
+_TIME_GET_SCORES = REPOSITORY_OPERATION_SECONDS.labels("get_scores")
+_TIME_GET_WINDOW_SCORES = REPOSITORY_OPERATION_SECONDS.labels("get_window_scores")
+_TIME_GET_FILTERED_SCORES = REPOSITORY_OPERATION_SECONDS.labels("get_filtered_scores")
+_TIME_GET_RANK = REPOSITORY_OPERATION_SECONDS.labels("get_rank")
+_TIME_CREATE_SCORES = REPOSITORY_OPERATION_SECONDS.labels("create_scores")
+_TIME_EXPIRE_SCORES = REPOSITORY_OPERATION_SECONDS.labels("expire_scores")
 
 
 class ScoreService:
     """Service for managing score operations."""
 
-    def __init__(self, repository: Optional[ScoreRepository] = None) -> None:
+    def __init__(
+        self,
+        repository: Optional[ScoreRepository] = None,
+        cache: Optional[LeaderboardCache] = None,
+        dedup: Optional[DedupIndex] = None
+    ) -> None:
         self._repository = repository or MemoryScoreRepository()
+        self.leaderboard_cache = cache or LeaderboardCache()
+        self.dedup = dedup or DedupIndex()
 
     async def get_top_scores(
         self,
@@ -21,15 +49,161 @@ class ScoreService:
         since: Optional[datetime] = None
     ) -> list[Score]:
         """Get top scores ordered by points desc, then created_at desc."""
-        return await self._repository.get_scores(limit=limit, cursor=cursor, since=since)
+        started = perf_counter()
+        records = await self._repository.get_scores(limit=limit, cursor=cursor, since=since)
+        _TIME_GET_SCORES.observe(perf_counter() - started)
+        return [record.to_score() for record in records]
+
+    async def get_top_scores_page(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        window: Optional[Window] = None,
+        tag: Optional[str] = None,
+        platform: Optional[str] = None
+    ) -> tuple[list[ScoreRecord], Optional[str]]:
+        """Get one leaderboard page of stored records and the cursor for the page after it.
+
+        One extra row is fetched to detect whether another page exists, so
+        the returned cursor is None exactly when the listing is exhausted.
+        A ``window`` on its own is served by the repository's windowed
+        leaderboard; combined with ``since``, the later of the two starts
+        applies. ``tag`` and ``platform`` restrict the listing to matching
+        scores.
+        """
+        filtered = tag is not None or platform is not None
+        started = perf_counter()
+        if window is not None and since is None and not filtered:
+            records = await self._repository.get_window_scores(window, limit=limit + 1, cursor=cursor)
+            _TIME_GET_WINDOW_SCORES.observe(perf_counter() - started)
+        else:
+            since_us = _since_us(since, window)
+            since = _EPOCH + timedelta(microseconds=since_us) if since_us is not None else None
+            if filtered:
+                records = await self._repository.get_filtered_scores(
+                    limit=limit + 1, cursor=cursor, since=since, tag=tag, platform=platform
+                )
+                _TIME_GET_FILTERED_SCORES.observe(perf_counter() - started)
+            else:
+                records = await self._repository.get_scores(limit=limit + 1, cursor=cursor, since=since)
+                _TIME_GET_SCORES.observe(perf_counter() - started)
+        if len(records) <= limit:
+            return records, None
+        page = records[:limit]
+        return page, encode_cursor(page[-1])
+
+    async def get_leaderboard_version(self) -> int:
+        """Get the version that changes whenever the leaderboard changes."""
+        return await self._repository.get_version()
+
+    def leaderboard_etag(self, version: int, since: Optional[datetime] = None, window: Optional[Window] = None) -> str:
+        """Strong ETag of a leaderboard read.
+
+        Includes the effective window start, so a daily or weekly
+        leaderboard changes its ETag at the UTC rollover even when no score
+        changed.
+        """
+        since_us = _since_us(since, window)
+        return f'"{version}"' if since_us is None else f'"{version}-{since_us}"'
+
+    async def get_score_count(self) -> int:
+        """Get the number of stored scores."""
+        return await self._repository.get_score_count()
+
+    async def get_leaderboard_json(
+        self,
+        retention: RetentionPolicy,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        version: Optional[int] = None,
+        window: Optional[Window] = None,
+        tag: Optional[str] = None,
+        platform: Optional[str] = None
+    ) -> bytes:
+        """Get a serialized ``ScoreWindow`` page, served from the cache when still valid.
+
+        ``version`` is the leaderboard version the caller already read, if any.
+        """
+        if version is None:
+            version = await self.get_leaderboard_version()
+        stamp = self.leaderboard_cache.observe_version(version)
+        # Windows are keyed by their start, so a rollover naturally misses the cache.
+        key = CacheKey(limit, cursor, _since_us(since, window), tag, platform)
+        body = self.leaderboard_cache.get(key)
+        if body is not None:
+            return body
+
+        records, next_cursor = await self.get_top_scores_page(
+            limit=limit, cursor=cursor, since=since, window=window, tag=tag, platform=platform
+        )
+        body = encode_score_window(datetime.now(timezone.utc), retention, next_cursor, records)
+        self.leaderboard_cache.put(key, body, records, has_more=next_cursor is not None, stamp=stamp)
+        return body
+
+    async def expire_scores(self, policy: RetentionPolicy, limit: Optional[int] = None) -> int:
+        """Remove up to ``limit`` scores outside ``policy``, oldest first."""
+        # The version bump this causes makes the leaderboard cache drop every page.
+        started = perf_counter()
+        removed = await self._repository.expire_scores(policy.days, policy.max_records, limit)
+        _TIME_EXPIRE_SCORES.observe(perf_counter() - started)
+        return removed
+
+    async def get_rank(self, points: Optional[int] = None, score_id: Optional[str] = None) -> ScoreRank:
+        """Get the leaderboard placement of a stored score or of a points value.
+
+        A points value is ranked as if it were submitted now, so it lands
+        ahead of stored scores with equal points, and ``total`` includes it.
+        Suspect scores are left out of every count and are not ranked
+        themselves.
+
+        Raises:
+            LookupError: No score is stored under ``score_id``.
+        """
+        if score_id is not None:
+            record = await self._repository.get_score(score_id)
+            if record is None:
+                raise LookupError(f"Score {score_id} not found")
+            started = perf_counter()
+            # A suspect score is not ranked; only the total is reported.
+            before, total = await self._repository.get_rank(_LEADING_KEY if record.suspect else rank_key(record))
+            _TIME_GET_RANK.observe(perf_counter() - started)
+            if record.suspect:
+                return ScoreRank.model_construct(score_id=record.id, points=record.points, rank=None, total=total, top_percent=None)
+            points = record.points
+        elif points is not None:
+            started = perf_counter()
+            before, total = await self._repository.get_rank((-points, -now_us(), ""))
+            _TIME_GET_RANK.observe(perf_counter() - started)
+            total += 1
+        else:
+            raise ValueError("Either points or a score id is required")
+        rank = before + 1
+        return ScoreRank.model_construct(
+            score_id=score_id,
+            points=points,
+            rank=rank,
+            total=total,
+            top_percent=round(100 * rank / total, 2),
+        )
 
     async def create_score(self, score_input: ScoreInput) -> Score:
-        """Create a new score entry."""
+        """Create a new score entry, or return the original for a repeated submission."""
         # Apply business rules validation
         await self._validate_score_input(score_input)
 
         # Use repository to create the score
-        return await self._repository.create_score(score_input)
+        (record,), stored = await self.dedup.create_once([score_input], self._create_scores)
+        self.leaderboard_cache.invalidate_for(stored)
+        return record.to_score()
+
+    async def _create_scores(self, score_inputs: Sequence[ScoreInput]) -> list[ScoreRecord]:
+        """Store ``score_inputs`` in the repository, timing the call."""
+        started = perf_counter()
+        records = await self._repository.create_scores(score_inputs)
+        _TIME_CREATE_SCORES.observe(perf_counter() - started)
+        return records
 
     async def _validate_score_input(self, score_input: ScoreInput) -> None:
         """Apply business validation rules."""
@@ -50,87 +224,98 @@ class ScoreService:
         """Create multiple score entries."""
         accepted: list[Score] = []
         rejected: list[ScoreRejection] = []
+        for outcome in await self.ingest_scores(batch_input.items):
+            if isinstance(outcome, ScoreRejection):
+                rejected.append(outcome)
+            else:
+                accepted.append(outcome.to_score())
+        return ScoreBatchResult.model_construct(accepted=accepted, rejected=rejected)
 
-        for score_input in batch_input.items:
+    async def ingest_scores(
+        self,
+        score_inputs: Sequence[ScoreInput]
+    ) -> list[Union[ScoreRecord, ScoreRejection]]:
+        """Validate and store a batch, returning each item's outcome in input order.
+
+        The batch is partitioned in one pass, then every accepted item not
+        seen before is stored with a single repository call. Repeated
+        submissions resolve to the score originally stored for them.
+        """
+        rejections: list[Optional[ScoreRejection]] = []
+        valid: list[ScoreInput] = []
+        for score_input in score_inputs:
+            reason = _rejection_reason(score_input)
+            if reason is None:
+                valid.append(score_input)
+                rejections.append(None)
+            else:
+                rejections.append(ScoreRejection.model_construct(reason=reason, payload=score_input))
+
+        stored_outcomes: Sequence[Union[ScoreRecord, ScoreRejection]] = []
+        if valid:
             try:
-                # Comprehensive validation
-                if not score_input.nickname or len(score_input.nickname.strip()) == 0:
-                    rejected.append(ScoreRejection(
-                        reason="EMPTY_NICKNAME",
-                        payload=score_input
-                    ))
-                    continue
-
-                if len(score_input.nickname) > 16:
-                    rejected.append(ScoreRejection(
-                        reason="NICKNAME_TOO_LONG",
-                        payload=score_input
-                    ))
-                    continue
-
-                if score_input.points < 0:
-                    rejected.append(ScoreRejection(
-                        reason="INVALID_POINTS",
-                        payload=score_input
-                    ))
-                    continue
-
-                # Check for optional field validation
-                if score_input.lines is not None and score_input.lines < 0:
-                    rejected.append(ScoreRejection(
-                        reason="INVALID_LINES",
-                        payload=score_input
-                    ))
-                    continue
-
-                if score_input.level_reached is not None and score_input.level_reached < 0:
-                    rejected.append(ScoreRejection(
-                        reason="INVALID_LEVEL",
-                        payload=score_input
-                    ))
-                    continue
-
-                if score_input.duration_seconds is not None and score_input.duration_seconds < 0:
-                    rejected.append(ScoreRejection(
-                        reason="INVALID_DURATION",
-                        payload=score_input
-                    ))
-                    continue
-
-                # Validate tags if present
-                if score_input.tags and len(score_input.tags) > 5:
-                    rejected.append(ScoreRejection(
-                        reason="TOO_MANY_TAGS",
-                        payload=score_input
-                    ))
-                    continue
-
-                if score_input.tags:
-                    for tag in score_input.tags:
-                        if len(tag) > 24:
-                            rejected.append(ScoreRejection(
-                                reason="TAG_TOO_LONG",
-                                payload=score_input
-                            ))
-                            break
-                    else:
-                        # No break occurred, validation passed
-                        score = await self.create_score(score_input)
-                        accepted.append(score)
-                else:
-                    # No tags to validate
-                    score = await self.create_score(score_input)
-                    accepted.append(score)
-
-            except ValueError:
-                rejected.append(ScoreRejection(
-                    reason="VALIDATION_ERROR",
-                    payload=score_input
-                ))
+                stored_outcomes = await self._store_once(valid)
             except Exception:
-                rejected.append(ScoreRejection(
-                    reason="PROCESSING_ERROR",
-                    payload=score_input
-                ))
+                stored_outcomes = [
+                    ScoreRejection.model_construct(reason="PROCESSING_ERROR", payload=score_input)
+                    for score_input in valid
+                ]
+        # Accepted items take the stored outcomes in order, one per gap between rejections.
+        accepted = iter(stored_outcomes)
+        return [rejection if rejection is not None else next(accepted) for rejection in rejections]
+
+    async def _store_once(self, score_inputs: Sequence[ScoreInput]) -> list[Union[ScoreRecord, ScoreRejection]]:
+        """Store each input once, rejecting those whose idempotency key names another payload."""
+        try:
+            records, stored = await self.dedup.create_once(score_inputs, self._create_scores)
+        except IdempotencyConflictError as exc:
+            conflicts = set(exc.indices)
+            # Nothing was stored, so the rest of the batch goes through on its own.
+            kept = [score_input for index, score_input in enumerate(score_inputs) if index not in conflicts]
+            outcomes = iter(await self._store_once(kept) if kept else [])
+            return [
+                ScoreRejection.model_construct(reason="IDEMPOTENCY_CONFLICT", payload=score_input)
+                if index in conflicts else next(outcomes)
+                for index, score_input in enumerate(score_inputs)
+            ]
+        self.leaderboard_cache.invalidate_for(stored)
+        return list(records)
+
+
+def _since_us(since: Optional[datetime], window: Optional[Window]) -> Optional[int]:
+    """Effective lower bound on creation time, in epoch microseconds, of a ``since``/``window`` pair."""
+    bounds = [to_epoch_us(value) for value in (since, window_start(window) if window else None) if value is not None]
+    return max(bounds) if bounds else None
+
+
+def _rejection_reason(score_input: ScoreInput) -> Optional[str]:
+    """Return the reason code for the first rule ``score_input`` breaks, or None.
 
-        return ScoreBatchResult(accepted=accepted, rejected=rejected)
+    Most rules duplicate ``ScoreInput`` field constraints; they still matter
+    for inputs built without validation (``model_construct``).
+    """
+    try:
+        nickname = score_input.nickname
+        if not nickname or nickname.isspace():
+            return "EMPTY_NICKNAME"
+        if len(nickname) > 16:
+            return "NICKNAME_TOO_LONG"
+        if score_input.points < 0:
+            return "INVALID_POINTS"
+        if score_input.lines is not None and score_input.lines < 0:
+            return "INVALID_LINES"
+        if score_input.level_reached is not None and score_input.level_reached < 0:
+            return "INVALID_LEVEL"
+        if score_input.duration_seconds is not None and score_input.duration_seconds < 0:
+            return "INVALID_DURATION"
+        tags = score_input.tags
+        if tags:
+            if len(tags) > 5:
+                return "TOO_MANY_TAGS"
+            if any(len(tag) > 24 for tag in tags):
+                return "TAG_TOO_LONG"
+    except ValueError:
+        return "VALIDATION_ERROR"
+    except Exception:
+        return "PROCESSING_ERROR"
+    return None
@@ -1 +1,47 @@
 """Telemetry and analytics collection."""
+
+from ..config import Settings
+from .buffer import RingBuffer
+from .encoding import BatchEncoder, decode_binary
+from .events import EVENT_CODES, EventType, TelemetryCollector, TelemetryEvent
+from .pipeline import TelemetryPipeline
+from .rollups import LogHistogram, RollupBucket, TelemetryRollups
+from .sinks import MemorySink, RotatingFileSink, TelemetrySink
+
+
+def create_pipeline(settings: Settings) -> TelemetryPipeline:
+    """Build the ingestion pipeline, writing rotated NDJSON files to ``TELEMETRY_DIR``."""
+    sink = RotatingFileSink(
+        settings.telemetry_dir,
+        max_bytes=settings.telemetry_file_max_bytes,
+        max_files=settings.telemetry_max_files,
+        compress=settings.telemetry_compress,
+        encoding=settings.telemetry_format,
+    )
+    return TelemetryPipeline(
+        sink,
+        capacity=settings.telemetry_buffer_size,
+        batch_size=settings.telemetry_batch_size,
+        flush_interval=settings.telemetry_flush_seconds,
+        sample_rate=settings.telemetry_sample_rate if settings.enable_telemetry else 0.0,
+        rollups=TelemetryRollups(settings.telemetry_rollup_seconds, settings.telemetry_rollup_buckets),
+    )
+
+
+__all__ = [
+    "EventType",
+    "EVENT_CODES",
+    "TelemetryEvent",
+    "TelemetryCollector",
+    "RingBuffer",
+    "BatchEncoder",
+    "decode_binary",
+    "TelemetryPipeline",
+    "TelemetryRollups",
+    "RollupBucket",
+    "LogHistogram",
+    "TelemetrySink",
+    "MemorySink",
+    "RotatingFileSink",
+    "create_pipeline",
+]
@@ -0,0 +1,61 @@
+"""Bounded ring buffer between telemetry ingestion and the sink."""
+
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RingBuffer(Generic[T]):
+    """Fixed-capacity FIFO over a list preallocated at construction.
+
+    ``push`` never grows the buffer: when it is full the item is refused
+    and counted in ``dropped``. Producers and the draining task all run on
+    the event loop thread, so no locking is needed.
+    """
+
+    __slots__ = ("capacity", "dropped", "_slots", "_head", "_size")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.dropped = 0
+        self._slots: list[Optional[T]] = [None] * capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def fill_ratio(self) -> float:
+        """Occupied fraction of the buffer, from 0.0 to 1.0."""
+        return self._size / self.capacity
+
+    def push(self, item: T) -> bool:
+        """Append ``item``; returns False (and counts a drop) if the buffer is full."""
+        if self._size == self.capacity:
+            self.dropped += 1
+            return False
+        self._slots[(self._head + self._size) % self.capacity] = item
+        self._size += 1
+        return True
+
+    def drain(self, max_items: Optional[int] = None) -> list[T]:
+        """Remove and return up to ``max_items`` of the oldest items."""
+        count = self._size if max_items is None else min(max_items, self._size)
+        if count <= 0:
+            return []
+        head, capacity, slots = self._head, self.capacity, self._slots
+        end = head + count
+        if end <= capacity:
+            items = slots[head:end]
+            slots[head:end] = [None] * count
+        else:
+            end -= capacity
+            items = slots[head:] + slots[:end]
+            slots[head:] = [None] * (capacity - head)
+            slots[:end] = [None] * end
+        self._head = end % capacity
+        self._size -= count
+        return items  # type: ignore[return-value]
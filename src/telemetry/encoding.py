@@ -0,0 +1,132 @@
+"""Encoding of drained telemetry batches into one reusable buffer.
+
+Two formats are supported. NDJSON writes one object per event, shaped like
+``TelemetryEvent.to_dict()``. The binary format writes one length-prefixed
+record per event::
+
+    <u32 length of the rest> <u8 event code> <i64 timestamp_ns>
+    <u16 session id length> <session id utf-8> <properties JSON utf-8>
+
+Binary files start with ``BINARY_MAGIC``; ``decode_binary`` reads them back.
+"""
+
+import json
+import logging
+import struct
+from collections.abc import Iterator, Sequence
+from json.encoder import encode_basestring_ascii
+from typing import Literal, Optional
+
+from .events import EVENT_TYPES, TelemetryEvent
+
+logger = logging.getLogger(__name__)
+
+Encoding = Literal["ndjson", "binary"]
+BINARY_MAGIC = b"TLM1"
+
+_HEADER = struct.Struct("<IBqH")
+# Length field excluded: code, timestamp and session id length.
+_FIXED = _HEADER.size - 4
+_INITIAL_CAPACITY = 64 * 1024
+# json.dumps builds a new encoder per call when given options; reuse one.
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+# Start of each NDJSON line, per event code.
+_NDJSON_PREFIXES = tuple(
+    f'{{"event_type":"{event_type.value}","timestamp_ns":' for event_type in EVENT_TYPES
+)
+
+
+class BatchEncoder:
+    """Encode whole batches into a buffer that is allocated once and reused.
+
+    Events are written straight into the buffer without building a dict
+    per event. The returned memoryview aliases the buffer and is only valid
+    until the next ``encode`` call; the buffer grows when a batch does not
+    fit and is never shrunk. An event that cannot be encoded is logged,
+    counted in ``skipped`` and left out, so it never costs the rest of
+    its batch.
+    """
+
+    def __init__(self, encoding: Encoding = "ndjson", capacity: int = _INITIAL_CAPACITY) -> None:
+        self.encoding = encoding
+        self.skipped = 0
+        self._buffer = bytearray(capacity)
+        self._size = 0
+        self._view: Optional[memoryview] = None
+
+    def encode(self, events: Sequence[TelemetryEvent]) -> memoryview:
+        """Encode ``events`` and return a view of the encoded bytes."""
+        if self._view is not None:
+            # The buffer cannot grow while a view of it is exported.
+            self._view.release()
+        self._size = 0
+        binary = self.encoding == "binary"
+        for event in events:
+            try:
+                if binary:
+                    self._put_binary(event)
+                else:
+                    self._put(_ndjson_line(event).encode())
+            except (struct.error, TypeError, ValueError, OverflowError):
+                self.skipped += 1
+                logger.warning("Skipping telemetry event that cannot be encoded", exc_info=True)
+        self._view = memoryview(self._buffer)[:self._size]
+        return self._view
+
+    def _reserve(self, count: int) -> int:
+        """Make room for ``count`` more bytes and return where they start."""
+        start = self._size
+        end = start + count
+        capacity = len(self._buffer)
+        if end > capacity:
+            while capacity < end:
+                capacity *= 2
+            self._buffer.extend(bytes(capacity - len(self._buffer)))
+        self._size = end
+        return start
+
+    def _put(self, data: bytes) -> None:
+        start = self._reserve(len(data))
+        self._buffer[start:self._size] = data
+
+    def _put_binary(self, event: TelemetryEvent) -> None:
+        session = event.session_id.encode() if event.session_id else b""
+        properties = _dumps(event.properties).encode() if event.properties else b""
+        length = _FIXED + len(session) + len(properties)
+        # Packed before reserving, so an out-of-range field leaves the buffer untouched.
+        header = _HEADER.pack(length, event.code, event.timestamp_ns, len(session))
+        start = self._reserve(4 + length)
+        self._buffer[start:start + _HEADER.size] = header
+        offset = start + _HEADER.size
+        self._buffer[offset:offset + len(session)] = session
+        self._buffer[offset + len(session):self._size] = properties
+
+
+def _ndjson_line(event: TelemetryEvent) -> str:
+    session = "null" if event.session_id is None else encode_basestring_ascii(event.session_id)
+    properties = _dumps(event.properties) if event.properties else "{}"
+    return (
+        f'{_NDJSON_PREFIXES[event.code]}{event.timestamp_ns},'
+        f'"session_id":{session},"properties":{properties}}}\n'
+    )
+
+
+def iter_binary(data: bytes) -> Iterator[TelemetryEvent]:
+    """Decode the records in ``data`` (without the file magic)."""
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        length, code, timestamp_ns, session_length = _HEADER.unpack_from(view, offset)
+        start = offset + _HEADER.size
+        end = offset + 4 + length
+        session: Optional[str] = bytes(view[start:start + session_length]).decode() or None
+        properties = bytes(view[start + session_length:end])
+        yield TelemetryEvent(code, timestamp_ns, json.loads(properties) if properties else None, session)
+        offset = end
+
+
+def decode_binary(data: bytes) -> list[TelemetryEvent]:
+    """Decode a binary telemetry file's contents, including its magic."""
+    if data[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError("Not a binary telemetry file")
+    return list(iter_binary(data[len(BINARY_MAGIC):]))
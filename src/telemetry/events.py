@@ -1,12 +1,15 @@
 """Telemetry event collection and batching."""
 
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 class EventType(str, Enum):
     """Supported telemetry event types."""
@@ -16,27 +19,70 @@ class EventType(str, Enum):
     HOLD_USED = "hold_used"
     SETTING_CHANGED = "setting_changed"
     SCORE_SUBMITTED = "score_submitted"
+    OFFLINE_SCORE_QUEUED = "offline_score_queued"
+    PAUSE_GAME = "pause_game"
+    RESUME_GAME = "resume_game"
+
+
+# Integer code of each event type: its position in this tuple. Codes are
+# persisted by the binary batch encoding, so new types must be appended.
+EVENT_TYPES: tuple[EventType, ...] = tuple(EventType)
+EVENT_CODES: dict[EventType, int] = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
 
 
 class TelemetryEvent:
-    """Individual telemetry event."""
+    """Individual telemetry event.
+
+    Stored compactly: an integer event code, an epoch-nanosecond
+    timestamp and the properties mapping as received (None when empty).
+    """
+
+    __slots__ = ("code", "timestamp_ns", "properties", "session_id")
 
     def __init__(
         self,
-        event_type: EventType,
+        code: int,
+        timestamp_ns: int,
         properties: Optional[dict[str, Any]] = None,
-        timestamp: Optional[datetime] = None
+        session_id: Optional[str] = None
     ):
-        self.event_type = event_type
-        self.properties = properties or {}
-        self.timestamp = timestamp or datetime.utcnow()
+        self.code = code
+        self.timestamp_ns = timestamp_ns
+        self.properties = properties or None
+        self.session_id = session_id
+
+    @classmethod
+    def create(
+        cls,
+        event_type: EventType,
+        properties: Optional[dict[str, Any]] = None,
+        timestamp: Optional[datetime] = None,
+        session_id: Optional[str] = None
+    ) -> "TelemetryEvent":
+        """Build an event from its type and an aware datetime (default: now)."""
+        if timestamp is None:
+            timestamp_ns = time.time_ns()
+        else:
+            timestamp_ns = (timestamp - _EPOCH) // timedelta(microseconds=1) * 1000
+        return cls(EVENT_CODES[event_type], timestamp_ns, properties, session_id)
+
+    @property
+    def event_type(self) -> EventType:
+        """Event type for ``code``."""
+        return EVENT_TYPES[self.code]
+
+    @property
+    def timestamp(self) -> datetime:
+        """Event time as an aware UTC datetime (microsecond precision)."""
+        return _EPOCH + timedelta(microseconds=self.timestamp_ns // 1000)
 
     def to_dict(self) -> dict[str, Any]:
-        """Convert event to dictionary for serialization."""
+        """Convert event to dictionary; the same shape as an NDJSON line from ``BatchEncoder``."""
         return {
             "event_type": self.event_type.value,
-            "properties": self.properties,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp_ns": self.timestamp_ns,
+            "session_id": self.session_id,
+            "properties": self.properties or {}
         }
 
 
@@ -49,13 +95,13 @@ class TelemetryCollector:
 
     def track(self, event_type: EventType, properties: Optional[dict[str, Any]] = None) -> None:
         """Track a telemetry event."""
-        event = TelemetryEvent(event_type, properties)
+        event = TelemetryEvent.create(event_type, properties)
         self._events.append(event)
 
         # Log event for development
-        logger.info(f"Telemetry: {event.event_type.value}", extra={
+        logger.info(f"Telemetry: {event_type.value}", extra={
             "event_properties": event.properties,
-            "timestamp": event.timestamp
+            "timestamp_ns": event.timestamp_ns
         })
 
         # Auto-flush if batch is full
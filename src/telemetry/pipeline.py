@@ -0,0 +1,137 @@
+"""Telemetry ingestion: ring buffer in front, background drain to a sink behind."""
+
+import asyncio
+import logging
+import random
+from collections.abc import Callable, Sequence
+from typing import Optional
+
+from .buffer import RingBuffer
+from .events import TelemetryEvent
+from .rollups import TelemetryRollups
+from .sinks import TelemetrySink
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryPipeline:
+    """Accept events without waiting on I/O and drain them to ``sink`` in batches.
+
+    ``submit`` only samples and pushes into a preallocated ring buffer, so
+    request latency never depends on the sink. Overload shows up in the
+    counters instead: ``sampled_out`` for events shed by sampling (the
+    configured ``sample_rate``, lowered towards zero as the buffer fills
+    past ``shed_threshold``) and ``dropped`` for events refused by a full
+    buffer. A background task drains the buffer every ``flush_interval``
+    seconds, or as soon as ``batch_size`` events are waiting.
+
+    With ``rollups``, every submitted event is folded into the aggregates
+    before sampling, so counts and histograms stay exact under load.
+    """
+
+    def __init__(
+        self,
+        sink: TelemetrySink,
+        capacity: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 5.0,
+        sample_rate: float = 1.0,
+        shed_threshold: float = 0.5,
+        rollups: Optional[TelemetryRollups] = None,
+        rng: Callable[[], float] = random.random
+    ) -> None:
+        self.sink = sink
+        self.rollups = rollups
+        self.buffer: RingBuffer[TelemetryEvent] = RingBuffer(capacity)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.shed_threshold = shed_threshold
+        self.accepted = 0
+        self.sampled_out = 0
+        self.written = 0
+        self.failed = 0
+        self._rng = rng
+        self._wakeup: Optional[asyncio.Event] = None
+        self._closing = False
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def dropped(self) -> int:
+        """Events refused because the buffer was full."""
+        return self.buffer.dropped
+
+    def keep_probability(self) -> float:
+        """Chance that the next event is kept rather than sampled out."""
+        fill = self.buffer.fill_ratio
+        if fill <= self.shed_threshold:
+            return self.sample_rate
+        return self.sample_rate * (1.0 - fill) / (1.0 - self.shed_threshold)
+
+    def submit(self, events: Sequence[TelemetryEvent]) -> tuple[int, int, int]:
+        """Buffer ``events``. Returns ``(accepted, sampled_out, dropped)`` for this call."""
+        if self.rollups is not None:
+            self.rollups.add(events)
+        accepted = sampled_out = dropped = 0
+        buffer, rng = self.buffer, self._rng
+        for event in events:
+            probability = self.keep_probability()
+            if probability < 1.0 and rng() >= probability:
+                sampled_out += 1
+            elif buffer.push(event):
+                accepted += 1
+            else:
+                dropped += 1
+        self.accepted += accepted
+        self.sampled_out += sampled_out
+        if self._wakeup is not None and len(buffer) >= self.batch_size:
+            self._wakeup.set()
+        return accepted, sampled_out, dropped
+
+    async def flush(self) -> int:
+        """Drain everything currently buffered to the sink. Returns the number of events written."""
+        written = 0
+        while len(self.buffer):
+            batch = self.buffer.drain(self.batch_size)
+            try:
+                await self.sink.write(batch)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Telemetry sink failed; discarded %d events", len(batch))
+            else:
+                written += len(batch)
+        self.written += written
+        return written
+
+    async def run(self) -> None:
+        """Drain on every wake-up or flush interval until ``stop`` is called."""
+        wakeup = self._wakeup
+        assert wakeup is not None, "TelemetryPipeline.start() creates the wake-up event"
+        while True:
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            await self.flush()
+            if self._closing:
+                return
+
+    def start(self) -> None:
+        """Start draining in a background task."""
+        if self._task is None:
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run(), name="telemetry-pipeline")
+
+    async def stop(self) -> None:
+        """Drain what is left, stop the background task and close the sink."""
+        task, self._task = self._task, None
+        if task is not None:
+            self._closing = True
+            assert self._wakeup is not None
+            self._wakeup.set()
+            await task
+            self._wakeup = None
+        await self.flush()
+        await self.sink.close()
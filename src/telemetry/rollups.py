@@ -0,0 +1,217 @@
+"""Streaming rollups of telemetry into fixed-size time buckets.
+
+Raw events are too numerous to keep, so each accepted batch is folded into
+per-minute (by default) aggregates: a counter per event type, log-linear
+histograms of selected numeric properties and a sketch of delivery lag.
+Only a bounded number of buckets is retained.
+"""
+
+import math
+import time
+from collections import deque
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from .events import EVENT_CODES, EVENT_TYPES, EventType, TelemetryEvent
+
+# Numeric properties recorded in a histogram, per event type. The client
+# sends these from analytics/events.ts (trackGameOver, trackLineClear).
+HISTOGRAM_PROPERTIES: dict[EventType, tuple[str, ...]] = {
+    EventType.GAME_OVER: ("score", "lines", "level", "duration"),
+    EventType.LINE_CLEAR: ("linesCleared", "combo"),
+    EventType.SCORE_SUBMITTED: ("points",),
+}
+_HISTOGRAM_KEYS: dict[int, tuple[tuple[str, str], ...]] = {
+    EVENT_CODES[event_type]: tuple((name, f"{event_type.value}.{name}") for name in names)
+    for event_type, names in HISTOGRAM_PROPERTIES.items()
+}
+
+# Values below this are counted exactly; above it each power of two is
+# split into 8 sub-buckets, bounding the relative error to 1/16.
+_LINEAR_LIMIT = 16
+_SUB_BUCKETS = 8
+
+
+def _bucket_index(value: int) -> int:
+    if value < _LINEAR_LIMIT:
+        return value
+    shift = value.bit_length() - 4
+    return _LINEAR_LIMIT + (shift - 1) * _SUB_BUCKETS + (value >> shift) - _SUB_BUCKETS
+
+
+def _bucket_midpoint(index: int) -> float:
+    if index < _LINEAR_LIMIT:
+        return float(index)
+    shift, offset = divmod(index - _LINEAR_LIMIT, _SUB_BUCKETS)
+    shift += 1
+    low = (offset + _SUB_BUCKETS) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+class LogHistogram:
+    """HDR-style histogram of non-negative values with bounded relative error.
+
+    Counts are kept sparsely per log-linear bucket, so memory grows with the
+    number of distinct magnitudes seen (at most a few hundred buckets), not
+    with the number of values. Count, sum, min and max are exact.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "_counts")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self._counts: dict[int, int] = {}
+
+    def record(self, value: float) -> None:
+        """Add one value; negative values are recorded as 0 and non-finite ones ignored."""
+        if not math.isfinite(value):
+            return
+        value = max(value, 0.0)
+        index = _bucket_index(int(value))
+        self._counts[index] = self._counts.get(index, 0) + 1
+        if not self.count:
+            self.min = self.max = value
+        elif value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "LogHistogram") -> None:
+        """Add every value recorded in ``other``."""
+        if not other.count:
+            return
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        """Approximate value at quantile ``q`` (0..1), clamped to the exact min and max."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen > rank:
+                return min(max(_bucket_midpoint(index), self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        """Count, sum, min, max, mean and the 50th/90th/99th percentiles."""
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class RollupBucket:
+    """Aggregates of the events received during ``[start, start + seconds)``."""
+
+    __slots__ = ("start", "seconds", "counts", "histograms", "lag_ms")
+
+    def __init__(self, start: int, seconds: int) -> None:
+        self.start = start
+        self.seconds = seconds
+        self.counts = [0] * len(EVENT_TYPES)
+        self.histograms: dict[str, LogHistogram] = {}
+        # Server receive time minus client event time.
+        self.lag_ms = LogHistogram()
+
+    def add(self, event: TelemetryEvent, received_ns: int) -> None:
+        """Count ``event`` and record its lag and histogram properties."""
+        code = event.code
+        self.counts[code] += 1
+        self.lag_ms.record((received_ns - event.timestamp_ns) / 1_000_000)
+        properties = event.properties
+        if properties is None:
+            return
+        for name, key in _HISTOGRAM_KEYS.get(code, ()):
+            value = properties.get(name)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = LogHistogram()
+                histogram.record(value)
+
+    def merge(self, other: "RollupBucket") -> None:
+        """Fold ``other`` into this bucket (used to total a range)."""
+        for code, count in enumerate(other.counts):
+            self.counts[code] += count
+        for key, histogram in other.histograms.items():
+            self.histograms.setdefault(key, LogHistogram()).merge(histogram)
+        self.lag_ms.merge(other.lag_ms)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Plain form keyed like the ``TelemetryRollup`` JSON."""
+        return {
+            "start": datetime.fromtimestamp(self.start, timezone.utc),
+            "end": datetime.fromtimestamp(self.start + self.seconds, timezone.utc),
+            "counts": {
+                event_type.value: count
+                for event_type, count in zip(EVENT_TYPES, self.counts)
+                if count
+            },
+            "histograms": {key: histogram.summary() for key, histogram in sorted(self.histograms.items())},
+            "lagMs": self.lag_ms.summary(),
+        }
+
+
+class TelemetryRollups:
+    """Bounded ring of ``RollupBucket`` objects, ``bucket_seconds`` wide.
+
+    Events are bucketed by the time the server received them, so a batch
+    delayed on the client counts when it arrives; the lag sketch records
+    how late. Buckets without events are not materialized, and only the
+    newest ``max_buckets`` are kept.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, max_buckets: int = 1440) -> None:
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self._buckets: deque[RollupBucket] = deque(maxlen=max_buckets)
+
+    def add(self, events: Iterable[TelemetryEvent], received_ns: Optional[int] = None) -> None:
+        """Fold a batch received at ``received_ns`` (default: now) into its bucket."""
+        if received_ns is None:
+            received_ns = time.time_ns()
+        start = received_ns // 1_000_000_000 // self.bucket_seconds * self.bucket_seconds
+        buckets = self._buckets
+        # A clock stepping backwards keeps using the newest bucket.
+        if not buckets or buckets[-1].start < start:
+            buckets.append(RollupBucket(start, self.bucket_seconds))
+        bucket = buckets[-1]
+        for event in events:
+            bucket.add(event, received_ns)
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None) -> list[RollupBucket]:
+        """Buckets overlapping ``[since, until)`` (Unix seconds), oldest first."""
+        return [
+            bucket for bucket in self._buckets
+            if (since is None or bucket.start + bucket.seconds > since)
+            and (until is None or bucket.start < until)
+        ]
+
+    def total(self, buckets: Iterable[RollupBucket]) -> RollupBucket:
+        """Merge ``buckets`` into one spanning from the first start to the last end."""
+        buckets = list(buckets)
+        if not buckets:
+            return RollupBucket(0, 0)
+        merged = RollupBucket(buckets[0].start, buckets[-1].start + buckets[-1].seconds - buckets[0].start)
+        for bucket in buckets:
+            merged.merge(bucket)
+        return merged
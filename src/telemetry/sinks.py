@@ -0,0 +1,162 @@
+"""Destinations for drained telemetry batches."""
+
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+from .encoding import BINARY_MAGIC, BatchEncoder, Encoding
+from .events import TelemetryEvent
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetrySink(ABC):
+    """Receives batches of events from ``TelemetryPipeline``."""
+
+    @abstractmethod
+    async def write(self, events: Sequence[TelemetryEvent]) -> None:
+        """Persist or forward one batch. Errors are counted by the pipeline."""
+
+    async def close(self) -> None:
+        """Release resources; called once after the final batch."""
+
+
+class MemorySink(TelemetrySink):
+    """Keeps written events in a list; useful for tests and local debugging."""
+
+    def __init__(self) -> None:
+        self.events: list[TelemetryEvent] = []
+
+    async def write(self, events: Sequence[TelemetryEvent]) -> None:
+        self.events.extend(events)
+
+
+class RotatingFileSink(TelemetrySink):
+    """Append events to local files, rotating by size.
+
+    Batches are encoded by a ``BatchEncoder`` as NDJSON or, with
+    ``encoding="binary"``, as length-prefixed records. The active file is
+    ``telemetry-<start>-<pid>.ndjson.part`` (``.tlm.part`` for binary); the
+    pid keeps workers sharing a directory apart. Once it exceeds
+    ``max_bytes`` it is closed and renamed without ``.part`` or, with
+    ``compress``, gzipped. Only the newest ``max_files`` rotated files are
+    kept; files still being written (``.part``) are never pruned. File I/O
+    runs on one worker thread so batches land in the order they were
+    drained.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_files: int = 20,
+        compress: bool = True,
+        encoding: Encoding = "ndjson"
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.compress = compress
+        self.encoding = encoding
+        self._suffix = ".tlm" if encoding == "binary" else ".ndjson"
+        # Used only on the I/O thread.
+        self._encoder = BatchEncoder(encoding)
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[str] = None
+        self._written = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _io_thread(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telemetry-sink")
+        return self._executor
+
+    async def write(self, events: Sequence[TelemetryEvent]) -> None:
+        """Encode and append ``events`` off the event loop."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io_thread(), self._write, list(events))
+
+    def _write(self, events: list[TelemetryEvent]) -> None:
+        data = self._encoder.encode(events)
+        if self._file is None:
+            self._open()
+        assert self._file is not None
+        self._file.write(data)
+        self._file.flush()
+        self._written += len(data)
+        if self._written >= self.max_bytes:
+            try:
+                self._rotate()
+            except OSError:
+                # The batch is already written; a failed rotation must not count it as lost.
+                logger.exception("Telemetry file rotation failed in %s", self.directory)
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        base = os.path.join(self.directory, f"telemetry-{stamp}-{os.getpid()}")
+        path, counter = f"{base}{self._suffix}", 1
+        # Several rotations within one second must not reuse a name.
+        while any(os.path.exists(path + extension) for extension in ("", ".gz", ".part")):
+            path = f"{base}-{counter}{self._suffix}"
+            counter += 1
+        self._path = path
+        self._file = open(path + ".part", "ab")
+        self._written = 0
+        if self.encoding == "binary":
+            self._file.write(BINARY_MAGIC)
+            self._written = len(BINARY_MAGIC)
+
+    def _rotate(self) -> None:
+        """Close the active file, publish it (compressed or renamed) and prune old files."""
+        if self._file is None or self._path is None:
+            return
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        if self.compress:
+            # Written under a temporary name, so pruning never sees a half-written archive.
+            with open(path + ".part", "rb") as src, gzip.open(path + ".gz.part", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(path + ".gz.part", path + ".gz")
+            os.remove(path + ".part")
+        else:
+            os.replace(path + ".part", path)
+        self._prune()
+
+    def _prune(self) -> None:
+        """Remove the oldest rotated files beyond ``max_files``.
+
+        Other workers prune the same directory concurrently, so files that
+        disappear in the meantime are skipped.
+        """
+        suffix = self._suffix + ".gz" if self.compress else self._suffix
+        rotated: list[tuple[float, str]] = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("telemetry-") and entry.name.endswith(suffix):
+                try:
+                    rotated.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    continue
+        rotated.sort()
+        for _, path in rotated[:max(0, len(rotated) - self.max_files)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def close(self) -> None:
+        """Rotate the active file and stop the I/O thread; a later write starts a new file."""
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self._rotate)
+        executor.shutdown(wait=True)
+        logger.info("Closed telemetry sink in %s", self.directory)
@@ -0,0 +1,32 @@
+"""Fixtures shared by the API tests."""
+
+import pytest
+
+from src.config import get_settings
+from src.repositories import create_repository
+from src.routers import scores, telemetry
+from src.services.score_service import ScoreService
+from src.telemetry import create_pipeline
+
+
+@pytest.fixture(autouse=True)
+def isolated_scores(monkeypatch, tmp_path):
+    """Start each test with empty score storage under tmp_path and fresh rate limit buckets."""
+    settings = get_settings()
+    # Keep file-backed backends (SCORE_BACKEND=sqlite, JOURNAL_DIR) out of the working directory.
+    repository = create_repository(settings.model_copy(update={
+        "database_url": f"sqlite:///{tmp_path / 'scores.db'}",
+        "journal_dir": str(tmp_path / "journal") if settings.journal_dir else None,
+    }))
+    monkeypatch.setattr(scores, "score_service", ScoreService(repository))
+    for limiter in scores.rate_limiters.values():
+        limiter.clear()
+    yield
+    repository.close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_telemetry(monkeypatch, tmp_path):
+    """Write telemetry files under the test's tmp_path instead of the checkout's TELEMETRY_DIR."""
+    settings = telemetry.settings.model_copy(update={"telemetry_dir": str(tmp_path / "telemetry")})
+    monkeypatch.setattr(telemetry, "pipeline", create_pipeline(settings))
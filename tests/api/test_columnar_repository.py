@@ -0,0 +1,109 @@
+# CONTRACT: ARCH §3
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.models import ScoreInput
+from src.repositories import columnar as columnar_module
+from src.repositories.columnar import ColumnarScoreRepository
+from src.repositories.cursor import encode_cursor, rank_key, to_epoch_us
+from src.repositories.journal import ScoreJournal
+from src.repositories.memory import MemoryScoreRepository
+
+pytest.importorskip("numpy")
+
+
+async def fill(columnar, memory, inputs, batch=7):
+    for start in range(0, len(inputs), batch):
+        # Mirror the stored records so ids and timestamps match across backends.
+        for record in await columnar.create_scores(inputs[start:start + batch]):
+            memory._insert(record)
+
+
+async def test_columnar_repository_matches_memory_order_and_paging(monkeypatch):
+    """
+    GIVEN the same records in the columnar and the memory repository, with many point ties
+    WHEN pages are read with and without cursors and since filters
+    THEN both backends return identical pages.
+    """
+    rng = random.Random(7)
+    columnar = ColumnarScoreRepository()
+    memory = MemoryScoreRepository()
+    inputs = [ScoreInput(nickname=f"P{i}", points=rng.choice([0, 50, 100, 100, 100, 250]), durationSeconds=i) for i in range(3000)]
+    # Backdate part of the set so since filters cut through it.
+    three_days_ago = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=3))
+    with monkeypatch.context() as patch:
+        patch.setattr(columnar_module, "now_us", lambda: three_days_ago)
+        await fill(columnar, memory, inputs[:1000])
+    await fill(columnar, memory, inputs[1000:])
+
+    assert await columnar.get_score_count() == 3000
+    for since in (None, datetime.now(timezone.utc) - timedelta(days=1)):
+        cursor = None
+        for _ in range(5):
+            expected = await memory.get_scores(limit=97, cursor=cursor, since=since)
+            page = await columnar.get_scores(limit=97, cursor=cursor, since=since)
+            assert [record.id for record in page] == [record.id for record in expected]
+            cursor = encode_cursor(page[-1])
+
+
+async def test_columnar_repository_aggregates_and_cleans_up(tmp_path, monkeypatch):
+    """
+    GIVEN scores stored in a journaled columnar repository
+    WHEN statistics are requested, old scores are cleaned up and the repository restarts
+    THEN aggregations are computed over the columns and the retained rows survive the restart.
+    """
+    repository = ColumnarScoreRepository(ScoreJournal(str(tmp_path), snapshot_every=1000))
+    last_month = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=30))
+    with monkeypatch.context() as patch:
+        patch.setattr(columnar_module, "now_us", lambda: last_month)
+        await repository.create_score(ScoreInput(nickname="A", points=100, durationSeconds=30))
+    await repository.create_scores([
+        ScoreInput(nickname="A", points=points, durationSeconds=duration)
+        for points, duration in [(300, 45), (500, 90), (700, 150)]
+    ])
+
+    counts, edges = repository.points_histogram(bins=2)
+    assert counts == [2, 2]
+    assert edges == [100.0, 400.0, 700.0]
+    assert list(repository.daily_counts().values()) == [1, 3]
+    assert repository.points_by_duration(bucket_seconds=60) == [(0, 2, 200.0), (60, 1, 500.0), (120, 1, 700.0)]
+    assert not repository.column("points").flags.writeable
+
+    assert await repository.cleanup_old_scores(retention_days=14, max_records=2) == 1
+    assert [record.points for record in await repository.get_scores(limit=10)] == [700, 500, 300]
+
+    restored = ColumnarScoreRepository(ScoreJournal(str(tmp_path)))
+    assert [record.points for record in await restored.get_scores(limit=10)] == [700, 500, 300]
+
+
+async def test_columnar_repository_rank_matches_memory(monkeypatch):
+    """
+    GIVEN the same records, with point ties and suspects, in the columnar and the memory repository
+    WHEN stored scores and hypothetical keys are ranked, before and after old scores expire
+    THEN both backends report the same counts, and the columnar counts follow the expiry.
+    """
+    columnar = ColumnarScoreRepository()
+    memory = MemoryScoreRepository()
+    stamp = columnar_module.new_record
+
+    def flag_every_ninth(score_input, created_us):
+        record = stamp(score_input, created_us)
+        record.suspect = int(score_input.nickname[1:]) % 9 == 0
+        return record
+
+    monkeypatch.setattr(columnar_module, "new_record", flag_every_ninth)
+    await fill(columnar, memory, [ScoreInput(nickname=f"P{i}", points=(i * 37) % 5) for i in range(60)])
+
+    keys = [rank_key(record) for record in columnar._records] + [(-3, 0, ""), (-9, 0, "")]
+    for key in keys:
+        assert await columnar.get_rank(key) == await memory.get_rank(key)
+    record = columnar._records[5]
+    assert await columnar.get_score(record.id) is record
+
+    assert await columnar.expire_scores(retention_days=0, max_records=25) == 35
+    ranked = [rank_key(record) for record in await columnar.get_scores(limit=100) if not record.suspect]
+    for key in keys:
+        assert await columnar.get_rank(key) == (sum(1 for other in ranked if other < key), len(ranked))
@@ -0,0 +1,104 @@
+# CONTRACT: openapi.yaml#/paths/~1metrics
+
+import os
+import struct
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.metrics import MetricsRegistry
+
+client = TestClient(app)
+
+
+def scrape(text=None):
+    """Map each sample line of an exposition to its value."""
+    text = text if text is not None else client.get("/metrics").text
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+def test_metrics_endpoint_reports_hot_paths():
+    """
+    CONTRACT: openapi.yaml#/paths/~1metrics/get@200
+    GIVEN requests to the scores and telemetry endpoints
+    WHEN /metrics is scraped before and after
+    THEN route latency, repository timings, rate limit decisions and gauges reflect the traffic.
+    """
+    before = scrape()
+    client.post("/scores", json={"nickname": "A", "points": 10})
+    client.get("/scores")
+    client.post("/telemetry", json={"events": [{"event": "hold_used", "timestamp": 1}]})
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = scrape(response.text)
+
+    def delta(sample):
+        return after[sample] - before.get(sample, 0)
+
+    assert delta('tetris_http_request_duration_seconds_count{handler="list_scores",method="GET"}') == 1
+    assert delta('tetris_http_request_duration_seconds_count{handler="submit_score",method="POST"}') == 1
+    assert delta('tetris_http_request_duration_seconds_count{handler="submit_telemetry",method="POST"}') == 1
+    assert delta('tetris_repository_operation_duration_seconds_count{operation="create_scores"}') == 1
+    assert delta('tetris_repository_operation_duration_seconds_count{operation="get_scores"}') == 1
+    assert delta('tetris_rate_limit_decisions_total{bucket="write",decision="allowed"}') == 2
+    assert delta('tetris_rate_limit_decisions_total{bucket="read",decision="allowed"}') == 1
+    assert after["tetris_scores_stored"] == 1
+    assert after['tetris_rate_limit_buckets{bucket="read"}'] == 1
+    assert after["tetris_telemetry_buffer_depth"] >= 1
+    assert 'tetris_http_request_duration_seconds_bucket{handler="list_scores",method="GET",le="+Inf"}' in after
+
+
+def test_registry_aggregates_worker_files(tmp_path):
+    """
+    GIVEN a registry attached to a shared directory next to another live worker's file and a dead worker's file
+    WHEN it renders, and again after it exits and a fresh worker attaches
+    THEN counters and histograms are summed with the dead worker's kept in the archive,
+         gauges are reported per live pid, and no total goes down across the restart.
+    """
+    def worker_registry():
+        registry = MetricsRegistry(capacity=64)
+        requests = registry.counter("requests_total", "Requests.", ("route",)).labels("a")
+        depth = registry.gauge("depth", "Depth.").labels()
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)).labels()
+        return registry, requests, depth, latency
+
+    registry, requests, depth, latency = worker_registry()
+    requests.inc()
+    latency.observe(0.05)
+    registry.attach(str(tmp_path))
+    requests.inc(2)
+    depth.set(4)
+    latency.observe(3.0)
+
+    header = struct.pack("<8sII", b"TSMT0001", 64, os.getppid()).ljust(64, b"\0")
+    other = struct.pack("<6d", 10, 7, 1, 1, 0, 1.5)  # requests, depth, latency buckets and sum
+    (tmp_path / f"tetris-metrics-{os.getppid()}.bin").write_bytes(header + other + bytes(58 * 8))
+    dead = tmp_path / "tetris-metrics-999999999.bin"
+    dead_values = struct.pack("<6d", 5, 9, 0, 1, 0, 0.5)
+    dead.write_bytes(struct.pack("<8sII", b"TSMT0001", 64, 999_999_999).ljust(64, b"\0") + dead_values + bytes(58 * 8))
+
+    samples = scrape(registry.render())
+    assert samples['requests_total{route="a"}'] == 18
+    assert samples[f'depth{{pid="{os.getpid()}"}}'] == 4
+    assert samples[f'depth{{pid="{os.getppid()}"}}'] == 7
+    assert 'depth{pid="999999999"}' not in samples
+    assert [samples[f'latency_seconds_bucket{{le="{le}"}}'] for le in ("0.1", "1", "+Inf")] == [2, 4, 5]
+    assert samples["latency_seconds_sum"] == 5.05
+    assert not dead.exists()
+    assert scrape(registry.render()) == samples
+
+    # This worker exits and a fresh one takes its place: totals carry over.
+    registry.detach()
+    assert not (tmp_path / f"tetris-metrics-{os.getpid()}.bin").exists()
+    assert requests.value == 0
+    restarted, _, _, _ = worker_registry()
+    restarted.attach(str(tmp_path))
+    after_restart = scrape(restarted.render())
+    assert after_restart['requests_total{route="a"}'] == 18
+    assert after_restart["latency_seconds_sum"] == 5.05
+    assert after_restart[f'depth{{pid="{os.getpid()}"}}'] == 0
+    restarted.detach()
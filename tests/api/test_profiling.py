@@ -0,0 +1,116 @@
+# CONTRACT: openapi.yaml#/paths/~1admin~1profile
+
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.profiling import ProfilingMiddleware, SamplingProfiler
+from src.routers import admin
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def admin_profiler(monkeypatch):
+    profiler = SamplingProfiler(interval=0.001)
+    monkeypatch.setattr(admin, "settings", admin.settings.model_copy(update={"admin_token": "secret"}))
+    monkeypatch.setattr(admin, "profiler", profiler)
+    yield profiler
+    profiler.stop()
+
+
+def spin_for_profile(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build_app(profiler, sample_rate=0.0, token=None):
+    profiled = FastAPI()
+    profiled.add_middleware(ProfilingMiddleware, profiler=profiler, sample_rate=sample_rate, token=token)
+
+    @profiled.get("/work")
+    async def work():
+        spin_for_profile(0.05)
+        return {}
+
+    return TestClient(profiled)
+
+
+def test_profile_endpoint_requires_admin_token(monkeypatch):
+    """
+    CONTRACT: openapi.yaml#/paths/~1admin~1profile/get@404
+    GIVEN no ADMIN_TOKEN, then a configured one
+    WHEN /admin/profile is requested without and with a wrong token
+    THEN it is hidden (404) and then forbidden (403).
+    """
+    monkeypatch.setattr(admin, "settings", admin.settings.model_copy(update={"admin_token": None}))
+    assert client.get("/admin/profile", headers={"X-Admin-Token": "anything"}).status_code == 404
+
+    monkeypatch.setattr(admin, "settings", admin.settings.model_copy(update={"admin_token": "secret"}))
+    assert client.get("/admin/profile").status_code == 403
+    assert client.get("/admin/profile", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_sampled_requests_produce_collapsed_stacks(admin_profiler):
+    """
+    CONTRACT: openapi.yaml#/paths/~1admin~1profile/get@200
+    GIVEN a profiler fed by middleware sampling every request
+    WHEN a slow request runs and the profile is read with reset
+    THEN the collapsed stacks include the handler's frames, and the next read is empty.
+    """
+    build_app(admin_profiler, sample_rate=1.0).get("/work")
+
+    response = client.get("/admin/profile", params={"reset": "true"}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    lines = response.text.splitlines()
+    assert any("work (test_profiling.py" in line and "spin_for_profile" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) >= 1
+
+    assert client.get("/admin/profile", headers={"X-Admin-Token": "secret"}).text == ""
+
+
+def test_only_header_requests_are_profiled_when_not_sampling():
+    """
+    GIVEN middleware with a zero sample rate and a token
+    WHEN requests arrive without the header, with a wrong value, and with the token
+    THEN only the request carrying the token is profiled.
+    """
+    profiler = SamplingProfiler(interval=0.001)
+    profiled = build_app(profiler, token="secret")
+    try:
+        profiled.get("/work")
+        profiled.get("/work", headers={"X-Profile": "nope"})
+        assert profiler.samples == 0 and profiler._thread is None
+
+        profiled.get("/work", headers={"X-Profile": "secret"})
+        assert profiler.samples > 0
+    finally:
+        profiler.stop()
+
+
+def test_stop_interrupts_the_sampling_interval():
+    """
+    GIVEN a profiler with a long interval sampling a running request
+    WHEN it is stopped, and a request starts again afterwards
+    THEN stop returns without waiting out the interval and a new sampler thread starts.
+    """
+    profiler = SamplingProfiler(interval=10)
+    profiler.begin(threading.get_ident())
+    started = time.perf_counter()
+    profiler.stop()
+    assert time.perf_counter() - started < 5
+    assert profiler._thread is None
+
+    profiler.begin(threading.get_ident())
+    try:
+        assert profiler._thread is not None and profiler._thread.is_alive()
+    finally:
+        profiler.end(threading.get_ident())
+        profiler.stop()
@@ -0,0 +1,123 @@
+# CONTRACT: openapi.yaml#/components/responses/TooManyRequests
+# CONTRACT: PRD §3
+
+import os
+
+from src.config import Settings
+from src.rate_limit import create_rate_limiter, token_bucket
+from src.rate_limit.shared import SharedRateLimiter
+from src.rate_limit.token_bucket import RateLimiter
+
+
+def test_rate_limiter_caps_bucket_count():
+    """
+    GIVEN a limiter that keeps at most three buckets
+    WHEN many distinct clients make requests
+    THEN memory stays bounded and the least recently used buckets are evicted.
+    """
+    limiter = RateLimiter(max_tokens=5, refill_rate=0.0001, max_buckets=3)
+    for index in range(10):
+        assert limiter.check_rate_limit(f"client-{index}")[0]
+
+    assert len(limiter) == 3
+    assert limiter.capacity_evictions == 7
+    assert list(limiter._slots) == ["client-7", "client-8", "client-9"]
+    assert len(limiter._tokens) == 4  # cap plus one transient slot; evicted slots are reused
+
+
+def test_rate_limiter_drops_refilled_buckets(monkeypatch):
+    """
+    GIVEN a client whose bucket has fully refilled
+    WHEN another client makes a request
+    THEN the idle bucket is dropped without affecting either client's budget.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(token_bucket.time, "monotonic", lambda: now[0])
+    limiter = RateLimiter(max_tokens=2, refill_rate=1.0)
+
+    limiter.check_rate_limit("idle")
+    now[0] += 5.0
+    limiter.check_rate_limit("active")
+
+    assert list(limiter._slots) == ["active"]
+    assert limiter.idle_evictions == 1
+    assert limiter.get_remaining_tokens("idle") == 2
+    assert limiter.get_remaining_tokens("active") == 1
+
+
+def test_rate_limiter_acquire_reports_remaining_and_retry_after(monkeypatch):
+    """
+    GIVEN a bucket with two tokens refilling one token per second
+    WHEN a client spends its budget
+    THEN each decision reports the remaining budget and, once denied, the wait time.
+    """
+    now = [50.0]
+    monkeypatch.setattr(token_bucket.time, "monotonic", lambda: now[0])
+    limiter = RateLimiter(max_tokens=2, refill_rate=1.0)
+
+    assert limiter.acquire("client") == (True, 1, 0.0)
+    assert limiter.acquire("client") == (True, 0, 0.0)
+    assert limiter.acquire("client") == (False, 0, 1.0)
+
+    now[0] += 0.5
+    assert limiter.acquire("client") == (False, 0, 0.5)
+    assert limiter.check_rate_limit("other") == (True, 0.0)
+
+
+def test_shared_rate_limiter_enforces_one_budget_across_instances(tmp_path):
+    """
+    GIVEN two limiters mapping the same file, as two workers would
+    WHEN one client spends tokens through both of them
+    THEN they draw from a single shared budget.
+    """
+    path = str(tmp_path / "buckets.bin")
+    worker_a = SharedRateLimiter(path, max_tokens=3, refill_rate=0.0001, max_buckets=64, stripes=4)
+    worker_b = SharedRateLimiter(path, max_tokens=3, refill_rate=0.0001, max_buckets=64, stripes=4)
+
+    assert worker_a.acquire("client").remaining == 2
+    assert worker_b.acquire("client").remaining == 1
+    assert worker_a.acquire("client").allowed
+    assert not worker_b.acquire("client").allowed
+    assert worker_b.get_remaining_tokens("client") == 0
+    assert worker_a.acquire("other").allowed
+    assert len(worker_b) == 2
+
+    worker_a.clear()
+    assert worker_b.get_remaining_tokens("client") == 3
+    worker_a.close()
+    worker_b.close()
+
+
+def test_shared_rate_limiter_replaces_mismatched_table(tmp_path):
+    """
+    GIVEN a worker mapping a shared table
+    WHEN a worker with different settings starts on the same path, followed by one matching it
+    THEN the old worker keeps its intact table while the new workers share a fresh one.
+    """
+    path = str(tmp_path / "buckets.bin")
+    old_worker = SharedRateLimiter(path, max_tokens=3, refill_rate=0.0001, max_buckets=64, stripes=4)
+    old_worker.acquire("client")
+
+    new_worker = SharedRateLimiter(path, max_tokens=5, refill_rate=0.0001, max_buckets=512, stripes=8)
+    peer = SharedRateLimiter(path, max_tokens=5, refill_rate=0.0001, max_buckets=512, stripes=8)
+    assert old_worker.acquire("client").remaining == 1
+    assert len(old_worker) == 1
+    assert new_worker.acquire("client").remaining == 4
+    assert peer.get_remaining_tokens("client") == 4
+    assert sorted(os.listdir(tmp_path)) == ["buckets.bin"]
+    for limiter in (old_worker, new_worker, peer):
+        limiter.close()
+
+
+def test_create_rate_limiter_falls_back_to_in_process(tmp_path):
+    """
+    GIVEN a single worker and no shared path configured
+    WHEN the limiter is built from settings
+    THEN the in-process limiter is used, and the shared one only with several workers.
+    """
+    assert type(create_rate_limiter(Settings())) is RateLimiter
+
+    shared = create_rate_limiter(Settings(web_concurrency=4, rate_limit_shared_dir=str(tmp_path)), name="write")
+    assert isinstance(shared, SharedRateLimiter)
+    assert shared.path == str(tmp_path / "tetris-rate-limit-write.bin")
+    shared.close()
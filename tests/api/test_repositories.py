@@ -0,0 +1,437 @@
+# CONTRACT: openapi.yaml#/paths/~1scores/get
+# CONTRACT: ARCH §3
+
+import asyncio
+import errno
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.models import ClientInfo, ScoreInput
+from src.repositories import sqlite as sqlite_module
+from src.repositories.cursor import encode_cursor, rank_key, to_epoch_us
+from src.repositories.journal import LOG_NAME, SNAPSHOT_NAME, ScoreJournal
+from src.repositories.memory import MemoryScoreRepository
+from src.repositories.record import ScoreRecord, now_us
+from src.repositories.sqlite import SqliteScoreRepository, _record_to_row
+from src.repositories.windows import window_start
+
+
+async def test_memory_repository_keeps_rank_order():
+    """
+    GIVEN scores inserted out of order, including equal points
+    WHEN the leaderboard is read
+    THEN entries come back by points desc, then newest first, without re-sorting.
+    """
+    repository = MemoryScoreRepository()
+    first_tie = await repository.create_score(ScoreInput(nickname="Tie1", points=200))
+    await repository.create_score(ScoreInput(nickname="Low", points=100))
+    second_tie = await repository.create_score(ScoreInput(nickname="Tie2", points=200))
+    await repository.create_score(ScoreInput(nickname="High", points=300))
+
+    scores = await repository.get_scores(limit=10)
+    assert [s.nickname for s in scores] == ["High", "Tie2", "Tie1", "Low"]
+    assert scores[1].id == second_tie.id
+    assert scores[2].id == first_tie.id
+
+    top_two = await repository.get_scores(limit=2)
+    assert [s.nickname for s in top_two] == ["High", "Tie2"]
+
+
+async def test_memory_repository_since_filter():
+    """
+    GIVEN scores with different creation times
+    WHEN the leaderboard is read with a since filter
+    THEN only scores created at or after that time are returned in rank order.
+    """
+    repository = MemoryScoreRepository()
+    old = await repository.create_score(ScoreInput(nickname="Old", points=900))
+    old.created_at = datetime.now(timezone.utc) - timedelta(days=2)
+    await repository.create_score(ScoreInput(nickname="New", points=100))
+
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    scores = await repository.get_scores(limit=10, since=since)
+    assert [s.nickname for s in scores] == ["New"]
+
+
+async def test_sqlite_repository_orders_pages_and_persists(tmp_path):
+    """
+    GIVEN a SQLite repository backed by a file
+    WHEN scores are stored, paged through with cursors and the database is reopened
+    THEN ordering and pagination match the leaderboard contract and data survives.
+    """
+    path = str(tmp_path / "scores.db")
+    repository = SqliteScoreRepository(path)
+    for index, points in enumerate([100, 300, 200, 300]):
+        await repository.create_score(ScoreInput(
+            nickname=f"P{index}",
+            points=points,
+            tags=["daily"],
+            client=ClientInfo(version="1.0", platform="web"),
+        ))
+
+    first_page = await repository.get_scores(limit=2)
+    assert [s.nickname for s in first_page] == ["P3", "P1"]
+
+    second_page = await repository.get_scores(limit=2, cursor=encode_cursor(first_page[-1]))
+    assert [s.nickname for s in second_page] == ["P2", "P0"]
+    assert second_page[0].client.platform == "web"
+    assert second_page[0].tags == ("daily",)
+    repository.close()
+
+    reopened = SqliteScoreRepository(path)
+    assert await reopened.get_score_count() == 4
+    future = datetime.now(timezone.utc) + timedelta(days=1)
+    assert await reopened.get_scores(since=future) == []
+    reopened.close()
+
+
+async def test_repositories_keep_compact_records():
+    """
+    GIVEN many submissions from the same client build
+    WHEN they are stored
+    THEN the repository keeps slotted records that share client and string objects
+    AND the API model is produced only on conversion.
+    """
+    repository = MemoryScoreRepository()
+    records = await repository.create_scores([
+        # Nicknames are built at runtime so each submission carries its own string object.
+        ScoreInput(nickname="".join(["Same", "Name"]), points=i, tags=["daily"],
+                   client=ClientInfo(version="1.0", platform="web"))
+        for i in range(3)
+    ])
+    assert all(isinstance(record, ScoreRecord) for record in records)
+    assert not hasattr(records[0], "__dict__")
+    assert records[0].client is records[1].client is records[2].client
+    assert records[0].nickname is records[1].nickname
+    assert records[0].tags[0] is records[2].tags[0]
+    assert isinstance(records[0].created_us, int)
+
+    score = records[0].to_score()
+    assert score.created_at == records[0].created_at
+    assert score.tags == ["daily"]
+    assert score.model_dump(by_alias=True)["client"] == {"version": "1.0", "platform": "web", "ua": None}
+
+
+async def test_memory_repository_journal_survives_restart(tmp_path):
+    """
+    GIVEN a memory repository with a journal that snapshots every 3 records
+    WHEN scores are written, the log tail is torn and the repository is rebuilt
+    THEN snapshot and intact log records are replayed in rank order.
+    """
+    repository = MemoryScoreRepository(ScoreJournal(str(tmp_path), snapshot_every=3))
+    for index in range(5):
+        await repository.create_score(ScoreInput(
+            nickname=f"P{index}",
+            points=index * 10,
+            tags=["daily"],
+            client=ClientInfo(version="1.0", platform="web"),
+        ))
+    repository._journal.close()
+    assert (tmp_path / SNAPSHOT_NAME).exists()
+
+    # Simulate a crash in the middle of writing the next record.
+    with open(tmp_path / LOG_NAME, "ab") as fh:
+        fh.write(b"\x40\x00\x00\x00garbage")
+
+    restored = MemoryScoreRepository(ScoreJournal(str(tmp_path), snapshot_every=3))
+    scores = await restored.get_scores(limit=10)
+    assert [s.nickname for s in scores] == ["P4", "P3", "P2", "P1", "P0"]
+    assert scores[0].client.platform == "web"
+    assert scores[0].tags == ("daily",)
+
+    await restored.create_score(ScoreInput(nickname="After", points=1))
+    assert await restored.get_score_count() == 6
+    restored._journal.close()
+
+
+async def test_concurrent_writes_survive_snapshot(tmp_path):
+    """
+    GIVEN a journaled repository that snapshots every 2 records
+    WHEN 5 scores are created concurrently, so snapshots run while other group commits are not yet applied
+    THEN every acknowledged score is replayed after a restart.
+    """
+    repository = MemoryScoreRepository(ScoreJournal(str(tmp_path), snapshot_every=2))
+    created = await asyncio.gather(*(
+        repository.create_score(ScoreInput(nickname=f"P{index}", points=index)) for index in range(5)
+    ))
+    repository._journal.close()
+
+    restored = MemoryScoreRepository(ScoreJournal(str(tmp_path), snapshot_every=2))
+    assert await restored.get_score_count() == 5
+    assert {score.id for score in await restored.get_scores(limit=10)} == {record.id for record in created}
+    restored._journal.close()
+
+
+class TornWrite:
+    """Log file stand-in whose write lands half of its bytes and then fails."""
+
+    def __init__(self, log):
+        self._log = log
+
+    def write(self, data):
+        self._log.write(data[:len(data) // 2])
+        self._log.flush()
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    def __getattr__(self, name):
+        return getattr(self._log, name)
+
+
+async def test_failed_group_commit_does_not_hide_later_writes(tmp_path):
+    """
+    GIVEN a journaled repository whose next log write is torn by a full disk
+    WHEN that write fails and later writes succeed
+    THEN the torn frame is rolled back, and every acknowledged score is replayed after a restart.
+    """
+    repository = MemoryScoreRepository(ScoreJournal(str(tmp_path)))
+    await repository.create_score(ScoreInput(nickname="First", points=10))
+    repository._journal._log = TornWrite(repository._journal._log)
+    with pytest.raises(OSError):
+        await repository.create_score(ScoreInput(nickname="Lost", points=20))
+    await repository.create_score(ScoreInput(nickname="After", points=30))
+    assert await repository.get_score_count() == 2
+    repository._journal.close()
+
+    restored = MemoryScoreRepository(ScoreJournal(str(tmp_path)))
+    assert [s.nickname for s in await restored.get_scores(limit=10)] == ["After", "First"]
+    restored._journal.close()
+
+
+async def test_journal_rewrites_log_torn_before_its_magic(tmp_path):
+    """
+    GIVEN a log file left empty or half-headed by a crash right after it was created
+    WHEN the journal is loaded
+    THEN it starts a fresh log instead of failing, and accepts appends.
+    """
+    for partial in (b"", b"TSL"):
+        (tmp_path / LOG_NAME).write_bytes(partial)
+        repository = MemoryScoreRepository(ScoreJournal(str(tmp_path)))
+        await repository.create_score(ScoreInput(nickname="Fresh", points=1))
+        repository._journal.close()
+        assert (tmp_path / LOG_NAME).read_bytes().startswith(b"TSLOG001")
+
+
+async def test_create_scores_stores_batch_in_one_write(tmp_path):
+    """
+    GIVEN existing scores and a batch of new ones
+    WHEN it is stored through create_scores on each backend
+    THEN every score is returned in input order, ranked among existing scores,
+         and the version advances once per stored score.
+    """
+    inputs = [ScoreInput(nickname=f"P{i}", points=(i * 37) % 101) for i in range(40)]
+    sqlite_repository = SqliteScoreRepository(str(tmp_path / "batch.db"))
+    for repository in (MemoryScoreRepository(), sqlite_repository):
+        await repository.create_score(ScoreInput(nickname="Existing", points=50))
+        version = await repository.get_version()
+
+        created = await repository.create_scores(inputs)
+        assert [s.nickname for s in created] == [i.nickname for i in inputs]
+        assert await repository.get_version() == version + len(inputs)
+
+        scores = await repository.get_scores(limit=100)
+        assert len(scores) == 41
+        assert [s.points for s in scores] == sorted((s.points for s in scores), reverse=True)
+        assert await repository.create_scores([]) == []
+    sqlite_repository.close()
+
+
+async def test_dedup_index_is_bounded_and_time_windowed(monkeypatch):
+    """
+    GIVEN a dedup index holding two keys for one minute
+    WHEN more keys arrive, and later the window passes
+    THEN the oldest keys are dropped first and expired keys are forgotten.
+    """
+    from src.repositories import dedup
+
+    now = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+    index = dedup.DedupIndex(max_entries=2, ttl_seconds=60)
+    repository = MemoryScoreRepository()
+
+    inputs = [ScoreInput(nickname="A", points=1), ScoreInput(nickname="B", points=2), ScoreInput(nickname="C", points=3)]
+    scores, stored = await index.create_once(inputs, repository.create_scores)
+    assert len(stored) == 3 and len(index) == 2
+    assert index.get(dedup.idempotency_key(inputs[0])) is None
+    assert index.get(dedup.idempotency_key(inputs[2])) is scores[2]
+
+    now[0] += 61
+    assert index.get(dedup.idempotency_key(inputs[2])) is None
+
+
+async def test_repositories_agree_on_rank(tmp_path):
+    """
+    GIVEN the same scores, with ties and suspects, in the memory and sqlite repositories
+    WHEN every stored score is ranked
+    THEN both count the same ranked scores ahead, matching a full sort.
+    """
+    memory = MemoryScoreRepository()
+    sqlite = SqliteScoreRepository(str(tmp_path / "rank.db"))
+    records = await memory.create_scores([ScoreInput(nickname=f"P{i}", points=(i * 37) % 5) for i in range(40)])
+    for record in records[::7]:
+        record.suspect = True
+    memory._replace(list(records))
+    await sqlite._run(sqlite._insert_many, [_record_to_row(record) for record in records])
+
+    ranked = sorted((record for record in records if not record.suspect), key=rank_key)
+    for record in records:
+        key = rank_key(record)
+        expected = (sum(1 for other in ranked if rank_key(other) < key), len(ranked))
+        assert await memory.get_rank(key) == expected
+        assert await sqlite.get_rank(key) == expected
+        assert (await sqlite.get_score(record.id)).suspect == record.suspect
+    sqlite.close()
+
+
+async def test_sqlite_rank_tree_follows_expiry_and_is_rebuilt(tmp_path, monkeypatch):
+    """
+    GIVEN a sqlite repository holding tied, suspect, expired and out-of-range point values
+    WHEN scores are ranked, expired scores are removed, and the database is reopened without its rank tree
+    THEN every rank matches a full sort at each step.
+    """
+    path = str(tmp_path / "tree.db")
+    repository = SqliteScoreRepository(path)
+    stamp = sqlite_module.new_record
+
+    def flag_suspects(score_input, created_us):
+        record = stamp(score_input, created_us)
+        record.suspect = score_input.nickname.endswith("3")
+        return record
+
+    monkeypatch.setattr(sqlite_module, "new_record", flag_suspects)
+    points = [0, 7, 7, 7, 120, 2**45, 2**45 + 1, 2**62]
+    old_us = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=30))
+    with monkeypatch.context() as patch:
+        patch.setattr(sqlite_module, "now_us", lambda: old_us)
+        await repository.create_scores([ScoreInput(nickname=f"Old{i}", points=value) for i, value in enumerate(points)])
+    for i, value in enumerate(points):
+        await repository.create_score(ScoreInput(nickname=f"New{i}", points=value))
+
+    async def assert_ranks_match(repository):
+        records = await repository.get_scores(limit=100)
+        ranked = [record for record in records if not record.suspect]
+        for probe in [rank_key(record) for record in records] + [(-7, -now_us(), ""), (-(2**50), 0, "")]:
+            expected = (sum(1 for other in ranked if rank_key(other) < probe), len(ranked))
+            assert await repository.get_rank(probe) == expected
+
+    await assert_ranks_match(repository)
+    assert await repository.expire_scores(retention_days=14, max_records=0) == len(points)
+    await assert_ranks_match(repository)
+
+    # A database written before the rank tree existed.
+    await repository._run(repository._fetch_all, "DELETE FROM meta WHERE key = 'ranked'", {})
+    await repository._run(repository._fetch_all, "DELETE FROM rank_tree", {})
+    repository.close()
+    reopened = SqliteScoreRepository(path)
+    await assert_ranks_match(reopened)
+    reopened.close()
+
+
+async def test_memory_repository_window_top_k():
+    """
+    GIVEN scores from today and from last week in the memory repository
+    WHEN the daily window is read, written to, paged past its top K and rolled over
+    THEN every page matches the since-filtered listing for the window start.
+    """
+    repository = MemoryScoreRepository(window_capacity=5)
+    stored = await repository.create_scores([ScoreInput(nickname=f"P{i}", points=i * 10) for i in range(12)])
+    for record in stored[::2]:
+        record.created_at = datetime.now(timezone.utc) - timedelta(days=8)
+    repository._replace(list(stored))
+    start = window_start("daily")
+
+    async def assert_matches(limit, cursor=None):
+        page = await repository.get_window_scores("daily", limit=limit, cursor=cursor)
+        expected = await repository.get_scores(limit=limit, cursor=cursor, since=start)
+        assert [record.id for record in page] == [record.id for record in expected]
+        return page
+
+    first = await assert_matches(3)
+    assert len(repository._windows["daily"]) == 5
+    await repository.create_score(ScoreInput(nickname="New", points=500))
+    second = await assert_matches(3)
+    assert second[0].nickname == "New" and second[1:] == first[:2]
+    # Reaching past the top K falls back to the filtered walk.
+    await assert_matches(4, cursor=encode_cursor(second[-1]))
+
+    # A window whose start moved on is rebuilt from the ranked list.
+    repository._windows["daily"].start_us -= 86_400_000_000
+    await assert_matches(10)
+    assert repository._windows["daily"].start_us == to_epoch_us(start)
+
+
+async def test_tag_and_platform_indexes_match_filtered_walk(tmp_path):
+    """
+    GIVEN scores with assorted tags and platforms in the memory and sqlite repositories
+    WHEN tag, platform and combined leaderboards are paged, with writes in between
+    THEN memory pages from its bounded indexes equal the generic filtered walk of sqlite.
+    """
+    memory = MemoryScoreRepository(index_capacity=6)
+    sqlite = SqliteScoreRepository(str(tmp_path / "tags.db"))
+    platforms = ["web", "ios", None]
+
+    async def store(count, offset=0):
+        records = await memory.create_scores([
+            ScoreInput(
+                nickname=f"P{i}",
+                points=(i * 53) % 97,
+                tags=["event"] if i % 3 == 0 else (["daily", "event"] if i % 3 == 1 else []),
+                client=ClientInfo(platform=platforms[i % 3]) if platforms[i % 3] else None,
+            )
+            for i in range(offset, offset + count)
+        ])
+        await sqlite._run(sqlite._insert_many, [_record_to_row(record) for record in records])
+
+    async def pages(repository, **filters):
+        ids, cursor = [], None
+        while True:
+            page = await repository.get_filtered_scores(limit=4, cursor=cursor, **filters)
+            ids.extend(record.id for record in page)
+            if len(page) < 4:
+                return ids
+            cursor = encode_cursor(page[-1])
+
+    await store(40)
+    filters = [{"tag": "event"}, {"tag": "daily"}, {"platform": "ios"}, {"tag": "daily", "platform": "ios"}, {"tag": "none"}]
+    for _ in range(2):
+        for filter_ in filters:
+            assert await pages(memory, **filter_) == await pages(sqlite, **filter_)
+        await store(10, offset=40)
+    assert set(memory._tag_indexes) == {"event", "daily", "none"}
+    assert all(len(top) <= 6 for top in memory._tag_indexes.values())
+    sqlite.close()
+
+
+async def test_expire_scores_in_bounded_slices(tmp_path):
+    """
+    GIVEN old and recent scores in the memory and sqlite repositories
+    WHEN expired scores are removed in slices
+    THEN the oldest go first, no slice exceeds its limit, max_records are always kept
+    AND the memory rank, id, window and tag structures forget the removed scores.
+    """
+    memory = MemoryScoreRepository(index_capacity=4)
+    sqlite = SqliteScoreRepository(str(tmp_path / "expire.db"))
+    records = await memory.create_scores([ScoreInput(nickname=f"P{i}", points=i, tags=["cup"]) for i in range(20)])
+    for age, record in enumerate(records[:12]):
+        record.created_at = datetime.now(timezone.utc) - timedelta(days=30 - age)
+    memory._replace(list(records))
+    await sqlite._run(sqlite._insert_many, [_record_to_row(record) for record in records])
+    await memory.get_filtered_scores(tag="cup")
+
+    for repository in (memory, sqlite):
+        assert await repository.expire_scores(retention_days=14, max_records=5, limit=5) == 5
+        assert await repository.get_score(records[4].id) is None
+        assert await repository.get_score(records[5].id) is not None
+        assert await repository.expire_scores(retention_days=14, max_records=5, limit=5) == 5
+        assert await repository.expire_scores(retention_days=14, max_records=5, limit=5) == 2
+        assert await repository.expire_scores(retention_days=14, max_records=5) == 0
+        assert await repository.get_score_count() == 8
+        assert await repository.get_rank(rank_key(records[12])) == (7, 8)
+
+    assert [r.id for r in await memory.get_filtered_scores(tag="cup", limit=20)] == [r.id for r in records[:11:-1]]
+    assert len(memory._by_time) == len(memory._by_id) == 8
+
+    # The max_records floor keeps old scores when nothing newer exists.
+    assert await memory.cleanup_old_scores(retention_days=0, max_records=3) == 5
+    assert await memory.get_score_count() == 3
+    sqlite.close()
@@ -1,18 +1,29 @@
 # CONTRACT: openapi.yaml#/paths/~1scores
 # CONTRACT: PRD §3
 
-import pytest
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
 from fastapi.testclient import TestClient
 from src.main import app
+from src.models import RetentionPolicy, ScoreBatchInput, ScoreInput
+from src.rate_limit import RateLimitDecision
+from src.repositories import MemoryScoreRepository
+from src.repositories.cursor import to_epoch_us
+from src.repositories.windows import window_start
 from src.routers import scores
+from src.services import score_service as score_service_module
+from src.services.ndjson_ingest import LineSplitter
+from src.services.retention import RetentionScheduler
+from src.services.score_service import ScoreService
 
 client = TestClient(app)
 
-@pytest.fixture(autouse=True)
-def clear_scores_before_each_test():
-    """Reset in-memory score storage before each test."""
-    scores.score_service._repository._scores.clear()
-    yield
+
+def storage_module(repository):
+    """Module of ``repository``'s backend, whose ``now_us`` and ``new_record`` stamp new scores."""
+    return sys.modules[type(repository).__module__]
 
 
 def test_submit_score_success():
@@ -139,11 +150,11 @@ def test_submit_score_rate_limited(monkeypatch):
     WHEN a score is submitted
     THEN it should return a 429 Too Many Requests status.
     """
-    # Mock the rate limiter to always return False for rate limit check
-    def mock_check_rate_limit(client_id: str, tokens: int = 1):
-        return False, 60.0  # Not allowed, retry after 60 seconds
+    # Mock the rate limiter to always reject the request
+    def mock_acquire(client_id: str, tokens: int = 1):
+        return RateLimitDecision(allowed=False, remaining=0, retry_after=60.0)  # Retry after 60 seconds
 
-    monkeypatch.setattr(scores.rate_limiter, "check_rate_limit", mock_check_rate_limit)
+    monkeypatch.setattr(scores.rate_limiters["write"], "acquire", mock_acquire)
 
     response = client.post("/scores", json={
         "nickname": "PlayerFast",
@@ -237,3 +248,414 @@ def test_healthcheck():
     assert data["status"] == "healthy"
     assert data["service"] == "tetris-highscore-api"
     assert data["version"] == "0.3.0"
+
+
+def test_list_scores_cursor_pagination():
+    """
+    CONTRACT: openapi.yaml#/components/schemas/ScoreWindow/properties/nextCursor
+    GIVEN more scores exist than fit on one page
+    WHEN pages are requested by following nextCursor
+    THEN every score is returned exactly once and the last page has a null cursor,
+         even if a higher score is inserted between page requests.
+    """
+    for i in range(5):
+        client.post("/scores", json={"nickname": f"P{i}", "points": (i + 1) * 10})
+
+    first = client.get("/scores?limit=2").json()
+    assert [item["points"] for item in first["items"]] == [50, 40]
+    assert first["nextCursor"]
+
+    client.post("/scores", json={"nickname": "Late", "points": 999})
+
+    second = client.get("/scores", params={"limit": 2, "cursor": first["nextCursor"]}).json()
+    assert [item["points"] for item in second["items"]] == [30, 20]
+
+    third = client.get("/scores", params={"limit": 2, "cursor": second["nextCursor"]}).json()
+    assert [item["points"] for item in third["items"]] == [10]
+    assert third["nextCursor"] is None
+
+
+def test_list_scores_rejects_tampered_cursor():
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores/get/parameters/cursor
+    GIVEN a cursor that was not issued by the server
+    WHEN the GET /scores endpoint is called with it
+    THEN it should return a 400 Bad Request status.
+    """
+    client.post("/scores", json={"nickname": "PlayerA", "points": 100})
+    client.post("/scores", json={"nickname": "PlayerB", "points": 200})
+    cursor = client.get("/scores?limit=1").json()["nextCursor"]
+
+    payload, signature = cursor.split(".")
+    response = client.get("/scores", params={"cursor": payload[:-1] + ("A" if payload[-1] != "A" else "B") + "." + signature})
+    assert response.status_code == 400
+
+    response = client.get("/scores", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_list_scores_cache_invalidated_only_by_affecting_writes():
+    """
+    GIVEN a cached leaderboard page that has more entries behind it
+    WHEN a score lands below that page, and later a score lands on it
+    THEN the first write keeps serving the cached body and the second refreshes it.
+    """
+    for points in (300, 200, 100):
+        client.post("/scores", json={"nickname": f"P{points}", "points": points})
+
+    first = client.get("/scores?limit=2").json()
+    assert [item["points"] for item in first["items"]] == [300, 200]
+
+    client.post("/scores", json={"nickname": "Below", "points": 50})
+    cached = client.get("/scores?limit=2").json()
+    assert cached == first
+
+    client.post("/scores", json={"nickname": "Above", "points": 250})
+    refreshed = client.get("/scores?limit=2").json()
+    assert [item["points"] for item in refreshed["items"]] == [300, 250]
+    assert scores.score_service.leaderboard_cache.hits == 1
+
+
+async def test_leaderboard_page_read_across_a_write_is_not_cached(monkeypatch):
+    """
+    GIVEN a leaderboard read during which another request stores a better score
+    WHEN the read finishes and the leaderboard is requested again
+    THEN the page read before the write is not cached, and the next read includes the new score.
+    """
+    service = ScoreService(MemoryScoreRepository())
+    await service.create_score(ScoreInput(nickname="First", points=100))
+    policy = RetentionPolicy(days=14, maxRecords=100)
+    read_page = service.get_top_scores_page
+
+    async def read_then_write(**kwargs):
+        page = await read_page(**kwargs)
+        await service.create_score(ScoreInput(nickname="Second", points=200))
+        return page
+
+    with monkeypatch.context() as patch:
+        patch.setattr(service, "get_top_scores_page", read_then_write)
+        stale = json.loads(await service.get_leaderboard_json(policy))
+    assert [item["nickname"] for item in stale["items"]] == ["First"]
+
+    fresh = json.loads(await service.get_leaderboard_json(policy))
+    assert [item["nickname"] for item in fresh["items"]] == ["Second", "First"]
+
+
+def test_list_scores_conditional_get():
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores/get@304
+    GIVEN a client that remembers the ETag of a leaderboard response
+    WHEN it revalidates with If-None-Match before and after a new score
+    THEN it gets 304 while nothing changed and a fresh 200 with a new ETag afterwards.
+    """
+    client.post("/scores", json={"nickname": "PlayerA", "points": 100})
+    first = client.get("/scores")
+    etag = first.headers["ETag"]
+
+    not_modified = client.get("/scores", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert "X-RateLimit-Remaining" in not_modified.headers
+
+    client.post("/scores", json={"nickname": "PlayerB", "points": 200})
+    changed = client.get("/scores", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()["items"]) == 2
+
+
+def test_window_etag_changes_at_rollover(monkeypatch):
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores/get@200
+    GIVEN a client holding the ETag of the daily leaderboard
+    WHEN the UTC day rolls over without any new score
+    THEN revalidation returns 200 with a new ETag instead of 304.
+    """
+    client.post("/scores", json={"nickname": "PlayerA", "points": 100})
+    etag = client.get("/scores?window=daily").headers["ETag"]
+    assert client.get("/scores?window=daily", headers={"If-None-Match": etag}).status_code == 304
+
+    tomorrow = window_start("daily") + timedelta(days=1)
+    monkeypatch.setattr(score_service_module, "window_start", lambda window, now=None: tomorrow)
+    rolled = client.get("/scores?window=daily", headers={"If-None-Match": etag})
+    assert rolled.status_code == 200
+    assert rolled.headers["ETag"] != etag
+
+
+def test_submit_scores_bulk_charged_per_item():
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores~1bulk/post@429
+    GIVEN the write bucket holds 50 tokens and bulk items cost one token each
+    WHEN a client uploads batches totalling more than 50 items
+    THEN headers report the budget left after each batch, the overflowing batch
+         is rejected with 429, and reads still succeed from their own bucket.
+    """
+    batch = {"items": [{"nickname": f"P{i}", "points": i} for i in range(20)]}
+
+    first = client.post("/scores/bulk", json=batch)
+    assert first.status_code == 207
+    assert first.headers["X-RateLimit-Limit"] == "50"
+    assert first.headers["X-RateLimit-Remaining"] == "30"
+    assert first.headers["X-RateLimit-Cost"] == "20"
+
+    second = client.post("/scores/bulk", json=batch)
+    assert second.status_code == 207
+    assert second.headers["X-RateLimit-Remaining"] == "10"
+
+    third = client.post("/scores/bulk", json=batch)
+    assert third.status_code == 429
+    assert "Retry-After" in third.headers
+
+    read = client.get("/scores")
+    assert read.status_code == 200
+    assert read.headers["X-RateLimit-Remaining"] == "29"
+
+
+async def test_bulk_ingestion_partitions_then_stores_once():
+    """
+    GIVEN a batch mixing valid items with items that skipped model validation
+    WHEN ScoreService.create_scores_bulk runs
+    THEN each invalid item carries its reason code and the valid items are
+         stored with a single repository call.
+    """
+    repository = MemoryScoreRepository()
+    calls = []
+    original = repository.create_scores
+
+    async def counting_create_scores(score_inputs):
+        calls.append(len(score_inputs))
+        return await original(score_inputs)
+
+    repository.create_scores = counting_create_scores
+    service = ScoreService(repository)
+    batch = ScoreBatchInput(items=[
+        ScoreInput(nickname="Good1", points=10),
+        ScoreInput.model_construct(nickname="Neg", points=-1, lines=None, level_reached=None,
+                                   duration_seconds=None, seed=None, tags=[], client=None),
+        ScoreInput.model_construct(nickname="Tags", points=1, lines=None, level_reached=None,
+                                   duration_seconds=None, seed=None, tags=["x" * 25], client=None),
+        ScoreInput(nickname="Good2", points=20),
+    ])
+
+    result = await service.create_scores_bulk(batch)
+    assert [s.nickname for s in result.accepted] == ["Good1", "Good2"]
+    assert [r.reason for r in result.rejected] == ["INVALID_POINTS", "TAG_TOO_LONG"]
+    assert calls == [2]
+
+
+def test_retried_submissions_return_original_score():
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores/post@201
+    GIVEN a score submitted with an Idempotency-Key, then a bulk batch
+    WHEN the same submissions are retried (header key, item key, or identical payload)
+    THEN the original scores are returned and no duplicate rows are stored.
+    """
+    payload = {"nickname": "Retry", "points": 700}
+    first = client.post("/scores", json=payload, headers={"Idempotency-Key": "run-1"})
+    again = client.post("/scores", json=payload, headers={"Idempotency-Key": "run-1"})
+    assert first.status_code == again.status_code == 201
+    assert again.json()["id"] == first.json()["id"]
+
+    batch = {"items": [
+        {"nickname": "Queued", "points": 10, "idempotencyKey": "q-1"},
+        {"nickname": "NoKey", "points": 20, "seed": "abc"},
+        {"nickname": "NoKey", "points": 20, "seed": "abc"},
+    ]}
+    uploaded = client.post("/scores/bulk", json=batch).json()
+    resent = client.post("/scores/bulk", json=batch).json()
+    assert [s["id"] for s in resent["accepted"]] == [s["id"] for s in uploaded["accepted"]]
+    assert uploaded["accepted"][1]["id"] == uploaded["accepted"][2]["id"]
+
+    listed = client.get("/scores", params={"limit": 100}).json()["items"]
+    assert sorted(s["nickname"] for s in listed) == ["NoKey", "Queued", "Retry"]
+
+
+def test_idempotency_key_covers_the_whole_payload():
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores/post@409
+    GIVEN stored submissions with and without an Idempotency-Key
+    WHEN a keyless payload differing only in lines or level is sent, or a key is reused for another payload
+    THEN the keyless payloads are stored as new scores and the reused key is refused,
+         with 409 for a single submission and IDEMPOTENCY_CONFLICT for a bulk item.
+    """
+    payload = {"nickname": "Runner", "points": 500, "lines": 10, "levelReached": 2}
+    first = client.post("/scores", json=payload)
+    more_lines = client.post("/scores", json={**payload, "lines": 11})
+    higher_level = client.post("/scores", json={**payload, "levelReached": 3})
+    assert len({first.json()["id"], more_lines.json()["id"], higher_level.json()["id"]}) == 3
+
+    keyed = client.post("/scores", json=payload, headers={"Idempotency-Key": "run-9"})
+    assert keyed.status_code == 201
+    reused = client.post("/scores", json={**payload, "points": 900}, headers={"Idempotency-Key": "run-9"})
+    assert reused.status_code == 409
+
+    batch = {"items": [
+        {**payload, "points": 900, "idempotencyKey": "run-9"},
+        {"nickname": "Fresh", "points": 30, "idempotencyKey": "b-1"},
+        {"nickname": "Other", "points": 40, "idempotencyKey": "b-1"},
+    ]}
+    result = client.post("/scores/bulk", json=batch).json()
+    assert [s["nickname"] for s in result["accepted"]] == ["Fresh"]
+    assert [(r["reason"], r["payload"]["nickname"]) for r in result["rejected"]] == [
+        ("IDEMPOTENCY_CONFLICT", "Runner"), ("IDEMPOTENCY_CONFLICT", "Other"),
+    ]
+
+    listed = client.get("/scores", params={"limit": 100}).json()["items"]
+    assert sorted(s["nickname"] for s in listed) == ["Fresh"] + ["Runner"] * 4
+
+
+def test_submit_scores_stream_reports_each_line():
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores~1stream/post@200
+    GIVEN an NDJSON upload mixing valid lines, invalid lines, a blank line and garbage
+    WHEN the POST /scores/stream endpoint is called
+    THEN one result per non-blank line is streamed back with the bulk reason codes
+         and the accepted scores are stored.
+    """
+    body = b"\n".join([
+        b'{"nickname": "Streamer", "points": 900}',
+        b'{"nickname": "Negative", "points": -5}',
+        b"",
+        b"not json",
+        b'{"nickname": "' + b"x" * 17 + b'", "points": 1}',
+        b'{"nickname": "   ", "points": 3}',
+        b'{"nickname": "Last", "points": 10, "levelReached": 2}',
+    ])
+    response = client.post("/scores/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["line"], r["status"]) for r in results] == [
+        (1, "accepted"), (2, "rejected"), (4, "rejected"), (5, "rejected"), (6, "rejected"), (7, "accepted"),
+    ]
+    assert [r.get("reason") for r in results if r["status"] == "rejected"] == [
+        "INVALID_POINTS", "VALIDATION_ERROR", "NICKNAME_TOO_LONG", "EMPTY_NICKNAME",
+    ]
+    assert results[-1]["score"]["levelReached"] == 2
+
+    listed = client.get("/scores").json()["items"]
+    assert [s["nickname"] for s in listed] == ["Streamer", "Last"]
+
+
+def test_line_splitter_handles_chunk_boundaries_and_overlong_lines():
+    """
+    GIVEN NDJSON bytes split at arbitrary points, with one line over the size cap
+    WHEN they are fed to LineSplitter chunk by chunk
+    THEN complete lines come out numbered and the overlong line is reported without being buffered.
+    """
+    splitter = LineSplitter(max_line_bytes=16)
+    lines = []
+    for chunk in (b'{"a":', b'1}\n\n' + b"y" * 20, b"y" * 20, b'\n{"b":2}'):
+        lines += splitter.feed(chunk)
+        assert len(splitter._buffer) <= 16
+    lines += splitter.close()
+    assert lines == [(1, b'{"a":1}'), (3, None), (4, b'{"b":2}')]
+
+
+def test_score_rank_by_points_and_id(monkeypatch):
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores~1rank/get@200
+    GIVEN stored scores including a tie and a suspect score
+    WHEN GET /scores/rank is called with a points value or a stored score id
+    THEN the rank follows leaderboard order with suspect scores excluded.
+    """
+    module = storage_module(scores.score_service._repository)
+    stamp = module.new_record
+
+    def flag_a_as_suspect(score_input, created_us):
+        record = stamp(score_input, created_us)
+        record.suspect = score_input.nickname == "A"
+        return record
+
+    ids = {}
+    with monkeypatch.context() as patch:
+        patch.setattr(module, "new_record", flag_a_as_suspect)
+        for nickname, points in [("A", 500), ("B", 300), ("C", 300), ("D", 100)]:
+            ids[nickname] = client.post("/scores", json={"nickname": nickname, "points": points}).json()["id"]
+
+    by_points = client.get("/scores/rank", params={"points": 300})
+    assert by_points.status_code == 200
+    assert by_points.json() == {"scoreId": None, "points": 300, "rank": 1, "total": 4, "topPercent": 25.0}
+
+    # C is newer than B, so it ranks ahead of it on equal points.
+    assert client.get("/scores/rank", params={"id": ids["C"]}).json()["rank"] == 1
+    ranked_b = client.get("/scores/rank", params={"id": ids["B"]}).json()
+    assert (ranked_b["rank"], ranked_b["total"], ranked_b["topPercent"]) == (2, 3, 66.67)
+    assert client.get("/scores/rank", params={"id": ids["A"]}).json()["rank"] is None
+
+    assert client.get("/scores/rank", params={"id": "missing"}).status_code == 404
+    assert client.get("/scores/rank").status_code == 400
+    assert client.get("/scores/rank", params={"points": 1, "id": ids["B"]}).status_code == 400
+
+
+def test_list_scores_daily_window(monkeypatch):
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores/get
+    GIVEN a score from today and one backdated to last week
+    WHEN GET /scores is called with window=daily, window=all and an invalid window
+    THEN only today's score is in the daily board, both are all-time, and bad values yield 422.
+    """
+    last_week = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=8))
+    with monkeypatch.context() as patch:
+        patch.setattr(storage_module(scores.score_service._repository), "now_us", lambda: last_week)
+        client.post("/scores", json={"nickname": "Old", "points": 900})
+    client.post("/scores", json={"nickname": "Today", "points": 100})
+
+    daily = client.get("/scores", params={"window": "daily"})
+    assert daily.status_code == 200
+    assert [s["nickname"] for s in daily.json()["items"]] == ["Today"]
+    assert [s["nickname"] for s in client.get("/scores", params={"window": "all"}).json()["items"]] == ["Old", "Today"]
+    assert client.get("/scores", params={"window": "monthly"}).status_code == 422
+
+
+def test_list_scores_by_tag_and_platform():
+    """
+    CONTRACT: openapi.yaml#/paths/~1scores/get
+    GIVEN scores with different tags and platforms
+    WHEN GET /scores is filtered by tag or platform, before and after a new matching write
+    THEN only matching scores are listed and the cached page is refreshed.
+    """
+    client.post("/scores", json={"nickname": "Web", "points": 300, "tags": ["cup"], "client": {"platform": "web"}})
+    client.post("/scores", json={"nickname": "Mobile", "points": 200, "client": {"platform": "ios"}})
+
+    assert [s["nickname"] for s in client.get("/scores", params={"tag": "cup"}).json()["items"]] == ["Web"]
+    assert [s["nickname"] for s in client.get("/scores", params={"platform": "ios"}).json()["items"]] == ["Mobile"]
+
+    client.post("/scores", json={"nickname": "Mobile2", "points": 250, "client": {"platform": "ios"}})
+    listed = client.get("/scores", params={"platform": "ios"}).json()["items"]
+    assert [s["nickname"] for s in listed] == ["Mobile2", "Mobile"]
+    assert client.get("/scores", params={"tag": "x" * 25}).status_code == 422
+
+
+async def test_retention_scheduler_sweeps_in_slices(monkeypatch):
+    """
+    GIVEN a backlog of expired scores and a small slice size
+    WHEN the retention scheduler sweeps, and when the app starts up
+    THEN the whole backlog is reclaimed and reported, and the lifespan runs the scheduler.
+    """
+    service = ScoreService(MemoryScoreRepository())
+    expired = to_epoch_us(datetime.now(timezone.utc) - timedelta(days=20))
+    with monkeypatch.context() as patch:
+        patch.setattr(storage_module(service._repository), "now_us", lambda: expired)
+        await service._repository.create_scores([ScoreInput(nickname=f"P{i}", points=i) for i in range(25)])
+    calls = []
+    expire = service.expire_scores
+
+    async def counting_expire(policy, limit=None):
+        calls.append(limit)
+        return await expire(policy, limit)
+
+    monkeypatch.setattr(service, "expire_scores", counting_expire)
+    scheduler = RetentionScheduler(service, RetentionPolicy(days=14, maxRecords=3), slice_size=10)
+    assert await scheduler.sweep() == 22
+    assert calls == [10, 10, 10]
+    assert (scheduler.reclaimed_total, scheduler.last_reclaimed) == (22, 22)
+    assert await service._repository.get_score_count() == 3
+
+    with TestClient(app) as running:
+        assert running.get("/healthz").status_code == 200
+        assert app.state.retention._task is not None
+        assert app.state.retention.policy is scores.retention_policy
+    assert app.state.retention._task is None
@@ -0,0 +1,150 @@
+# CONTRACT: openapi.yaml#/components/schemas/ScoreWindow
+# CONTRACT: openapi.yaml#/components/schemas/Score
+
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.models import ClientInfo, RetentionPolicy, Score, ScoreWindow
+from src.repositories.record import ScoreRecord, shared_client
+from src.serialization import encode_score, encode_score_window
+
+SPEC_PATH = Path(__file__).resolve().parents[2] / "docs" / "openapi.yaml"
+RFC3339 = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:\d{2})$")
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def spec():
+    """The published OpenAPI document; schema checks are skipped without PyYAML."""
+    yaml = pytest.importorskip("yaml")
+    return yaml.safe_load(SPEC_PATH.read_text())
+
+
+def resolve(spec, schema):
+    while "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        schema = spec["components"]["schemas"][name]
+    return schema
+
+
+def assert_conforms(spec, value, schema, path="$"):
+    """Check ``value`` against the subset of OpenAPI 3.0 schema keywords ``spec`` uses."""
+    schema = resolve(spec, schema)
+    if value is None:
+        assert schema.get("nullable"), f"{path} is null but not nullable"
+        return
+    for part in schema.get("allOf", []):
+        assert_conforms(spec, value, part, path)
+    kind = schema.get("type")
+    if kind == "object":
+        assert isinstance(value, dict), path
+        properties = schema.get("properties", {})
+        for name in schema.get("required", []):
+            assert name in value, f"{path}.{name} is required"
+        if schema.get("additionalProperties") is False:
+            assert set(value) <= set(properties), f"{path} has unexpected keys {set(value) - set(properties)}"
+        for name, item in value.items():
+            if name in properties:
+                assert_conforms(spec, item, properties[name], f"{path}.{name}")
+    elif kind == "array":
+        assert isinstance(value, list), path
+        for index, item in enumerate(value):
+            assert_conforms(spec, item, schema.get("items", {}), f"{path}[{index}]")
+    elif kind == "string":
+        assert isinstance(value, str), path
+        assert len(value) <= schema.get("maxLength", len(value)), path
+        if schema.get("format") == "date-time":
+            assert RFC3339.match(value), f"{path} is not RFC 3339: {value}"
+    elif kind == "integer":
+        assert isinstance(value, int) and not isinstance(value, bool), path
+        assert value >= schema.get("minimum", value), path
+    elif kind == "boolean":
+        assert isinstance(value, bool), path
+
+
+def make_scores():
+    utc = datetime(2025, 3, 1, 12, 30, 5, 120, tzinfo=timezone.utc)
+    return [
+        Score.model_construct(
+            id="a1", nickname="Zoë \"Q\"\\", points=12000, lines=40, level_reached=7, duration_seconds=321,
+            seed="bag-7", created_at=utc, suspect=False,
+            client=ClientInfo.model_construct(version="0.3.0", platform="web", ua="Mozilla/5.0 ☃"),
+            tags=["daily", "tab\tnew\nline"],
+        ),
+        Score.model_construct(
+            id="b2", nickname="\u0001ctl", points=0, lines=0, level_reached=0, duration_seconds=0,
+            seed=None, created_at=utc.replace(microsecond=0), suspect=True, client=None, tags=[],
+        ),
+        Score.model_construct(
+            id="c3", nickname="Offset", points=5, lines=1, level_reached=1, duration_seconds=9,
+            seed=None, created_at=utc.astimezone(timezone(timedelta(hours=-3, minutes=-30))), suspect=False,
+            client=ClientInfo.model_construct(version=None, platform=None, ua=None), tags=["x"],
+        ),
+    ]
+
+
+def test_encoder_matches_pydantic_byte_for_byte():
+    """
+    GIVEN scores covering escapes, non-ASCII text, nulls and several timestamp forms
+    WHEN they are encoded with the fast encoder
+    THEN the bytes equal Pydantic's by-alias JSON for both Score and ScoreWindow.
+    """
+    scores = make_scores()
+    retention = RetentionPolicy(days=14, maxRecords=100)
+    generated_at = datetime(2025, 3, 1, 13, 0, tzinfo=timezone.utc)
+    expected = ScoreWindow.model_construct(
+        generated_at=generated_at, retention=retention, next_cursor="abc", items=scores
+    ).model_dump_json(by_alias=True).encode()
+
+    for _ in range(2):
+        assert encode_score_window(generated_at, retention, "abc", scores) == expected
+        for score in scores:
+            assert encode_score(score) == score.model_dump_json(by_alias=True).encode()
+
+
+def test_record_encoding_matches_converted_score():
+    """
+    GIVEN a stored record
+    WHEN it is encoded directly, cold and then from its memoized fragment
+    THEN the bytes equal Pydantic's JSON for the converted Score.
+    """
+    record = ScoreRecord(
+        "r1", "Zoë", 900, 12, 3, 60, None, 1740832205000120, False,
+        shared_client("0.3.0", "web", None), ("daily", "tab\tx"),
+    )
+    expected = record.to_score().model_dump_json(by_alias=True).encode()
+    assert encode_score(record) == expected
+    assert record.json is not None
+    assert encode_score(record) == expected
+
+
+def test_encoded_window_conforms_to_openapi(spec):
+    """
+    GIVEN the ScoreWindow and Score schemas from docs/openapi.yaml
+    WHEN a page is encoded with the fast encoder
+    THEN the document satisfies the schema, including RFC 3339 timestamps.
+    """
+    body = encode_score_window(datetime.now(timezone.utc), RetentionPolicy(days=14, maxRecords=100), None, make_scores())
+    assert_conforms(spec, json.loads(body), {"$ref": "#/components/schemas/ScoreWindow"})
+
+
+def test_endpoints_serve_conforming_documents(spec):
+    """
+    GIVEN a score submitted through the API
+    WHEN it is returned by POST /scores and GET /scores
+    THEN both responses conform to the published schemas.
+    """
+    created = client.post("/scores", json={"nickname": "Schema", "points": 77, "client": {"version": "1.0"}})
+    assert created.status_code == 201
+    assert_conforms(spec, created.json(), {"$ref": "#/components/schemas/Score"})
+
+    listed = client.get("/scores")
+    assert listed.status_code == 200
+    assert_conforms(spec, listed.json(), {"$ref": "#/components/schemas/ScoreWindow"})
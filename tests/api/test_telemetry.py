@@ -0,0 +1,287 @@
+# CONTRACT: openapi.yaml#/paths/~1telemetry
+
+import errno
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.rate_limit import RateLimitDecision
+from src.routers import scores, telemetry
+from src.telemetry import (
+    BatchEncoder,
+    EventType,
+    LogHistogram,
+    MemorySink,
+    RingBuffer,
+    RotatingFileSink,
+    TelemetryEvent,
+    TelemetryPipeline,
+    TelemetryRollups,
+    decode_binary,
+)
+from src.telemetry.encoding import BINARY_MAGIC
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def memory_pipeline(monkeypatch):
+    """Route ingested events to an in-memory sink with fresh rollups."""
+    pipeline = TelemetryPipeline(MemorySink(), capacity=8, batch_size=4, rollups=TelemetryRollups())
+    monkeypatch.setattr(telemetry, "pipeline", pipeline)
+    yield pipeline
+
+
+def event(kind="game_started", **properties):
+    return {"event": kind, "properties": properties, "timestamp": 1_700_000_000_000, "sessionId": "session-1"}
+
+
+def test_ring_buffer_wraps_and_counts_drops():
+    """
+    GIVEN a full ring buffer that has wrapped around its slots
+    WHEN more items are pushed and the buffer is drained
+    THEN overflow is refused and counted and items come out in FIFO order.
+    """
+    buffer = RingBuffer(3)
+    assert all(buffer.push(item) for item in (1, 2, 3))
+    assert not buffer.push(4)
+    assert buffer.drain(2) == [1, 2]
+    assert buffer.push(5) and buffer.push(6)
+    assert buffer.drain() == [3, 5, 6]
+    assert buffer.dropped == 1
+    assert len(buffer) == 0
+
+
+def test_submit_telemetry_buffers_and_reports_drops(memory_pipeline):
+    """
+    CONTRACT: openapi.yaml#/paths/~1telemetry/post@202
+    GIVEN a pipeline whose buffer holds 8 events
+    WHEN batches larger than the free space are posted
+    THEN the response is 202 and reports sampled-out and dropped events instead of waiting.
+    """
+    response = client.post("/telemetry", json={"events": [event(), event("line_clear", linesCleared=4, isB2B=True)]})
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2, "sampledOut": 0, "dropped": 0}
+
+    memory_pipeline.sample_rate = 0.0
+    response = client.post("/telemetry", json={"events": [event()] * 3})
+    assert response.json() == {"accepted": 0, "sampledOut": 3, "dropped": 0}
+
+    # Past half full the keep probability falls towards zero; a zero draw keeps any nonzero chance.
+    memory_pipeline.sample_rate = 1.0
+    memory_pipeline._rng = lambda: 0.0
+    response = client.post("/telemetry", json={"events": [event()] * 10})
+    assert response.json() == {"accepted": 6, "sampledOut": 4, "dropped": 0}
+
+    # Without shedding a full buffer refuses events.
+    memory_pipeline.buffer.drain()
+    memory_pipeline.shed_threshold = 1.0
+    response = client.post("/telemetry", json={"events": [event()] * 10})
+    assert response.json() == {"accepted": 8, "sampledOut": 0, "dropped": 2}
+    assert (memory_pipeline.accepted, memory_pipeline.sampled_out, memory_pipeline.dropped) == (16, 7, 2)
+
+    assert client.post("/telemetry", json={"events": [event("unknown_event")]}).status_code == 422
+    assert client.post("/telemetry", json={"events": []}).status_code == 422
+    assert client.post("/telemetry", json={"events": [{"event": "hold_used", "timestamp": 10**30}]}).status_code == 422
+
+
+def test_lifespan_drains_buffer_to_sink(memory_pipeline):
+    """
+    GIVEN the application running with its lifespan
+    WHEN events are posted and the application shuts down
+    THEN every accepted event reaches the sink in order.
+    """
+    memory_pipeline.shed_threshold = 1.0
+    with TestClient(app) as running:
+        events = [event("game_over", score=i) for i in range(6)]
+        assert running.post("/telemetry", json={"events": events}).json()["accepted"] == 6
+    written = memory_pipeline.sink.events
+    assert [item.properties["score"] for item in written] == list(range(6))
+    assert written[0].event_type is EventType.GAME_OVER
+    assert written[0].session_id == "session-1"
+    assert memory_pipeline.written == 6
+
+
+def test_submit_telemetry_rate_limited(memory_pipeline, monkeypatch):
+    """
+    CONTRACT: openapi.yaml#/paths/~1telemetry/post@429
+    GIVEN a client whose write bucket is exhausted
+    WHEN it posts a telemetry batch
+    THEN the request is rejected with 429 and no event is buffered.
+    """
+    assert client.post("/telemetry", json={"events": [event()]}).headers["X-RateLimit-Cost"] == "1"
+
+    def exhausted(client_id, tokens=1):
+        return RateLimitDecision(allowed=False, remaining=0, retry_after=30.0)
+
+    monkeypatch.setattr(scores.rate_limiters["write"], "acquire", exhausted)
+    response = client.post("/telemetry", json={"events": [event()]})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert memory_pipeline.accepted == 1
+
+
+async def test_rotating_file_sink_rotates_compresses_and_prunes(tmp_path):
+    """
+    GIVEN a file sink with a tiny size limit
+    WHEN several batches are written and the sink is closed
+    THEN full files are gzipped, only the newest are kept and every line is valid JSON.
+    """
+    sink = RotatingFileSink(str(tmp_path), max_bytes=200, max_files=2)
+    stamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for batch in range(4):
+        await sink.write([TelemetryEvent.create(EventType.LINE_CLEAR, {"batch": batch, "i": i}, stamp) for i in range(3)])
+    await sink.close()
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert len(files) == 2
+    assert all(name.endswith(".ndjson.gz") for name in files)
+    lines = [json.loads(line) for name in files for line in gzip.open(tmp_path / name, "rt")]
+    assert {line["properties"]["batch"] for line in lines} == {2, 3}
+    assert lines[0]["event_type"] == "line_clear"
+
+
+async def test_rotating_file_sink_prunes_only_rotated_files(tmp_path, monkeypatch):
+    """
+    GIVEN an uncompressed file sink sharing its directory with another worker's older active file
+    WHEN it rotates past max_files, and then a rotation fails
+    THEN only rotated files are pruned, and the failed rotation does not fail the written batch.
+    """
+    active = tmp_path / "telemetry-20200101T000000-1.ndjson.part"
+    active.write_bytes(b"{}\n")
+    os.utime(active, (0, 0))
+    sink = RotatingFileSink(str(tmp_path), max_bytes=100, max_files=1, compress=False)
+    stamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    batch = [TelemetryEvent.create(EventType.LINE_CLEAR, {"i": i}, stamp) for i in range(3)]
+    for _ in range(3):
+        await sink.write(batch)
+    assert active.exists()
+    assert len([path for path in tmp_path.iterdir() if path.name.endswith(".ndjson")]) == 1
+
+    def fail_prune():
+        raise OSError(errno.EIO, "Input/output error")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(sink, "_prune", fail_prune)
+        await sink.write(batch)
+    await sink.close()
+    assert active.exists()
+
+
+async def test_batch_encoder_formats_round_trip(tmp_path):
+    """
+    GIVEN slotted events with codes, nanosecond timestamps and optional properties
+    WHEN batches are encoded as NDJSON and as binary, reusing one encoder
+    THEN NDJSON lines match to_dict() and binary files decode to the same events.
+    """
+    stamp = datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)
+    events = [
+        TelemetryEvent.create(EventType.HOLD_USED, timestamp=stamp),
+        TelemetryEvent.create(EventType.SETTING_CHANGED, {"setting": "ghost \"on\"", "value": 1.5}, stamp, "s-\u00e9"),
+    ]
+    assert events[0].timestamp == stamp
+    assert events[0].properties is None
+
+    encoder = BatchEncoder("ndjson", capacity=16)
+    first = bytes(encoder.encode(events))
+    assert [json.loads(line) for line in first.splitlines()] == [event.to_dict() for event in events]
+    assert bytes(encoder.encode(events[:1])) == first.splitlines(keepends=True)[0]
+
+    sink = RotatingFileSink(str(tmp_path), compress=False, encoding="binary")
+    await sink.write(events)
+    await sink.write(events[1:])
+    await sink.close()
+    (path,) = tmp_path.iterdir()
+    decoded = decode_binary(path.read_bytes())
+    assert [event.to_dict() for event in decoded] == [event.to_dict() for event in events + events[1:]]
+
+    out_of_range = TelemetryEvent(events[0].code, 10**30, None, None)
+    binary = BatchEncoder("binary")
+    encoded = bytes(binary.encode([events[0], out_of_range, events[1]]))
+    assert binary.skipped == 1
+    assert [event.to_dict() for event in decode_binary(BINARY_MAGIC + encoded)] == [event.to_dict() for event in events]
+
+
+def test_log_histogram_quantiles_within_relative_error():
+    """
+    GIVEN a log histogram fed 1..100000 and a second one merged into it
+    WHEN quantiles are read
+    THEN count, sum, min and max are exact and quantiles are within 1/16 of the true value.
+    """
+    histogram, other = LogHistogram(), LogHistogram()
+    for value in range(1, 50_001):
+        histogram.record(value)
+        other.record(value + 50_000)
+    histogram.merge(other)
+    assert (histogram.count, histogram.total, histogram.min, histogram.max) == (100_000, 5_000_050_000, 1, 100_000)
+    for q in (0.01, 0.5, 0.9, 0.99):
+        assert abs(histogram.quantile(q) - q * 100_000) <= q * 100_000 / 16
+    assert len(histogram._counts) < 150
+
+    histogram.record(float("inf"))
+    histogram.record(float("nan"))
+    assert histogram.count == 100_000
+
+
+def test_telemetry_rollups_query(memory_pipeline, monkeypatch):
+    """
+    CONTRACT: openapi.yaml#/paths/~1telemetry~1rollups/get@200
+    GIVEN events posted across two rollup buckets, some of them sampled out
+    WHEN rollups are queried for the whole range and for the latest bucket
+    THEN counts and histograms cover every submitted event and the total merges the buckets.
+    """
+    rollups = memory_pipeline.rollups
+    now_ms = 1_700_000_000_000
+    old = [TelemetryEvent.create(EventType.GAME_OVER, {"score": 100, "duration": 60}, datetime.fromtimestamp(now_ms / 1000 - 120, timezone.utc))]
+    rollups.add(old, received_ns=(now_ms - 120_000) * 1_000_000)
+
+    memory_pipeline.sample_rate = 0.0
+    games = [event("game_over", score=points, duration=120, lines=10, level=2) for points in (300, 500)]
+    response = client.post("/telemetry", json={"events": games + [event("line_clear", linesCleared=4, isB2B=True)]})
+    assert response.json()["sampledOut"] == 3
+
+    body = client.get("/telemetry/rollups").json()
+    assert body["bucketSeconds"] == 60
+    assert [bucket["counts"] for bucket in body["buckets"]] == [{"game_over": 1}, {"game_over": 2, "line_clear": 1}]
+    total = body["total"]
+    assert total["counts"] == {"game_over": 3, "line_clear": 1}
+    duration = total["histograms"]["game_over.duration"]
+    assert (duration["count"], duration["mean"], duration["max"]) == (3, 100.0, 120.0)
+    assert total["histograms"]["line_clear.linesCleared"]["count"] == 1
+    assert "isB2B" not in str(total["histograms"])
+
+    latest = client.get("/telemetry/rollups", params={"since": body["buckets"][1]["start"]}).json()
+    assert [bucket["counts"] for bucket in latest["buckets"]] == [{"game_over": 2, "line_clear": 1}]
+    # Naive timestamps are UTC whatever the server's local zone.
+    monkeypatch.setenv("TZ", "Asia/Shanghai")
+    time.tzset()
+    naive = body["buckets"][1]["start"].replace("Z", "").replace("+00:00", "")
+    latest = client.get("/telemetry/rollups", params={"since": naive}).json()
+    assert [bucket["counts"] for bucket in latest["buckets"]] == [{"game_over": 2, "line_clear": 1}]
+    assert client.get("/telemetry/rollups", params={"until": "2000-01-01T00:00:00Z"}).json()["total"] is None
+    monkeypatch.delenv("TZ")
+    time.tzset()
+
+
+def test_submit_telemetry_nulls_non_finite_numbers(memory_pipeline):
+    """
+    CONTRACT: openapi.yaml#/paths/~1telemetry/post@202
+    GIVEN a JSON body whose property overflows to infinity
+    WHEN it is posted
+    THEN the event is accepted with that property set to null and rollups skip it.
+    """
+    body = b'{"events": [{"event": "game_over", "timestamp": 1, "properties": {"score": 1e400, "lines": 3}}]}'
+    response = client.post("/telemetry", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 1
+    (buffered,) = memory_pipeline.buffer.drain(10)
+    assert buffered.properties == {"score": None, "lines": 3}
+    histograms = client.get("/telemetry/rollups").json()["total"]["histograms"]
+    assert "game_over.score" not in histograms
+    assert histograms["game_over.lines"]["count"] == 1
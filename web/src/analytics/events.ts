@@ -2,6 +2,8 @@
  * Client-side analytics and event tracking
  */
 
+import { resolveBaseUrl } from '../net/client-factory';
+
 export const AnalyticsEvent = {
   GAME_STARTED: 'game_started',
   GAME_OVER: 'game_over',
@@ -31,6 +33,8 @@ class AnalyticsCollector {
   private events: TrackedEvent[] = [];
   private sessionId: string;
   private batchSize = 50;
+  private maxRequestEvents = 200; // POST /telemetry limit
+  private maxQueuedEvents = 1000;
   private flushInterval = 30000; // 30 seconds
   private flushTimer?: number;
 
@@ -69,17 +73,36 @@ class AnalyticsCollector {
     const eventsToSend = [...this.events];
     this.events = [];
 
+    let sent = 0;
     try {
-      // In a real implementation, send to analytics service
-      console.log('Analytics batch:', eventsToSend);
-
-      // Store locally for debugging
-      this.storeEventsLocally(eventsToSend);
-
+      while (sent < eventsToSend.length) {
+        const chunk = eventsToSend.slice(sent, sent + this.maxRequestEvents);
+        await this.send(chunk);
+        sent += chunk.length;
+      }
     } catch (error) {
       console.warn('Failed to send analytics events:', error);
-      // Re-queue events for next attempt
-      this.events.unshift(...eventsToSend);
+      const unsent = eventsToSend.slice(sent);
+      // Store locally for debugging
+      this.storeEventsLocally(unsent);
+      // Re-queue unsent events for next attempt, keeping the newest if offline for long
+      this.events.unshift(...unsent);
+      if (this.events.length > this.maxQueuedEvents) {
+        this.events.splice(0, this.events.length - this.maxQueuedEvents);
+      }
+    }
+  }
+
+  private async send(events: TrackedEvent[]): Promise<void> {
+    // The server answers 202 as soon as events are buffered; keepalive lets the final flush outlive the page.
+    const response = await fetch(`${resolveBaseUrl()}/telemetry`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ events }),
+      keepalive: true,
+    });
+    if (!response.ok) {
+      throw new Error(`Telemetry upload failed with status ${response.status}`);
     }
   }
 
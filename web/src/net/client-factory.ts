@@ -2,7 +2,7 @@ import { ScoreClient } from './score-client';
 
 let instance: ScoreClient | null = null;
 
-function resolveBaseUrl(): string {
+export function resolveBaseUrl(): string {
   const envBase = import.meta.env.VITE_API_BASE_URL as string | undefined;
   if (envBase && envBase.trim().length > 0) {
     return envBase;
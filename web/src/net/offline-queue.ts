@@ -55,7 +55,7 @@ export class OfflineScoreQueue {
     // If online, try to submit immediately
     if (this.isOnline) {
       try {
-        await this.scoreClient.submitScore(scoreInput);
+        await this.scoreClient.submitScore({ ...scoreInput, idempotencyKey: queuedScore.id });
         return queuedScore.id; // Successfully submitted, don't queue
       } catch (error) {
         // If submission fails, add to queue
@@ -163,7 +163,7 @@ export class OfflineScoreQueue {
         try {
           const batchInput: ScoreBatchInput = {
             clientTime: new Date().toISOString(),
-            items: batch.map(({ id, timestamp, retryCount, ...scoreInput }) => scoreInput),
+            items: batch.map(({ id, timestamp, retryCount, ...scoreInput }) => ({ ...scoreInput, idempotencyKey: id })),
           };
 
           const batchResult = await this.scoreClient.submitScoresBulk(batchInput);
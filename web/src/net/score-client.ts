@@ -38,6 +38,8 @@ const DEFAULT_CONFIG: ScoreClientConfig = {
 export class ScoreClient {
   private config: ScoreClientConfig;
   private rateLimitInfo: RateLimitInfo | null = null;
+  // Last leaderboard response per URL, revalidated with If-None-Match
+  private scoreWindowCache = new Map<string, { etag: string; body: ScoreWindow }>();
 
   constructor(config?: Partial<ScoreClientConfig>) {
     this.config = { ...DEFAULT_CONFIG, ...config };
@@ -104,19 +106,36 @@ export class ScoreClient {
       });
     }
 
-    const response = await this.request(url.toString(), {
+    const cacheKey = url.toString();
+    const cached = this.scoreWindowCache.get(cacheKey);
+    const headers: Record<string, string> = {
+      'User-Agent': this.config.userAgent,
+    };
+    if (cached) {
+      headers['If-None-Match'] = cached.etag;
+    }
+
+    const response = await this.request(cacheKey, {
       method: 'GET',
-      headers: {
-        'User-Agent': this.config.userAgent,
-      },
+      headers,
     });
 
+    if (response.status === 304 && cached) {
+      this.updateRateLimitInfo(response);
+      return cached.body;
+    }
+
     if (!response.ok) {
       await this.handleErrorResponse(response);
     }
 
     this.updateRateLimitInfo(response);
-    return await response.json();
+    const body: ScoreWindow = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      this.scoreWindowCache.set(cacheKey, { etag, body });
+    }
+    return body;
   }
 
   private async request(url: string, options: RequestInit): Promise<Response> {
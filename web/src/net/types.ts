@@ -114,6 +114,8 @@ export interface components {
             /** @description Optional metadata labels (e.g., "daily-challenge"). */
             tags?: string[];
             client?: components["schemas"]["ClientInfo"];
+            /** @description Client-chosen key that makes retries of this submission safe. */
+            idempotencyKey?: string;
         };
         ScoreBatchInput: {
             /**